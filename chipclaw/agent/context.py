@@ -9,10 +9,12 @@ from ..utils import format_runtime_info, file_exists
 class ContextBuilder:
     """Builds context for LLM from various sources"""
     
-    def __init__(self, workspace, memory, skills):
+    def __init__(self, workspace, memory, skills, inline_skills=False):
         self.workspace = workspace
         self.memory = memory
         self.skills = skills
+        # When False, skill bodies are fetched via the load_skill tool
+        self.inline_skills = inline_skills
     
     def _load_bootstrap_file(self, filename):
         """Load a bootstrap markdown file from workspace"""
@@ -31,7 +33,7 @@ class ContextBuilder:
         1. Identity (ESP32-S3 runtime info)
         2. Bootstrap files (AGENTS.md, IDENTITY.md, etc.)
         3. Memory context
-        4. Active skills
+        4. Active skills (only when inline_skills is set)
         5. Skills summary
         
         Args:
@@ -71,16 +73,19 @@ You are ChipClaw, an autonomous AI agent running on ESP32-S3 hardware.
             sections.append(f"# Memory\n{memory_context}")
         
         # 4. Always-loaded Skills
-        always_skills = self.skills.get_always_skills()
-        if always_skills:
-            sections.append("# Active Skills")
-            for skill in always_skills:
-                skill_name = skill['frontmatter'].get('name', skill['name'])
-                sections.append(f"## Skill: {skill_name}\n{skill['content']}")
+        if self.inline_skills:
+            always_skills = self.skills.get_always_skills()
+            if always_skills:
+                sections.append("# Active Skills")
+                for skill in always_skills:
+                    skill_name = skill['frontmatter'].get('name', skill['name'])
+                    sections.append(f"## Skill: {skill_name}\n{skill['content']}")
         
         # 5. Skills Summary
         skills_summary = self.skills.build_skills_summary()
         if skills_summary:
+            if not self.inline_skills and self.skills.list_skills():
+                skills_summary += "\n\nUse the load_skill tool to read a skill's full document before using it."
             sections.append(skills_summary)
         
         return '\n\n'.join(sections)
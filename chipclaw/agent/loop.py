@@ -18,6 +18,8 @@ from .tools.hardware import GPIOTool, I2CScanTool
 from .tools.exec_mpy import ExecMicroPythonTool
 from .tools.curl import CurlTool
 from .tools.message import MessageTool
+from .tools.skill import LoadSkillTool
+from .tools.bus_stats import BusStatsTool
 
 
 class AgentLoop:
@@ -32,8 +34,14 @@ class AgentLoop:
         # Initialize components
         workspace = config.workspace
         self.memory = MemoryStore(workspace)
-        self.skills = SkillsManager(workspace)
-        self.context = ContextBuilder(workspace, self.memory, self.skills)
+        self.skills = SkillsManager(
+            workspace,
+            cache_bytes=config.get("agent", "skill_cache_bytes", default=16384)
+        )
+        self.context = ContextBuilder(
+            workspace, self.memory, self.skills,
+            inline_skills=config.get("agent", "inline_skills", default=False)
+        )
         
         # Initialize tools
         self.tools = ToolRegistry()
@@ -65,10 +73,14 @@ class AgentLoop:
         self.tools.register(ExecMicroPythonTool(workspace=workspace))
         
         # HTTP
-        self.tools.register(CurlTool())
+        self.tools.register(CurlTool(allowed_dir=allowed_dir))
         
         # Message tool
         self.tools.register(MessageTool(self.bus))
+        self.tools.register(BusStatsTool(self.bus))
+        
+        # On-demand skill documents
+        self.tools.register(LoadSkillTool(self.skills))
     
     async def run(self):
         """Main loop: process inbound messages"""
@@ -146,10 +158,20 @@ class AgentLoop:
                         })
                     messages.append(assistant_msg)
                     
+                    # Channels that asked for it see what the model said before its tool calls
+                    if response.content and msg.meta("partial"):
+                        from ..bus.events import OutboundMessage
+                        await self.bus.publish_outbound(OutboundMessage(
+                            channel=msg.channel,
+                            chat_id=msg.chat_id,
+                            content=response.content,
+                            metadata={"partial": True}
+                        ))
+                    
                     # Execute tools
                     for tc in response.tool_calls:
                         print(f"Executing tool: {tc.name}({tc.arguments})")
-                        result = self.tools.execute(tc.name, tc.arguments)
+                        result = await self.tools.execute(tc.name, tc.arguments)
                         print(f"Tool result: {result}")
                         
                         # Add tool result to messages
@@ -164,10 +186,9 @@ class AgentLoop:
             # Get final response content
             final_content = response.content or "I completed the requested actions."
             
-            # Save to session
+            # Record in session
             session.add_message("user", msg.content)
             session.add_message("assistant", final_content)
-            self.sessions.save(session)
             
             # Send response via bus
             from ..bus.events import OutboundMessage
@@ -179,6 +200,9 @@ class AgentLoop:
             )
             await self.bus.publish_outbound(reply)
             
+            # Persist off the critical path (write-behind flusher)
+            self.sessions.mark_dirty(session)
+            
             print(f"Response sent: {final_content[:100]}...")
         
         except Exception as e:
@@ -191,6 +215,7 @@ class AgentLoop:
             error_reply = OutboundMessage(
                 channel=msg.channel,
                 chat_id=msg.chat_id,
-                content=f"Error processing message: {e}"
+                content=f"Error processing message: {e}",
+                reply_to=msg
             )
             await self.bus.publish_outbound(error_reply)
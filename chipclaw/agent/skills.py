@@ -3,17 +3,21 @@ ChipClaw Skills Loader
 Loads and manages skill documents with frontmatter parsing
 """
 import os
-from ..utils import file_exists
+from ..utils import file_exists, LRUCache
 
 
 class SkillsManager:
     """Skills management system"""
     
-    def __init__(self, workspace):
+    def __init__(self, workspace, cache_bytes=16384):
         self.workspace = workspace
         self.user_skills_dir = workspace + "/skills"
         # Built-in skills bundled with chipclaw package
         self.builtin_skills_dir = self._find_builtin_skills_dir()
+        # Loaded skill bodies, bounded by total body size
+        self.cache = LRUCache(max_bytes=cache_bytes)
+        # One-line manifest entries: {name: (stamp, description)}
+        self._manifest = {}
     
     def _find_builtin_skills_dir(self):
         """
@@ -83,30 +87,40 @@ class SkillsManager:
         
         return skills
     
-    def load_skill(self, name):
+    def _skill_path(self, name):
         """
-        Load skill markdown + frontmatter.
-        Looks in user skills first, then builtin skills.
+        Resolve SKILL.md path for a skill, user skills first.
         
         Args:
             name: Skill name (directory name)
         
         Returns:
-            Dict with 'frontmatter' (dict) and 'content' (str)
-            Returns None if skill not found
+            Path string, or None if skill not found
         """
-        # Try user skills first, then builtin
         skill_path = f"{self.user_skills_dir}/{name}/SKILL.md"
-        
-        if not file_exists(skill_path):
-            # Fall back to builtin skills
-            if self.builtin_skills_dir:
-                skill_path = f"{self.builtin_skills_dir}/{name}/SKILL.md"
-            if not file_exists(skill_path):
-                return None
-        
+        if file_exists(skill_path):
+            return skill_path
+        if self.builtin_skills_dir:
+            skill_path = f"{self.builtin_skills_dir}/{name}/SKILL.md"
+            if file_exists(skill_path):
+                return skill_path
+        return None
+    
+    def _stamp(self, path):
+        """
+        Cheap change marker for a skill file: (path, size, mtime).
+        Lets cached entries be revalidated with one stat() instead of a read.
+        """
         try:
-            with open(skill_path, 'r') as f:
+            st = os.stat(path)
+            return (path, st[6], st[8])
+        except OSError:
+            return None
+    
+    def _read_skill(self, name, path):
+        """Read and parse a skill file, returning the skill dict or None"""
+        try:
+            with open(path, 'r') as f:
                 content = f.read()
             
             frontmatter, body = self._parse_frontmatter(content)
@@ -120,6 +134,34 @@ class SkillsManager:
             print(f"Error loading skill '{name}': {e}")
             return None
     
+    def load_skill(self, name):
+        """
+        Load skill markdown + frontmatter.
+        Looks in user skills first, then builtin skills.
+        Results are served from the LRU body cache while the file is unchanged.
+        
+        Args:
+            name: Skill name (directory name)
+        
+        Returns:
+            Dict with 'frontmatter' (dict) and 'content' (str)
+            Returns None if skill not found
+        """
+        skill_path = self._skill_path(name)
+        if not skill_path:
+            self.cache.pop(name)
+            return None
+        
+        stamp = self._stamp(skill_path)
+        cached = self.cache.get(name)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        
+        skill = self._read_skill(name, skill_path)
+        if skill:
+            self.cache.put(name, (stamp, skill), len(skill['content']))
+        return skill
+    
     def _parse_frontmatter(self, content):
         """
         Parse frontmatter from markdown content
@@ -190,6 +232,34 @@ class SkillsManager:
                 skills.append(skill)
         return skills
     
+    def describe_skill(self, name):
+        """
+        Get the one-line manifest description of a skill without
+        keeping its body in RAM.
+        
+        Args:
+            name: Skill name
+        
+        Returns:
+            Description string, or None if skill not found
+        """
+        skill_path = self._skill_path(name)
+        if not skill_path:
+            self._manifest.pop(name, None)
+            return None
+        
+        stamp = self._stamp(skill_path)
+        entry = self._manifest.get(name)
+        if entry and entry[0] == stamp:
+            return entry[1]
+        
+        skill = self._read_skill(name, skill_path)
+        if not skill:
+            return None
+        description = skill['frontmatter'].get('description', 'No description')
+        self._manifest[name] = (stamp, description)
+        return description
+    
     def build_skills_summary(self):
         """
         Generate available skills list for context
@@ -204,9 +274,8 @@ class SkillsManager:
         
         lines = ["## Available Skills"]
         for skill_name in all_skills:
-            skill = self.load_skill(skill_name)
-            if skill:
-                description = skill['frontmatter'].get('description', 'No description')
+            description = self.describe_skill(skill_name)
+            if description is not None:
                 lines.append(f"- **{skill_name}**: {description}")
         
         return '\n'.join(lines)
@@ -23,7 +23,9 @@ class Tool:
             **params: Tool parameters
         
         Returns:
-            Result string or object
+            Result string or object. A tool that should yield to the
+            event loop while it works may define async def execute; the
+            registry awaits it.
         """
         raise NotImplementedError("Subclass must implement execute()")
     
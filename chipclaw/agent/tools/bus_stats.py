@@ -0,0 +1,54 @@
+"""
+ChipClaw Bus Stats Tool
+Report channel health, message bus queue depths and latency histograms
+"""
+from .base import Tool
+
+
+class BusStatsTool(Tool):
+    """Report per-channel health, queue counters and stage latencies"""
+    
+    name = "bus_stats"
+    description = (
+        "Report message bus health per channel: connection state (connected/"
+        "degraded/down), reconnect failures and task restarts, outbound queue "
+        "depth, sent/dropped/timeout counts, and latency (ms) for queue wait, "
+        "agent processing, outbound wait, send and end-to-end"
+    )
+    parameters = {
+        "type": "object",
+        "properties": {}
+    }
+    
+    def __init__(self, bus):
+        self.bus = bus
+    
+    def execute(self):
+        """Format bus.health(), bus.stats() and bus.latency() as text"""
+        lines = []
+        health = self.bus.health()
+        queues = self.bus.stats()
+        latency = self.bus.latency()
+        for channel in sorted(set(health) | set(queues) | set(latency)):
+            state = health.get(channel)
+            if state:
+                line = (f"{channel} is {state['state']} for {state['since']}s: "
+                        f"failures={state['failures']} restarts={state['restarts']}")
+                if state["last_error"]:
+                    line += f" last_error={state['last_error']}"
+                lines.append(line)
+            q = queues.get(channel)
+            if q:
+                lines.append(
+                    f"{channel}: depth={q['depth']} max_depth={q['max_depth']} "
+                    f"sent={q['sent']} dropped={q['dropped']} "
+                    f"timeouts={q['timeouts']} errors={q['errors']}"
+                )
+            elif not state:
+                lines.append(f"{channel}:")
+            for stage, h in latency.get(channel, {}).items():
+                lines.append(
+                    f"  {stage}: n={h['count']} mean={h['mean']} "
+                    f"p50<={h['p50']} p95<={h['p95']} max={h['max']}"
+                )
+        return "\n".join(lines) or "No bus activity yet"
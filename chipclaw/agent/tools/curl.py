@@ -4,6 +4,12 @@ MicroPython-compatible HTTP client based on urequests,
 replacing curl command for LLM common use cases.
 """
 import gc
+import os
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
 
 try:
     import ujson as json
@@ -15,17 +21,64 @@ try:
 except ImportError:
     import requests
 
+try:
+    import hashlib
+except ImportError:
+    import uhashlib as hashlib
+
+try:
+    import binascii
+except ImportError:
+    import ubinascii as binascii
+
 from .base import Tool
-from ...utils import truncate_string
+from ...utils import truncate_string, ensure_dir, replace_file, ticks_ms, ticks_diff
+
+
+def _header(response, name):
+    """Case-insensitive response header lookup (urequests keeps the server's case)"""
+    headers = getattr(response, "headers", None) or {}
+    name = name.lower()
+    for k, v in headers.items():
+        if k.lower() == name:
+            return v
+    return None
+
+
+def _file_size(path):
+    try:
+        return os.stat(path)[6]
+    except OSError:
+        return 0
 
 
 class CurlTool(Tool):
-    """HTTP request tool supporting GET, POST, PUT, DELETE, PATCH methods"""
+    """
+    HTTP request tool supporting GET, POST, PUT, DELETE, PATCH methods
+
+    With save_to, the body is streamed in chunk_size pieces into a
+    ".part" file next to the target instead of being read into RAM. An
+    interrupted GET download resumes from the partial file with a Range
+    request; the file is hashed with SHA-256 as it is written and only
+    moved into place once complete (and matching, if a hash was given).
+    The model gets a one-line summary rather than the body. execute is a
+    coroutine that yields to the event loop after every chunk, so channels
+    keep running (and can read self.progress) during a long download;
+    each socket read itself still blocks.
+
+    Args:
+        allowed_dir: Directory save_to paths must be inside
+        chunk_size: Bytes read from the socket at a time
+    """
+
+    PROGRESS_EVERY = 65536  # print a progress line every this many bytes
 
     name = "curl"
     description = (
         "Perform HTTP requests (like curl). "
-        "Supports GET, POST, PUT, DELETE, PATCH methods with custom headers and JSON body."
+        "Supports GET, POST, PUT, DELETE, PATCH methods with custom headers and JSON body. "
+        "Set save_to to download a large body (firmware, models, data) straight to a file; "
+        "calling again with the same save_to resumes an interrupted download."
     )
     parameters = {
         "type": "object",
@@ -46,12 +99,38 @@ class CurlTool(Tool):
             "data": {
                 "type": "string",
                 "description": "Request body as string. For JSON, pass a JSON-encoded string."
+            },
+            "save_to": {
+                "type": "string",
+                "description": "Stream the response body into this file instead of returning it; "
+                               "only a summary (size, SHA-256) is returned"
+            },
+            "sha256": {
+                "type": "string",
+                "description": "Expected SHA-256 hex digest of the saved file; the download is discarded on mismatch"
             }
         },
         "required": ["url"]
     }
 
-    def execute(self, url, method="GET", headers=None, data=None):
+    def __init__(self, allowed_dir="/workspace", chunk_size=1024):
+        self.allowed_dir = allowed_dir
+        self.chunk_size = chunk_size
+        self.progress = None    # (save_to, bytes so far, total or None) while downloading
+
+    def _send(self, method, url, kwargs):
+        """Dispatch by method"""
+        if method == "GET":
+            return requests.get(url, **kwargs)
+        elif method == "POST":
+            return requests.post(url, **kwargs)
+        elif method == "PUT":
+            return requests.put(url, **kwargs)
+        elif method == "DELETE":
+            return requests.delete(url, **kwargs)
+        return requests.patch(url, **kwargs)
+
+    async def execute(self, url, method="GET", headers=None, data=None, save_to=None, sha256=None):
         """
         Execute an HTTP request.
 
@@ -60,9 +139,12 @@ class CurlTool(Tool):
             method: HTTP method (GET, POST, PUT, DELETE, PATCH)
             headers: Dict of HTTP headers
             data: Request body string
+            save_to: Optional file path to stream the body into
+            sha256: Optional expected hex digest for save_to
 
         Returns:
-            Formatted response string with status, headers and body
+            Formatted response string with status, headers and body,
+            or a download summary when save_to is given
         """
         gc.collect()
 
@@ -70,6 +152,9 @@ class CurlTool(Tool):
         if method not in ("GET", "POST", "PUT", "DELETE", "PATCH"):
             return "Error: Unsupported HTTP method: {}".format(method)
 
+        if save_to:
+            return await self._download(url, method, headers, data, save_to, sha256)
+
         try:
             # Build request keyword arguments
             kwargs = {}
@@ -78,17 +163,7 @@ class CurlTool(Tool):
             if data is not None:
                 kwargs["data"] = data
 
-            # Dispatch by method
-            if method == "GET":
-                response = requests.get(url, **kwargs)
-            elif method == "POST":
-                response = requests.post(url, **kwargs)
-            elif method == "PUT":
-                response = requests.put(url, **kwargs)
-            elif method == "DELETE":
-                response = requests.delete(url, **kwargs)
-            elif method == "PATCH":
-                response = requests.patch(url, **kwargs)
+            response = self._send(method, url, kwargs)
 
             # Read status
             status_code = response.status_code
@@ -131,3 +206,106 @@ class CurlTool(Tool):
         except Exception as e:
             gc.collect()
             return "Error: HTTP request failed: {}".format(e)
+
+    def _chunks(self, response):
+        """Yield the body in chunk_size pieces without buffering it"""
+        if hasattr(response, "iter_content"):
+            for chunk in response.iter_content(self.chunk_size):
+                yield chunk
+            return
+        buf = bytearray(self.chunk_size)
+        mv = memoryview(buf)
+        while True:
+            n = response.raw.readinto(buf)
+            if not n:
+                return
+            yield mv[:n]
+
+    async def _download(self, url, method, headers, data, save_to, sha256):
+        """
+        Stream the response body into save_to, resuming a previous attempt
+
+        Returns:
+            One-line summary or error string
+        """
+        if not save_to.startswith(self.allowed_dir) or ".." in save_to.split("/"):
+            return "Error: Access denied. Files must be within {}".format(self.allowed_dir)
+
+        part = save_to + ".part"
+        offset = _file_size(part) if method == "GET" else 0
+        kwargs = {"headers": dict(headers or {}), "stream": True}
+        if offset:
+            kwargs["headers"]["Range"] = "bytes={}-".format(offset)
+        if data is not None:
+            kwargs["data"] = data
+
+        parent = "/".join(save_to.split("/")[:-1])
+        if parent:
+            ensure_dir(parent)
+
+        response = None
+        start = ticks_ms()
+        try:
+            response = self._send(method, url, kwargs)
+            status = response.status_code
+            if status == 416 and offset:
+                # Partial file does not fit the resource (changed or already complete)
+                os.remove(part)
+                return "Error: HTTP 416, partial download discarded; retry to start over"
+            if status not in (200, 206):
+                return "Error: HTTP {} {}".format(status, getattr(response, "reason", "") or "")
+            if status == 200:
+                offset = 0  # server ignored the Range header: start over
+
+            length = _header(response, "Content-Length")
+            total = offset + int(length) if length else None
+
+            digest = hashlib.sha256()
+            if offset:
+                # Hash what is already on flash, a chunk at a time
+                with open(part, "rb") as f:
+                    while True:
+                        chunk = f.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+
+            received = offset
+            report = offset + self.PROGRESS_EVERY
+            self.progress = (save_to, received, total)
+            with open(part, "ab" if offset else "wb") as f:
+                for chunk in self._chunks(response):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
+                    self.progress = (save_to, received, total)
+                    if received >= report:
+                        print("curl: {} {}/{} bytes".format(save_to, received, total or "?"))
+                        report += self.PROGRESS_EVERY
+                        gc.collect()
+                    await asyncio.sleep(0)
+        except Exception as e:
+            gc.collect()
+            return "Error: Download interrupted at {} bytes ({}); call again to resume".format(
+                _file_size(part), e)
+        finally:
+            self.progress = None
+            if response is not None:
+                response.close()
+
+        if total is not None and received < total:
+            return "Error: Download incomplete: {}/{} bytes saved; call again to resume".format(received, total)
+
+        hexdigest = binascii.hexlify(digest.digest()).decode()
+        if sha256 and hexdigest != sha256.lower():
+            os.remove(part)
+            return "Error: SHA-256 mismatch for {}: got {}, expected {}; download discarded".format(
+                save_to, hexdigest, sha256.lower())
+
+        replace_file(part, save_to)
+        elapsed = ticks_diff(ticks_ms(), start)
+        gc.collect()
+        summary = "Saved {} bytes to {} in {} ms".format(received, save_to, elapsed)
+        if offset:
+            summary += " (resumed at {})".format(offset)
+        return summary + ", sha256={}".format(hexdigest)
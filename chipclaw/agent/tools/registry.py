@@ -41,10 +41,13 @@ class ToolRegistry:
         """
         return [tool.to_schema() for tool in self.tools.values()]
     
-    def execute(self, name, params):
+    async def execute(self, name, params):
         """
         Execute tool by name with params
         
+        Tools with async def execute are awaited; plain ones are called
+        directly.
+        
         Args:
             name: Tool name
             params: Dict of parameters
@@ -57,7 +60,10 @@ class ToolRegistry:
             return f"Error: Tool '{name}' not found"
         
         try:
-            return tool.execute(**params)
+            result = tool.execute(**params)
+            if hasattr(result, "send"):  # coroutine (a generator on MicroPython)
+                result = await result
+            return result
         except Exception as e:
             import sys
             # Get traceback info
@@ -0,0 +1,38 @@
+"""
+ChipClaw Skill Tool
+Load skill documents on demand instead of pasting them into every prompt
+"""
+from .base import Tool
+
+
+class LoadSkillTool(Tool):
+    """Load the full document of a skill listed in Available Skills"""
+
+    name = "load_skill"
+    description = (
+        "Load the full document of a skill listed under Available Skills. "
+        "Call this before relying on a skill's APIs or workflows."
+    )
+    parameters = {
+        "type": "object",
+        "properties": {
+            "name": {
+                "type": "string",
+                "description": "Skill name as shown in Available Skills"
+            }
+        },
+        "required": ["name"]
+    }
+
+    def __init__(self, skills):
+        self.skills = skills
+
+    def execute(self, name):
+        """Return skill body from the skills cache"""
+        skill = self.skills.load_skill(name)
+        if not skill:
+            available = ", ".join(self.skills.list_skills()) or "none"
+            return f"Error: Skill not found: {name}. Available: {available}"
+
+        skill_name = skill['frontmatter'].get('name', skill['name'])
+        return f"# Skill: {skill_name}\n{skill['content']}"
@@ -1,23 +1,53 @@
 """
 ChipClaw Message Bus Events
+
+Events use __slots__ (on CPython this drops the per-instance __dict__;
+MicroPython ignores it) and allocate their metadata dict only when it is
+first used.
 """
 
 
 class InboundMessage:
     """Message from external channel to agent"""
     
+    __slots__ = ("channel", "sender_id", "chat_id", "content", "media",
+                 "_metadata", "_session_key", "published_at", "consumed_at")
+    
     def __init__(self, channel, sender_id, chat_id, content, media=None, metadata=None):
         self.channel = channel        # Channel name (e.g., "mqtt", "uart")
         self.sender_id = sender_id    # Sender identifier
         self.chat_id = chat_id        # Conversation/chat identifier
         self.content = content        # Message text content
         self.media = media            # Optional media data
-        self.metadata = metadata or {}  # Optional metadata dict
+        self._metadata = metadata     # Optional metadata dict, created on access
+        self._session_key = None
+        self.published_at = None     # ticks_ms() when published to the bus
+        self.consumed_at = None      # ticks_ms() when taken by the agent
+    
+    @property
+    def metadata(self):
+        """Metadata dict (allocated on first access)"""
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value):
+        self._metadata = value
+    
+    def meta(self, key, default=None):
+        """Read one metadata value without allocating the dict"""
+        if self._metadata is None:
+            return default
+        return self._metadata.get(key, default)
     
     @property
     def session_key(self):
         """Return session key for session management: 'channel:chat_id'"""
-        return f"{self.channel}:{self.chat_id}"
+        # Cached: channel and chat_id are not changed after creation
+        if self._session_key is None:
+            self._session_key = f"{self.channel}:{self.chat_id}"
+        return self._session_key
     
     def __repr__(self):
         return f"InboundMessage(channel={self.channel}, sender_id={self.sender_id}, chat_id={self.chat_id}, content={self.content[:50]}...)"
@@ -26,13 +56,35 @@ class InboundMessage:
 class OutboundMessage:
     """Message from agent to external channel"""
     
+    __slots__ = ("channel", "chat_id", "content", "reply_to", "media",
+                 "_metadata", "published_at", "dispatched_at")
+    
     def __init__(self, channel, chat_id, content, reply_to=None, media=None, metadata=None):
         self.channel = channel        # Target channel name
         self.chat_id = chat_id        # Target conversation/chat
         self.content = content        # Message text content
         self.reply_to = reply_to      # Optional reference to InboundMessage
         self.media = media            # Optional media data
-        self.metadata = metadata or {}  # Optional metadata dict
+        self._metadata = metadata     # Optional metadata dict, created on access
+        self.published_at = None     # ticks_ms() when published to the bus
+        self.dispatched_at = None    # ticks_ms() when taken by its channel
+    
+    @property
+    def metadata(self):
+        """Metadata dict (allocated on first access)"""
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value):
+        self._metadata = value
+    
+    def meta(self, key, default=None):
+        """Read one metadata value without allocating the dict"""
+        if self._metadata is None:
+            return default
+        return self._metadata.get(key, default)
     
     def __repr__(self):
         return f"OutboundMessage(channel={self.channel}, chat_id={self.chat_id}, content={self.content[:50]}...)"
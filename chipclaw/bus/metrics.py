@@ -0,0 +1,105 @@
+"""
+ChipClaw Bus Metrics
+Fixed-bucket latency histograms for the message bus
+"""
+
+
+class Histogram:
+    """
+    Latency histogram with fixed millisecond bucket bounds
+
+    Recording is one bounds scan and a counter increment; nothing is
+    allocated per sample. Percentiles are reported as the upper bound of
+    the bucket containing them.
+    """
+
+    BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+    def __init__(self, bounds=None):
+        self.bounds = bounds or self.BOUNDS
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is overflow
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        """Add one sample in milliseconds"""
+        i = 0
+        for bound in self.bounds:
+            if value <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """
+        Approximate percentile
+
+        Args:
+            p: Percentile between 0 and 100
+
+        Returns:
+            Bucket upper bound in ms (max sample for the overflow bucket)
+        """
+        if not self.count:
+            return 0
+        rank = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        """Return count, mean, p50, p95 and max as a dict"""
+        return {
+            "count": self.count,
+            "mean": self.total // self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max
+        }
+
+
+class BusMetrics:
+    """
+    Per-channel latency histograms for each stage of a message's trip
+
+    Stages:
+        queue_wait: publish_inbound until the agent consumes the message
+        processing: agent consume until the reply is published
+        outbound_wait: reply published until its channel dispatcher takes it
+        send: channel send() duration
+        end_to_end: inbound published until the reply has been sent
+    """
+
+    STAGES = ("queue_wait", "processing", "outbound_wait", "send", "end_to_end")
+
+    def __init__(self):
+        self.channels = {}  # {channel: {stage: Histogram}}
+
+    def record(self, channel, stage, value):
+        """Record a stage latency in ms for channel"""
+        stages = self.channels.get(channel)
+        if stages is None:
+            stages = {}
+            for name in self.STAGES:
+                stages[name] = Histogram()
+            self.channels[channel] = stages
+        stages[stage].record(value)
+
+    def summary(self):
+        """Return {channel: {stage: summary}} for stages with samples"""
+        result = {}
+        for channel, stages in self.channels.items():
+            entry = {}
+            for name in self.STAGES:
+                if stages[name].count:
+                    entry[name] = stages[name].summary()
+            result[channel] = entry
+        return result
@@ -6,95 +6,277 @@ try:
 except ImportError:
     import asyncio
 
+from ..utils import ticks_ms, ticks_diff, LRUCache
+from .metrics import BusMetrics
+
+
+class _Waiters:
+    """
+    FIFO of blocked tasks, each parked on a pooled Event
+
+    Events sit in a ring indexed by head/count, so adding a waiter and
+    waking the oldest are O(1). Events are cleared and kept on a free
+    list after use, so once the pool has warmed up a blocked get or put
+    allocates nothing. A cancelled waiter leaves a None hole that wake()
+    skips.
+    """
+
+    def __init__(self):
+        self._ring = [None] * 4
+        self._head = 0
+        self._count = 0   # ring slots in use, holes included
+        self._live = 0    # tasks actually waiting
+        self._free = []   # cleared Events ready for reuse
+
+    def __len__(self):
+        return self._live
+
+    def _add(self, event):
+        ring = self._ring
+        if self._count == len(ring):
+            size = len(ring)
+            ring = self._ring = ring[self._head:] + ring[:self._head] + [None] * size
+            self._head = 0
+        ring[(self._head + self._count) % len(ring)] = event
+        self._count += 1
+        self._live += 1
+
+    def _discard(self, event):
+        """Punch a hole where a cancelled waiter was (cancellation only)"""
+        ring = self._ring
+        for i in range(self._count):
+            j = (self._head + i) % len(ring)
+            if ring[j] is event:
+                ring[j] = None
+                self._live -= 1
+                return
+
+    def wake(self):
+        """Wake the oldest waiter, if any"""
+        ring = self._ring
+        while self._count:
+            event = ring[self._head]
+            ring[self._head] = None
+            self._head = (self._head + 1) % len(ring)
+            self._count -= 1
+            if event is not None:
+                self._live -= 1
+                event.set()
+                return
+
+    async def wait(self, ready):
+        """
+        Wait until woken
+
+        Args:
+            ready: Function telling whether the awaited condition holds;
+                a waiter cancelled after being woken passes the wakeup on
+                when it does
+        """
+        event = self._free.pop() if self._free else asyncio.Event()
+        self._add(event)
+        try:
+            await event.wait()
+        except asyncio.CancelledError:
+            if not event.is_set():
+                self._discard(event)
+            elif ready():
+                self.wake()
+            raise
+        finally:
+            event.clear()
+            self._free.append(event)
+
 
-# Simple asyncio Queue implementation for MicroPython
 class Queue:
     """
-    Simple async queue for MicroPython compatibility
+    Ring-buffer async queue for MicroPython compatibility
     Mimics asyncio.Queue interface
+
+    Items live in a preallocated list indexed by head/count, so put and
+    get are O(1). An unbounded queue (maxsize=0) doubles its ring when
+    full. Blocked getters and putters wait in _Waiters rings on pooled
+    Events; a put wakes only the oldest getter and a get only the oldest
+    putter, each in O(1), and blocking allocates no new Event once the
+    pool is warm.
     """
+    INITIAL_CAPACITY = 16
+
     def __init__(self, maxsize=0):
         self.maxsize = maxsize
-        self._queue = []
-        self._getters = []
-        self._putters = []
+        self._ring = [None] * (maxsize or self.INITIAL_CAPACITY)
+        self._head = 0
+        self._count = 0
+        self._getters = _Waiters()
+        self._putters = _Waiters()
+        # Bound once so waiting does not build a closure each time
+        self._has_space = lambda: not self.full()
+        self._has_items = lambda: self._count > 0
     
     def qsize(self):
         """Return the size of the queue"""
-        return len(self._queue)
+        return self._count
     
     def empty(self):
         """Return True if the queue is empty"""
-        return len(self._queue) == 0
+        return self._count == 0
     
     def full(self):
         """Return True if the queue is full"""
-        return self.maxsize > 0 and len(self._queue) >= self.maxsize
+        return self.maxsize > 0 and self._count >= self.maxsize
     
-    async def put(self, item):
-        """Put an item into the queue"""
-        # If queue is full and maxsize is set, wait
+    def _grow(self):
+        """Double the ring, unwrapping items to start at index 0"""
+        ring = self._ring
+        size = len(ring)
+        self._ring = ring[self._head:] + ring[:self._head] + [None] * size
+        self._head = 0
+    
+    def _push(self, item):
+        if self._count == len(self._ring):
+            self._grow()
+        ring = self._ring
+        ring[(self._head + self._count) % len(ring)] = item
+        self._count += 1
+        self._getters.wake()
+    
+    def _pop(self):
+        ring = self._ring
+        item = ring[self._head]
+        ring[self._head] = None  # drop reference for gc
+        self._head = (self._head + 1) % len(ring)
+        self._count -= 1
+        self._putters.wake()
+        return item
+    
+    async def _wait_not_full(self):
         while self.full():
-            event = asyncio.Event()
-            self._putters.append(event)
-            await event.wait()
-        
-        self._queue.append(item)
-        
-        # Wake up a getter if any
-        if self._getters:
-            event = self._getters.pop(0)
-            event.set()
+            await self._putters.wait(self._has_space)
+    
+    async def _wait_not_empty(self):
+        while not self._count:
+            await self._getters.wait(self._has_items)
+    
+    async def put(self, item):
+        """Put an item into the queue, waiting while it is full"""
+        await self._wait_not_full()
+        self._push(item)
     
     def put_nowait(self, item):
         """Put an item without blocking"""
         if self.full():
             raise Exception("Queue is full")
-        self._queue.append(item)
+        self._push(item)
+    
+    async def put_many(self, items):
+        """
+        Put several items in order, waiting for space as needed
         
-        # Wake up a getter if any
-        if self._getters:
-            event = self._getters.pop(0)
-            event.set()
+        Args:
+            items: Iterable of items
+        """
+        for item in items:
+            if self.full():
+                await self._wait_not_full()
+            self._push(item)
     
     async def get(self):
-        """Get an item from the queue"""
-        # If queue is empty, wait for an item
-        while self.empty():
-            event = asyncio.Event()
-            self._getters.append(event)
-            await event.wait()
-        
-        item = self._queue.pop(0)
-        
-        # Wake up a putter if any
-        if self._putters:
-            event = self._putters.pop(0)
-            event.set()
-        
-        return item
+        """Get an item from the queue, waiting while it is empty"""
+        await self._wait_not_empty()
+        return self._pop()
     
     def get_nowait(self):
         """Get an item without blocking"""
-        if self.empty():
+        if not self._count:
             raise Exception("Queue is empty")
-        item = self._queue.pop(0)
+        return self._pop()
+    
+    async def get_many(self, max_items):
+        """
+        Wait for at least one item, then take up to max_items
         
-        # Wake up a putter if any
-        if self._putters:
-            event = self._putters.pop(0)
-            event.set()
+        Args:
+            max_items: Maximum number of items to return
         
-        return item
+        Returns:
+            List of items, oldest first
+        """
+        await self._wait_not_empty()
+        items = []
+        while self._count and len(items) < max_items:
+            items.append(self._pop())
+        return items
+
+
+def _compile_part(part):
+    """Compile one glob segment: '*', 'prefix*' or an exact name"""
+    if part == "*":
+        return None
+    if part.endswith("*") and "*" not in part[:-1]:
+        prefix = part[:-1]
+        return lambda value: value.startswith(prefix)
+    if "*" in part:
+        raise ValueError(f"Unsupported wildcard in pattern segment: {part}")
+    return lambda value: value == part
+
+
+def compile_pattern(pattern):
+    """
+    Compile a subscription pattern into a matcher
+    
+    Patterns are "channel" or "channel:chat_id", where either segment may
+    be "*" or end in "*" for a prefix match: "mqtt", "*", "mqtt:ops-*".
+    
+    Args:
+        pattern: Subscription pattern string
+    
+    Returns:
+        Function(channel, chat_id) -> bool
+    """
+    channel_part, sep, chat_part = pattern.partition(":")
+    match_channel = _compile_part(channel_part)
+    match_chat = _compile_part(chat_part) if sep else None
+    
+    def matches(channel, chat_id):
+        if match_channel is not None and not match_channel(channel):
+            return False
+        return match_chat is None or match_chat(str(chat_id))
+    
+    return matches
 
 
 class MessageBus:
-    """Central message routing with asyncio queues"""
+    """
+    Central message routing with asyncio queues
+
+    Outbound subscriptions are patterns (see compile_pattern); a message
+    is fanned out to every subscription whose pattern matches its channel
+    and chat_id. Each subscription has its own bounded queue drained by
+    its own dispatcher task, so a subscriber that stalls only delays
+    itself. When a queue is full the oldest pending message is dropped.
+    Each send is cut off after send_timeout seconds. Matches are cached
+    per "channel:chat_id" so routing cost does not grow with the number
+    of subscribers.
+
+    Messages are stamped with ticks_ms() as they pass through the bus and
+    per-subscription stage latencies are kept in self.metrics.
+    """
+    ROUTE_CACHE_SIZE = 64
     
-    def __init__(self):
+    def __init__(self, config=None):
+        config = config or {}
         self.inbound = Queue()    # InboundMessage queue
-        self.outbound = Queue()   # OutboundMessage queue
-        self.subscribers = {}             # {channel_name: callback}
+        self.outbound = {}        # {pattern: Queue of OutboundMessage}
+        self.subscribers = {}             # {pattern: callback}
+        self.outbound_maxsize = config.get("outbound_maxsize", 16)
+        self.send_timeout = config.get("send_timeout", 10)
+        self._matchers = {}               # {pattern: compiled matcher}
+        self._routes = LRUCache(max_entries=self.ROUTE_CACHE_SIZE)
+        self._stats = {}                  # {pattern: counters}
+        self.metrics = BusMetrics()
+        self._tasks = {}                  # {pattern: dispatcher task}
+        self._health = {}                 # {channel name: Supervisor}
+        self._stopped = asyncio.Event()
         self._running = False
     
     async def publish_inbound(self, msg):
@@ -104,6 +286,7 @@ class MessageBus:
         Args:
             msg: InboundMessage instance
         """
+        msg.published_at = ticks_ms()
         await self.inbound.put(msg)
     
     async def consume_inbound(self):
@@ -114,49 +297,192 @@ class MessageBus:
         Returns:
             InboundMessage instance
         """
-        return await self.inbound.get()
+        msg = await self.inbound.get()
+        msg.consumed_at = ticks_ms()
+        if msg.published_at is not None:
+            self.metrics.record(msg.channel, "queue_wait",
+                                ticks_diff(msg.consumed_at, msg.published_at))
+        return msg
+    
+    def _route(self, channel, chat_id):
+        """Return the subscription patterns matching channel:chat_id"""
+        key = f"{channel}:{chat_id}"
+        patterns = self._routes.get(key)
+        if patterns is None:
+            patterns = [p for p, matches in self._matchers.items() if matches(channel, chat_id)]
+            self._routes.put(key, patterns)
+        return patterns
     
     async def publish_outbound(self, msg):
         """
-        Publish outbound message (Agent → Bus)
+        Publish outbound message (Agent → Bus) to every matching subscriber
+        Never waits on a slow subscriber; drops its oldest pending
+        message instead
         
         Args:
             msg: OutboundMessage instance
         """
-        await self.outbound.put(msg)
+        msg.published_at = ticks_ms()
+        inbound = msg.reply_to
+        if inbound is not None and inbound.consumed_at is not None:
+            self.metrics.record(inbound.channel, "processing",
+                                ticks_diff(msg.published_at, inbound.consumed_at))
+        
+        patterns = self._route(msg.channel, msg.chat_id)
+        if not patterns:
+            print(f"Warning: No subscriber for channel '{msg.channel}'")
+            return
+        for pattern in patterns:
+            queue = self.outbound[pattern]
+            stats = self._stats[pattern]
+            if queue.full():
+                queue.get_nowait()
+                stats["dropped"] += 1
+                print(f"Warning: Outbound queue for '{pattern}' full, dropped oldest")
+            queue.put_nowait(msg)
+            if queue.qsize() > stats["max_depth"]:
+                stats["max_depth"] = queue.qsize()
     
-    def subscribe_outbound(self, channel, callback):
+    def subscribe_outbound(self, pattern, callback):
         """
-        Register channel callback for outbound dispatch
+        Register a callback for outbound messages matching pattern
+        Subscribing the same pattern again replaces its callback
         
         Args:
-            channel: Channel name (string)
+            pattern: Channel name or pattern, e.g. "uart", "*", "mqtt:ops-*"
             callback: Async function(OutboundMessage) -> None
         """
-        self.subscribers[channel] = callback
+        if pattern not in self._matchers:
+            self._matchers[pattern] = compile_pattern(pattern)
+            self._routes.clear()
+        self.subscribers[pattern] = callback
+        if pattern not in self.outbound:
+            self.outbound[pattern] = Queue(self.outbound_maxsize)
+            self._stats[pattern] = {
+                "sent": 0, "dropped": 0, "timeouts": 0, "errors": 0, "max_depth": 0
+            }
+        if self._running and pattern not in self._tasks:
+            self._tasks[pattern] = asyncio.create_task(self._dispatch(pattern))
     
-    async def dispatch_outbound(self):
+    def unsubscribe_outbound(self, pattern):
         """
-        Background loop: dispatch outbound messages to channels
-        Runs continuously until stop() is called
+        Remove a subscription and drop its pending messages
+        
+        Args:
+            pattern: Pattern passed to subscribe_outbound()
         """
-        self._running = True
+        if pattern not in self.subscribers:
+            return
+        del self.subscribers[pattern]
+        del self._matchers[pattern]
+        del self.outbound[pattern]
+        del self._stats[pattern]
+        self._routes.clear()
+        task = self._tasks.pop(pattern, None)
+        if task:
+            task.cancel()
+    
+    def register_health(self, name, supervisor):
+        """
+        Report a channel's health in health()
+        
+        Args:
+            name: Channel name
+            supervisor: Object with a stats() method, e.g. channel.supervisor
+        """
+        self._health[name] = supervisor
+    
+    def health(self):
+        """
+        Health per registered channel
+        
+        Returns:
+            Dict of {channel: {"state", "failures", "restarts",
+            "last_error", "since"}}
+        """
+        return {name: sup.stats() for name, sup in self._health.items()}
+    
+    def stats(self):
+        """
+        Outbound counters per subscription
+        
+        Returns:
+            Dict of {pattern: {"depth", "max_depth", "sent", "dropped",
+            "timeouts", "errors"}}
+        """
+        result = {}
+        for pattern, queue in self.outbound.items():
+            entry = dict(self._stats[pattern])
+            entry["depth"] = queue.qsize()
+            result[pattern] = entry
+        return result
+    
+    def latency(self):
+        """
+        Stage latency summaries per channel
+        
+        Inbound stages are keyed by source channel, outbound stages by
+        subscription pattern.
+        
+        Returns:
+            Dict of {channel: {stage: {"count", "mean", "p50", "p95", "max"}}}
+            in milliseconds
+        """
+        return self.metrics.summary()
+    
+    def _record_sent(self, pattern, msg, dispatched_at):
+        """Record send and end-to-end latency for a delivered message"""
+        now = ticks_ms()
+        self.metrics.record(pattern, "send", ticks_diff(now, dispatched_at))
+        inbound = msg.reply_to
+        if inbound is not None and inbound.published_at is not None:
+            self.metrics.record(pattern, "end_to_end", ticks_diff(now, inbound.published_at))
+    
+    async def _dispatch(self, pattern):
+        """Drain one subscription's outbound queue"""
+        queue = self.outbound[pattern]
+        stats = self._stats[pattern]
         while self._running:
             try:
-                msg = await self.outbound.get()
-                callback = self.subscribers.get(msg.channel)
-                if callback:
-                    try:
-                        await callback(msg)
-                    except Exception as e:
-                        print(f"Error dispatching to {msg.channel}: {e}")
-                else:
-                    print(f"Warning: No subscriber for channel '{msg.channel}'")
+                msg = await queue.get()
+                # Shared between subscribers when fanned out; keep our own stamp
+                dispatched_at = ticks_ms()
+                msg.dispatched_at = dispatched_at
+                if msg.published_at is not None:
+                    self.metrics.record(pattern, "outbound_wait",
+                                        ticks_diff(dispatched_at, msg.published_at))
+                callback = self.subscribers[pattern]
+                try:
+                    await asyncio.wait_for(callback(msg), self.send_timeout)
+                    stats["sent"] += 1
+                    self._record_sent(pattern, msg, dispatched_at)
+                except asyncio.TimeoutError:
+                    stats["timeouts"] += 1
+                    print(f"Timed out sending to {pattern} after {self.send_timeout}s")
+                except Exception as e:
+                    stats["errors"] += 1
+                    print(f"Error dispatching to {pattern}: {e}")
             except Exception as e:
-                print(f"Error in dispatch_outbound: {e}")
+                print(f"Error in dispatch to {pattern}: {e}")
                 if self._running:
                     await asyncio.sleep(0.1)
     
+    async def dispatch_outbound(self):
+        """
+        Background loop: start one dispatcher per subscription
+        Runs continuously until stop() is called
+        """
+        self._running = True
+        self._stopped.clear()
+        for pattern in self.subscribers:
+            if pattern not in self._tasks:
+                self._tasks[pattern] = asyncio.create_task(self._dispatch(pattern))
+        await self._stopped.wait()
+    
     def stop(self):
-        """Stop the dispatch loop"""
+        """Stop the dispatch loop and its dispatchers"""
         self._running = False
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks = {}
+        self._stopped.set()
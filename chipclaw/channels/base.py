@@ -1,15 +1,185 @@
 """
 ChipClaw Base Channel
 """
+import random
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from .ratelimit import ALLOW, REJECT
+from ..bus.events import OutboundMessage
+from ..utils import ticks_ms, ticks_diff
+
+CONNECTED = "connected"  # link up, tasks running
+DEGRADED = "degraded"    # retrying, or a task is being restarted
+DOWN = "down"            # not started, stopped, or circuit breaker open
+
+
+class Supervisor:
+    """
+    Health state, reconnect backoff and task restarts for one channel
+    
+    Channels report their link with up() and failure(); failure() returns
+    how long to wait before the next attempt: exponential from
+    reconnect_delay up to reconnect_max, with equal jitter so devices
+    that lost the same broker do not all come back in lockstep. After
+    breaker_threshold failures in a row the circuit opens: the state is
+    DOWN and retries slow to one per breaker_cooldown seconds until a
+    connection succeeds again.
+    
+    run() wraps a background task body and restarts it, with the same
+    backoff, whenever it raises or returns while the channel is running.
+    
+    Args:
+        name: Channel name, for log lines
+        config: Channel config dict; reads reconnect_delay, reconnect_max,
+            reconnect_jitter (0-1), breaker_threshold and breaker_cooldown
+    """
+    
+    def __init__(self, name, config=None):
+        config = config or {}
+        self.name = name
+        self.base_delay = config.get("reconnect_delay", 1)
+        self.max_delay = config.get("reconnect_max", 60)
+        self.jitter = config.get("reconnect_jitter", 0.5)
+        self.threshold = config.get("breaker_threshold", 5)
+        self.cooldown = config.get("breaker_cooldown", 300)
+        self.state = DOWN
+        self.failures = 0       # consecutive link failures
+        self.restarts = 0       # task restarts since start
+        self.last_error = None
+        self.running = True
+        self.tasks = []         # spawned tasks, cancelled by stop()
+        self._changed = ticks_ms()
+    
+    def _set(self, state):
+        if state != self.state:
+            print(f"{self.name} channel {state}")
+            self.state = state
+            self._changed = ticks_ms()
+    
+    def backoff(self, attempts):
+        """
+        Seconds to wait after the given number of consecutive failures
+        
+        Args:
+            attempts: Failures so far (1 for the first)
+        
+        Returns:
+            Delay in seconds, jittered
+        """
+        if attempts >= self.threshold:
+            delay = self.cooldown
+        else:
+            delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        # Equal jitter: part fixed, part random, so retries spread out
+        spread = delay * self.jitter
+        return delay - spread + spread * random.getrandbits(16) / 65536
+    
+    @property
+    def breaker_open(self):
+        return self.failures >= self.threshold
+    
+    def up(self):
+        """Record a working link; closes the circuit breaker"""
+        self.failures = 0
+        self._set(CONNECTED)
+    
+    def failure(self, error):
+        """
+        Record a failed attempt or a lost link
+        
+        Args:
+            error: Exception or reason string
+        
+        Returns:
+            Seconds to wait before trying again
+        """
+        self.failures += 1
+        self.last_error = str(error)
+        self._set(DOWN if self.breaker_open else DEGRADED)
+        return self.backoff(self.failures)
+    
+    async def run(self, label, factory):
+        """
+        Run a channel task, restarting it whenever it dies
+        
+        A task that ran for longer than reconnect_max before dying starts
+        its backoff from the beginning again.
+        
+        Args:
+            label: Task name, for log lines and last_error
+            factory: Callable returning a new coroutine for the task body
+        """
+        attempts = 0
+        while self.running:
+            started = ticks_ms()
+            try:
+                await factory()
+                error = "exited"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+            if not self.running:
+                return
+            if ticks_diff(ticks_ms(), started) > self.max_delay * 1000:
+                attempts = 0
+            attempts += 1
+            self.restarts += 1
+            self.last_error = f"{label}: {error}"
+            before = self.state
+            marked = DOWN if attempts >= self.threshold else DEGRADED
+            self._set(marked)
+            delay = self.backoff(attempts)
+            print(f"{self.name} {label} task died ({error}), restarting in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            # Give back the link state unless the channel reported a new one meanwhile
+            if self.running and self.state == marked:
+                self._set(before)
+    
+    def stop(self):
+        """Cancel supervised tasks and mark the channel DOWN"""
+        self.running = False
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        self._set(DOWN)
+    
+    def stats(self):
+        """Return health as a dict"""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "last_error": self.last_error,
+            "since": ticks_diff(ticks_ms(), self._changed) // 1000
+        }
 
 
 class BaseChannel:
-    """Base class for communication channels"""
+    """
+    Base class for communication channels
+
+    Channels hand inbound messages to handle_inbound(), which applies the
+    shared RateLimiter (set as self.limiter, None = no limit) before the
+    message reaches the bus.
+    
+    self.supervisor tracks the channel's health. Background tasks started
+    with spawn() are restarted if they die; channels call
+    self.supervisor.up() / failure() as their link comes and goes.
+    """
+    
+    RATE_LIMITED_REPLY = "Rate limited, please slow down and try again shortly."
     
     def __init__(self, name, bus, config):
         self.name = name
         self.bus = bus
         self.config = config
+        self.limiter = None
+        self.supervisor = Supervisor(name, config)
     
     async def start(self):
         """
@@ -25,6 +195,26 @@ class BaseChannel:
         """
         raise NotImplementedError("Subclass must implement stop()")
     
+    def spawn(self, label, factory):
+        """
+        Start a supervised background task
+        
+        Args:
+            label: Task name for logs
+            factory: Callable returning the task's coroutine, e.g. self._read_loop
+        
+        Returns:
+            The asyncio Task
+        """
+        self.supervisor.running = True
+        task = asyncio.create_task(self.supervisor.run(label, factory))
+        self.supervisor.tasks.append(task)
+        return task
+    
+    def health(self):
+        """Return the channel's health state: connected, degraded or down"""
+        return self.supervisor.state
+    
     async def send(self, msg):
         """
         Send OutboundMessage
@@ -35,16 +225,65 @@ class BaseChannel:
         """
         raise NotImplementedError("Subclass must implement send()")
     
-    def is_allowed(self, sender_id):
+    def is_allowed(self, sender_id, chat_id=None):
         """
-        Check if sender is authorized
-        Can be overridden for whitelist/blacklist
+        Decide whether sender may send another message now
+        Can be overridden for whitelist/blacklist; handle_inbound() acts
+        on the verdict
+        
+        Takes a rate-limit token when allowed.
         
         Args:
             sender_id: Sender identifier
+            chat_id: Optional chat identifier for the per-chat limit
         
         Returns:
-            Boolean
+            ALLOW, REJECT (refuse and tell the sender) or DROP (refuse
+            quietly) from ratelimit
+        """
+        if self.limiter is None:
+            return ALLOW
+        return self.limiter.check(self.name, sender_id, chat_id)
+    
+    async def handle_inbound(self, msg):
+        """
+        Publish an InboundMessage to the bus if is_allowed() lets it through
+        
+        Over the limit, the sender gets one short reply through
+        send_notice() (the agent is never invoked) and further messages
+        are dropped quietly until tokens refill.
+        
+        Args:
+            msg: InboundMessage instance
+        
+        Returns:
+            True if the message was published
+        """
+        verdict = self.is_allowed(msg.sender_id, msg.chat_id)
+        if verdict == ALLOW:
+            await self.bus.publish_inbound(msg)
+            return True
+        
+        print(f"Rate limited {self.name}:{msg.sender_id}")
+        if verdict == REJECT:
+            await self.send_notice(OutboundMessage(
+                channel=self.name,
+                chat_id=msg.chat_id,
+                content=self.RATE_LIMITED_REPLY,
+                reply_to=msg
+            ))
+        return False
+    
+    async def send_notice(self, msg):
+        """
+        Queue a reply generated by the channel itself
+        
+        Goes through bus.publish_outbound(), which never waits, so a slow
+        or offline link cannot stall the inbound path that produced the
+        notice. Channels whose send() only queues locally may override
+        this to deliver directly.
+        
+        Args:
+            msg: OutboundMessage instance
         """
-        # Default: allow all
-        return True
+        await self.bus.publish_outbound(msg)
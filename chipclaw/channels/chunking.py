@@ -0,0 +1,159 @@
+"""
+ChipClaw MQTT Chunking
+Compressed, sequenced payloads for messages too large to publish whole
+
+Payloads up to the threshold are published unchanged. Larger ones are
+deflate-compressed (when that saves space) and split into chunks, each
+published as its own MQTT message with a 9-byte header:
+
+    MAGIC (0xCC 0x01) | flags u8 | message id u16 | index u16 | count u16
+
+followed by the chunk bytes; all integers are big-endian. FLAG_DEFLATE
+means the concatenated chunks must be inflated (zlib container) to get
+the original payload. 0xCC 0x01 can never start valid UTF-8, so
+receivers tell chunks apart from plain JSON or text by the first two
+bytes. tools/mqtt_decode.py is a standalone reference decoder.
+"""
+import struct
+
+from ..utils import LRUCache, compress, decompress, ticks_ms, ticks_diff
+
+MAGIC = b"\xcc\x01"
+HEADER = ">2sBHHH"
+HEADER_SIZE = 9
+
+FLAG_DEFLATE = 1
+
+
+def is_chunk(payload):
+    """Return True if payload starts with a chunk header"""
+    return len(payload) >= HEADER_SIZE and payload[:2] == MAGIC
+
+
+def split_payload(payload, msg_id, threshold=4096, chunk_size=1024):
+    """
+    Prepare a payload for publishing
+
+    Args:
+        payload: Payload bytes (str is UTF-8 encoded)
+        msg_id: Message id shared by all chunks (wraps at 65536)
+        threshold: Payloads longer than this are chunked (0 disables)
+        chunk_size: Maximum data bytes per chunk
+
+    Returns:
+        List of MQTT payloads: [payload] if it is small enough, otherwise
+        the chunks in order
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if not threshold or len(payload) <= threshold:
+        return [payload]
+
+    flags = 0
+    packed = compress(payload)
+    if packed is not None and len(packed) < len(payload):
+        payload = packed
+        flags |= FLAG_DEFLATE
+    count = (len(payload) + chunk_size - 1) // chunk_size
+    if count > 0xFFFF:
+        raise ValueError("Payload needs more than 65535 chunks")
+    msg_id &= 0xFFFF
+    chunks = []
+    for index in range(count):
+        head = struct.pack(HEADER, MAGIC, flags, msg_id, index, count)
+        chunks.append(head + payload[index * chunk_size:(index + 1) * chunk_size])
+    return chunks
+
+
+class Reassembler:
+    """
+    Rebuilds chunked payloads with bounded memory
+
+    Partial messages are kept in an LRUCache bounded by max_messages and
+    max_bytes, so a flood of unrelated or never-finished messages evicts
+    the oldest ones rather than growing RAM. Partials idle for longer
+    than timeout_ms are dropped as well.
+
+    Args:
+        max_messages: Partial messages held at once
+        max_bytes: Bytes held across all partials, and the largest
+            payload accepted after decompression
+        timeout_ms: Drop a partial message this long after its last chunk
+    """
+
+    def __init__(self, max_messages=4, max_bytes=32768, timeout_ms=30000):
+        self.max_bytes = max_bytes
+        self.timeout_ms = timeout_ms
+        self.completed = 0
+        self.dropped = 0
+        self._partial = LRUCache(max_entries=max_messages, max_bytes=max_bytes,
+                                 on_evict=self._on_evict)
+
+    def _on_evict(self, key, entry):
+        self.dropped += 1
+
+    def _expire(self, now):
+        for key in self._partial.keys():
+            entry = self._partial.peek(key)
+            if ticks_diff(now, entry["updated"]) > self.timeout_ms:
+                self._partial.pop(key)
+                self.dropped += 1
+
+    def feed(self, source, packet):
+        """
+        Add one chunk
+
+        Args:
+            source: Identifies the sender (e.g. the topic), so equal
+                message ids from different senders do not mix
+            packet: Chunk bytes including the header
+
+        Returns:
+            The complete payload bytes once the last chunk arrives,
+            otherwise None
+        """
+        _, flags, msg_id, index, count = struct.unpack_from(HEADER, packet)
+        if not count or index >= count:
+            self.dropped += 1
+            return None
+        now = ticks_ms()
+        self._expire(now)
+
+        key = (source, msg_id)
+        entry = self._partial.get(key)
+        if entry is None or entry["count"] != count:
+            entry = {"count": count, "flags": flags, "chunks": {}, "size": 0}
+        data = packet[HEADER_SIZE:]
+        if index not in entry["chunks"]:
+            entry["chunks"][index] = data
+            entry["size"] += len(data)
+        entry["updated"] = now
+
+        if entry["size"] > self.max_bytes:
+            self._partial.pop(key)
+            self.dropped += 1
+            return None
+        if len(entry["chunks"]) < count:
+            self._partial.put(key, entry, entry["size"])
+            return None
+
+        self._partial.pop(key)
+        payload = b"".join(entry["chunks"][i] for i in range(count))
+        if entry["flags"] & FLAG_DEFLATE:
+            try:
+                payload = decompress(payload, self.max_bytes)
+            except Exception as e:
+                print(f"Dropping chunked payload that failed to inflate: {e}")
+                self.dropped += 1
+                return None
+        self.completed += 1
+        return payload
+
+    def stats(self):
+        """Return reassembly counters as a dict"""
+        return {
+            "partial": len(self._partial),
+            "bytes": self._partial.bytes,
+            "completed": self.completed,
+            "dropped": self.dropped
+        }
@@ -0,0 +1,212 @@
+"""
+ChipClaw UART Framing
+Length-prefixed binary frames for the UART channel
+
+Frame layout:
+    MAGIC (0xC5) | type u8 | flags u8 | body length (varint) | body | CRC16
+
+The CRC is CRC-16/CCITT-FALSE over everything from type to the end of
+body, big-endian. With FLAG_DEFLATE the body is deflate-compressed.
+
+Frame types and bodies (after decompression):
+    TEXT:  varint chat_id length, chat_id, UTF-8 content
+    JSON:  UTF-8 JSON object with the same fields as a text-mode line
+    MEDIA: varint header length, JSON header (chat_id, content, ...), raw bytes
+    BYE:   empty; the sender returns to newline-delimited text
+    CREDIT: varint byte count the host can accept (host to device only);
+           once sent, the device never writes more than it was granted
+
+A link switches to frames when the host sends HANDSHAKE as a text line
+and the device answers with HANDSHAKE_OK.
+"""
+import json
+import struct
+
+from ..utils import compress, decompress
+
+MAGIC = 0xC5
+HANDSHAKE = "CCFRAME 1"
+HANDSHAKE_OK = "CCFRAME OK 1"
+
+TYPE_TEXT = 1
+TYPE_JSON = 2
+TYPE_MEDIA = 3
+TYPE_BYE = 4
+TYPE_CREDIT = 5
+
+FLAG_DEFLATE = 1
+
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data, crc=0xFFFF):
+    """CRC-16/CCITT-FALSE of a bytes-like object"""
+    table = _CRC_TABLE
+    for b in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ b]
+    return crc
+
+
+def encode_varint(n):
+    """Unsigned LEB128 encoding of n"""
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def decode_varint(data, pos):
+    """
+    Decode an unsigned LEB128 value
+
+    Returns:
+        Tuple of (value, position after it), or (None, pos) if data ends
+        before the varint does
+    """
+    value = 0
+    shift = 0
+    while pos < len(data):
+        b = data[pos]
+        pos += 1
+        value |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return value, pos
+        shift += 7
+        if shift > 28:
+            raise ValueError("varint too long")
+    return None, pos
+
+
+def encode_frame(ftype, body, compress_min=256):
+    """
+    Build one frame
+
+    Args:
+        ftype: Frame type (TYPE_*)
+        body: Body bytes
+        compress_min: Deflate bodies at least this long when it saves space
+            (0 disables)
+
+    Returns:
+        Frame bytes
+    """
+    flags = 0
+    if compress_min and len(body) >= compress_min:
+        packed = compress(body)
+        if packed is not None and len(packed) < len(body):
+            body = packed
+            flags |= FLAG_DEFLATE
+    head = bytes((ftype, flags)) + encode_varint(len(body))
+    crc = crc16(body, crc16(head))
+    return bytes((MAGIC,)) + head + body + struct.pack(">H", crc)
+
+
+def text_body(chat_id, content):
+    """Body for a TYPE_TEXT frame"""
+    chat = str(chat_id).encode()
+    return encode_varint(len(chat)) + chat + content.encode()
+
+
+def parse_text_body(body):
+    """Return (chat_id, content) from a TYPE_TEXT body"""
+    n, pos = decode_varint(body, 0)
+    return str(body[pos:pos + n], 'utf-8'), str(body[pos + n:], 'utf-8')
+
+
+def media_body(header, data):
+    """Body for a TYPE_MEDIA frame from a header dict and raw bytes"""
+    head = json.dumps(header).encode()
+    return encode_varint(len(head)) + head + data
+
+
+def parse_media_body(body):
+    """Return (header dict, raw bytes) from a TYPE_MEDIA body"""
+    n, pos = decode_varint(body, 0)
+    return json.loads(str(body[pos:pos + n], 'utf-8')), bytes(body[pos + n:])
+
+
+class FrameDecoder:
+    """
+    Incremental frame parser over a caller-owned bytearray
+
+    Bytes that do not start a valid frame (wrong magic, oversized length,
+    bad CRC) are skipped one at a time until the stream resynchronises,
+    so interleaved log output is tolerated.
+    """
+
+    def __init__(self, max_body=65536):
+        self.max_body = max_body
+        self.errors = 0
+
+    def decode(self, buf, until=None):
+        """
+        Remove complete frames from the front of buf
+
+        Args:
+            buf: bytearray of received bytes; consumed bytes are deleted
+            until: Frame type after which to stop, leaving the rest of buf
+                (e.g. TYPE_BYE, when text follows)
+
+        Returns:
+            List of (type, body bytes) with bodies decompressed
+        """
+        frames = []
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            if buf[pos] != MAGIC:
+                pos += 1
+                continue
+            if end - pos < 4:
+                break
+            try:
+                length, body_start = decode_varint(buf, pos + 3)
+            except ValueError:
+                length, body_start = self.max_body + 1, pos + 3
+            if length is None:
+                break
+            if length > self.max_body:
+                self.errors += 1
+                pos += 1
+                continue
+            frame_end = body_start + length + 2
+            if frame_end > end:
+                break
+            crc = (buf[frame_end - 2] << 8) | buf[frame_end - 1]
+            mv = memoryview(buf)
+            ok = crc16(mv[pos + 1:frame_end - 2]) == crc
+            body = bytes(mv[body_start:frame_end - 2]) if ok else None
+            del mv
+            if not ok:
+                self.errors += 1
+                pos += 1
+                continue
+            ftype, flags = buf[pos + 1], buf[pos + 2]
+            if flags & FLAG_DEFLATE:
+                try:
+                    body = decompress(body, self.max_body)
+                except Exception:
+                    # Corrupt or oversized once inflated: skip the whole frame
+                    self.errors += 1
+                    pos = frame_end
+                    continue
+            frames.append((ftype, body))
+            pos = frame_end
+            if ftype == until:
+                break
+        if pos:
+            del buf[:pos]
+        return frames
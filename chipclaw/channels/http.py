@@ -0,0 +1,373 @@
+"""
+ChipClaw HTTP Channel
+Small HTTP/1.1 server for LAN clients: POST /chat with Server-Sent Events
+"""
+import json
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from .base import BaseChannel
+from ..bus.events import InboundMessage
+from ..bus.queue import Queue
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    431: "Request Header Fields Too Large",
+    503: "Service Unavailable",
+    504: "Gateway Timeout"
+}
+
+
+async def read_head(reader, max_header):
+    """
+    Read a request line and headers
+
+    Returns:
+        Tuple of (method, target, headers dict with lower-case names)
+
+    Raises:
+        ValueError: With the HTTP status code as its argument
+    """
+    line = await reader.readline()
+    parts = line.decode().split()
+    if len(parts) != 3:
+        raise ValueError(400)
+
+    headers = {}
+    size = len(line)
+    while True:
+        line = await reader.readline()
+        size += len(line)
+        if size > max_header:
+            raise ValueError(431)
+        line = line.decode().strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return parts[0], parts[1], headers
+
+
+def parse_target(target):
+    """
+    Split a request target into path and query parameters
+
+    Values are taken literally (no percent-decoding), which is enough for
+    ids and tokens.
+
+    Returns:
+        Tuple of (path, params dict)
+    """
+    path, _, query = target.partition("?")
+    params = {}
+    for pair in query.split("&"):
+        if pair:
+            name, _, value = pair.partition("=")
+            params[name] = value
+    return path, params
+
+
+def response_head(status, extra=""):
+    """Status line and headers for a Connection: close response"""
+    return f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n{extra}Connection: close\r\n\r\n"
+
+
+class _Waiter:
+    """An open POST /chat waiting for replies"""
+
+    __slots__ = ("inbound", "chat_id", "queue")
+
+    def __init__(self, inbound):
+        self.inbound = inbound
+        self.chat_id = inbound.chat_id
+        self.queue = Queue()
+
+
+class HTTPChannel(BaseChannel):
+    """
+    HTTP channel built on asyncio.start_server
+
+    Endpoints:
+        POST /chat: body is JSON {"content", "chat_id"?, "sender_id"?} or
+            plain text. Replies stream back as Server-Sent Events:
+            "message" events for each OutboundMessage to the chat, then
+            "done" after the reply to this request. With
+            "Accept: application/json" the final reply is returned as a
+            single JSON object instead.
+        GET /metrics: bus queue counters, latencies and HTTP counters as JSON
+
+    Each connection serves one request and is then closed. At most
+    max_connections are handled at once; extra ones get 503 straight
+    away so a busy device sheds load instead of queueing sockets. When a
+    token is configured, requests need "Authorization: Bearer <token>".
+    Without one, a client-chosen chat_id is prefixed with the peer
+    address ("<ip>:<id>"), so one LAN client cannot post into or read
+    another's chat.
+    """
+
+    def __init__(self, bus, config):
+        super().__init__("http", bus, config)
+        self.host = config.get("host", "0.0.0.0")
+        self.port = config.get("port", 8080)
+        self.max_connections = config.get("max_connections", 4)
+        self.max_body = config.get("max_body", 16384)
+        self.max_header = config.get("max_header", 4096)
+        self.token = config.get("token", "")
+        self.header_timeout = config.get("header_timeout", 10)
+        self.reply_timeout = config.get("reply_timeout", 120)
+        self.ping_interval = config.get("ping_interval", 15)
+        self.server = None
+        self.connections = 0
+        self._writers = set()
+        self.stats = {"requests": 0, "rejected": 0, "errors": 0}
+        self._waiters = []
+
+    async def start(self):
+        """Start listening"""
+        print(f"Starting HTTP channel on {self.host}:{self.port}")
+        try:
+            self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        except Exception as e:
+            self.supervisor.failure(e)
+            raise
+        self.supervisor.up()
+
+    async def _read_request(self, reader):
+        """
+        Read one request
+
+        Returns:
+            Tuple of (method, path, headers dict with lower-case names, body)
+
+        Raises:
+            ValueError: With the HTTP status code as its argument
+        """
+        method, target, headers = await read_head(reader, self.max_header)
+        length = int(headers.get("content-length", "0") or 0)
+        if length > self.max_body:
+            raise ValueError(413)
+        body = await reader.readexactly(length) if length else b""
+        return method, parse_target(target)[0], headers, body
+
+    async def _respond(self, writer, status, body=b"", content_type="application/json", extra=""):
+        if isinstance(body, str):
+            body = body.encode()
+        head = response_head(status, f"Content-Type: {content_type}\r\n"
+                                     f"Content-Length: {len(body)}\r\n{extra}")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def _discard_input(self, reader):
+        """Swallow request bytes already sent, so closing does not reset the reply"""
+        try:
+            await asyncio.wait_for(reader.read(self.max_header + self.max_body), 0.05)
+        except Exception:
+            pass
+
+    async def _error(self, writer, status, message=None, extra=""):
+        body = json.dumps({"error": message or REASONS.get(status, "")})
+        await self._respond(writer, status, body, extra=extra)
+
+    async def _serve(self, reader, writer):
+        """Handle one connection"""
+        if self.connections >= self.max_connections:
+            self.stats["rejected"] += 1
+            try:
+                await self._discard_input(reader)
+                await self._error(writer, 503, "Too many connections", "Retry-After: 1\r\n")
+            except Exception:
+                pass
+            await self._close(writer)
+            return
+
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            try:
+                method, path, headers, body = await asyncio.wait_for(
+                    self._read_request(reader), self.header_timeout)
+            except ValueError as e:
+                status = e.args[0] if e.args and isinstance(e.args[0], int) else 400
+                await self._discard_input(reader)
+                await self._error(writer, status)
+                return
+            self.stats["requests"] += 1
+
+            if self.token and headers.get("authorization") != f"Bearer {self.token}":
+                await self._error(writer, 401)
+            elif path == "/chat":
+                if method != "POST":
+                    await self._error(writer, 405, extra="Allow: POST\r\n")
+                else:
+                    await self._chat(reader, writer, headers, body)
+            elif path == "/metrics":
+                if method != "GET":
+                    await self._error(writer, 405, extra="Allow: GET\r\n")
+                else:
+                    await self._respond(writer, 200, json.dumps(self.metrics()))
+            else:
+                await self._error(writer, 404)
+
+        except Exception as e:
+            # Timeouts and clients that hang up mid-request
+            self.stats["errors"] += 1
+            print(f"HTTP request error: {e}")
+
+        finally:
+            self.connections -= 1
+            self._writers.discard(writer)
+            await self._close(writer)
+
+    async def _close(self, writer):
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+    def _parse_chat(self, headers, body, peer):
+        """Build the InboundMessage for a POST /chat body"""
+        text = body.decode()
+        data = None
+        if "json" in headers.get("content-type", "") or text.startswith("{"):
+            data = json.loads(text)
+            if not isinstance(data, dict):
+                raise ValueError("Body must be a JSON object")
+        if data is None:
+            data = {"content": text}
+        if not data.get("content"):
+            raise ValueError("Missing content")
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            chat_id = f"http_{peer}"
+        elif not self.token:
+            chat_id = f"{peer}:{chat_id}"
+        return InboundMessage(
+            channel="http",
+            sender_id=str(data.get("sender_id", peer)),
+            chat_id=str(chat_id),
+            content=data["content"]
+        )
+
+    async def _chat(self, reader, writer, headers, body):
+        """POST /chat: publish the message and stream replies back"""
+        peer = writer.get_extra_info("peername")
+        peer = peer[0] if peer else "unknown"
+        try:
+            inbound = self._parse_chat(headers, body, peer)
+        except (ValueError, UnicodeError) as e:
+            await self._error(writer, 400, str(e))
+            return
+
+        as_json = "application/json" in headers.get("accept", "")
+        waiter = _Waiter(inbound)
+        self._waiters.append(waiter)
+        try:
+            if not await self.handle_inbound(inbound) and waiter.queue.empty():
+                # Rate limited and already told once: refuse without a body to stream
+                await self._error(writer, 429, "Rate limited", "Retry-After: 5\r\n")
+                return
+            if as_json:
+                await self._reply_json(writer, waiter)
+            else:
+                await self._reply_sse(writer, waiter)
+        finally:
+            self._waiters.remove(waiter)
+
+    def _event(self, name, msg):
+        data = json.dumps({"content": msg.content, "chat_id": msg.chat_id})
+        return f"event: {name}\ndata: {data}\n\n".encode()
+
+    async def _reply_sse(self, writer, waiter):
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\n"
+                     b"Connection: close\r\n\r\n")
+        await writer.drain()
+        remaining = self.reply_timeout
+        while remaining > 0:
+            wait = min(self.ping_interval, remaining)
+            try:
+                msg = await asyncio.wait_for(waiter.queue.get(), wait)
+            except asyncio.TimeoutError:
+                remaining -= wait
+                writer.write(b": ping\n\n")  # keeps proxies and browsers from timing out
+                await writer.drain()
+                continue
+            writer.write(self._event("message", msg))
+            if msg.reply_to is waiter.inbound:
+                writer.write(b"event: done\ndata: {}\n\n")
+                await writer.drain()
+                return
+            await writer.drain()
+        writer.write(b"event: error\ndata: {\"error\": \"Reply timeout\"}\n\n")
+        await writer.drain()
+
+    async def _reply_json(self, writer, waiter):
+        try:
+            while True:
+                msg = await asyncio.wait_for(waiter.queue.get(), self.reply_timeout)
+                if msg.reply_to is waiter.inbound:
+                    break
+        except asyncio.TimeoutError:
+            await self._error(writer, 504, "Reply timeout")
+            return
+        await self._respond(writer, 200, json.dumps({"content": msg.content, "chat_id": msg.chat_id}))
+
+    def metrics(self):
+        """Return bus and HTTP counters as a dict"""
+        http = dict(self.stats)
+        http["connections"] = self.connections
+        http["waiting"] = len(self._waiters)
+        data = {
+            "queues": self.bus.stats(),
+            "latency": self.bus.latency(),
+            "health": self.bus.health(),
+            "http": http
+        }
+        if self.limiter is not None:
+            data["rate_limit"] = self.limiter.stats()
+        return data
+
+    async def send(self, msg):
+        """
+        Deliver an OutboundMessage to the open requests it belongs to
+
+        A reply goes to the request it answers; other messages for the
+        chat (e.g. from the message tool) go to every open request for it.
+        """
+        targets = [w for w in self._waiters if msg.reply_to is w.inbound]
+        if not targets:
+            targets = [w for w in self._waiters if w.chat_id == msg.chat_id]
+        if not targets:
+            print(f"HTTP reply for {msg.chat_id} has no open request, dropping")
+        for waiter in targets:
+            waiter.queue.put_nowait(msg)
+
+    async def send_notice(self, msg):
+        """
+        Deliver straight to the waiting request
+
+        send() only queues locally, and the request handler checks the
+        waiter as soon as handle_inbound() returns.
+        """
+        await self.send(msg)
+
+    async def stop(self):
+        """Stop listening and drop open connections"""
+        self.supervisor.stop()
+        if self.server:
+            self.server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self.server.wait_closed()
+            self.server = None
@@ -8,113 +8,238 @@ try:
 except ImportError:
     import asyncio
 
-try:
-    from umqtt.robust import MQTTClient
-    MQTT_AVAILABLE = True
-except ImportError:
-    MQTT_AVAILABLE = False
-
 from .base import BaseChannel
+from .mqtt_client import MQTTClient, match_topic
+from .chunking import Reassembler, split_payload, is_chunk
 from ..bus.events import InboundMessage
 
 
 class MQTTChannel(BaseChannel):
-    """MQTT communication channel"""
+    """
+    MQTT communication channel
+
+    Uses the asyncio MQTTClient, so incoming messages are handled as soon
+    as they arrive and a slow broker never blocks the event loop. A
+    connection task reconnects whenever the client drops, with the
+    jittered backoff and circuit breaker of self.supervisor, which also
+    restarts the channel's tasks if they die.
+
+    Topics are templates: {client_id} is filled in from the config, and
+    {chat_id} in topic_in becomes a + wildcard whose level is the inbound
+    chat_id (any other + or # works too; the last one wins). In topic_out,
+    {chat_id} is the reply's chat, so each chat only receives its own
+    replies. With share_group set, topic_in is subscribed as
+    $share/<group>/... so several devices split one inbound stream.
+
+    Payloads over chunk_threshold bytes are compressed and split into
+    chunk_size pieces (see chunking.py); chunked inbound messages are
+    reassembled within the reassembly limits before parsing.
+
+    With a Spool, replies that cannot be published (not connected, or the
+    publish raised) are written to flash and drained in order once the
+    broker connection is back. While the spool holds anything, new replies
+    queue behind it so ordering is kept. A publish cancelled by the bus's
+    send_timeout is spooled too, and ack_timeout is kept under half of
+    send_timeout so a missing PUBACK normally fails before that.
+    """
     
-    def __init__(self, bus, config):
+    def __init__(self, bus, config, spool=None):
         super().__init__("mqtt", bus, config)
         self.client = None
-        self.topic_in = config.get("topic_in", "chipclaw/in")
-        self.topic_out = config.get("topic_out", "chipclaw/out")
+        self.client_id = config.get("client_id", "chipclaw-01")
+        self.topic_in = self._expand(config.get("topic_in", "chipclaw/in")).replace("{chat_id}", "+")
+        self.topic_out = self._expand(config.get("topic_out", "chipclaw/out"))
+        self.metrics_topic = self._expand(config.get("metrics_topic", "chipclaw/metrics"))
+        self.share_group = config.get("share_group", "")
+        self.subscription = self.topic_in
+        if self.share_group:
+            self.subscription = f"$share/{self.share_group}/{self.topic_in}"
+        self.metrics_interval = config.get("metrics_interval", 0)  # seconds, 0 = off
+        self.qos = config.get("qos", 0)
+        self.ack_timeout = config.get("ack_timeout", 5)
+        send_timeout = getattr(bus, "send_timeout", None)
+        if send_timeout:
+            self.ack_timeout = min(self.ack_timeout, send_timeout / 2)
+        self.chunk_threshold = config.get("chunk_threshold", 4096)  # 0 = off
+        self.chunk_size = config.get("chunk_size", 1024)
+        reassembly = config.get("reassembly") or {}
+        self.reassembler = Reassembler(
+            max_messages=reassembly.get("max_messages", 4),
+            max_bytes=reassembly.get("max_bytes", 32768),
+            timeout_ms=reassembly.get("timeout", 30) * 1000
+        )
+        self._msg_id = 0
+        self.spool = spool
+        self.connected = False
+        self._drain_event = asyncio.Event()
         self._running = False
     
+    def _expand(self, template):
+        """Fill in {client_id}; {chat_id} is left for later"""
+        return template.replace("{client_id}", self.client_id)
+    
+    def _reply_topic(self, chat_id):
+        """topic_out for a chat; wildcard characters cannot appear in a topic name"""
+        if "{chat_id}" not in self.topic_out:
+            return self.topic_out
+        chat = str(chat_id).replace("+", "_").replace("#", "_")
+        return self.topic_out.replace("{chat_id}", chat)
+    
     async def start(self):
-        """Connect to MQTT broker and start listening"""
-        if not MQTT_AVAILABLE:
-            print("Error: MQTT not available (umqtt not installed)")
-            return
-        
+        """Create the client and start the connection task"""
         print(f"Starting MQTT channel: {self.config.get('broker')}:{self.config.get('port')}")
         
-        try:
-            self.client = MQTTClient(
-                client_id=self.config.get("client_id", "chipclaw-01"),
-                server=self.config.get("broker", "localhost"),
-                port=self.config.get("port", 1883),
-                user=self.config.get("username") or None,
-                password=self.config.get("password") or None
-            )
-            
-            # Set callback for incoming messages
-            self.client.set_callback(self._on_message)
-            
-            # Connect and subscribe
-            self.client.connect()
-            self.client.subscribe(self.topic_in)
-            
-            print(f"MQTT connected, subscribed to {self.topic_in}")
-            
-            # Start poll loop
-            self._running = True
-            asyncio.create_task(self._poll_loop())
+        self.client = MQTTClient(
+            client_id=self.client_id,
+            server=self.config.get("broker", "localhost"),
+            port=self.config.get("port", 1883),
+            user=self.config.get("username") or None,
+            password=self.config.get("password") or None,
+            keepalive=self.config.get("keepalive", 60),
+            on_message=self._on_message,
+            ack_timeout=self.ack_timeout,
+            max_packet=self.config.get("max_packet", 16384)
+        )
         
-        except Exception as e:
-            print(f"Error starting MQTT channel: {e}")
+        self._running = True
+        self.spawn("connection", self._connection_loop)
+        if self.metrics_interval:
+            self.spawn("metrics", self._metrics_loop)
+        if self.spool:
+            self.spawn("drain", self._drain_loop)
     
-    def _on_message(self, topic, msg):
+    async def _connection_loop(self):
+        """Connect, subscribe, wait for the link to drop, and repeat"""
+        while self._running:
+            try:
+                await self.client.connect()
+                await self.client.subscribe(self.subscription, self.qos)
+            except Exception as e:
+                await self.client.disconnect()
+                delay = self.supervisor.failure(e)
+                print(f"MQTT connect failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+            
+            print(f"MQTT connected, subscribed to {self.subscription}")
+            self.supervisor.up()
+            self.connected = True
+            # Deliver anything spooled while offline or before a restart
+            self._drain_event.set()
+            await self.client.closed.wait()
+            self.connected = False
+            if self._running:
+                delay = self.supervisor.failure("connection lost")
+                print(f"MQTT disconnected, reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    
+    async def _on_message(self, topic, msg):
         """
-        MQTT message callback
-        Note: This is synchronous, need to schedule async task
+        Turn an incoming MQTT message into an InboundMessage
+        
+        The chat_id comes from the topic when topic_in has a wildcard,
+        otherwise from the JSON body (defaulting to the topic). Payloads
+        that are not JSON are taken as plain text. Without a sender_id the
+        chat_id stands in, so anonymous publishers on different topics get
+        separate rate-limit buckets.
         """
+        if is_chunk(msg):
+            msg = self.reassembler.feed(topic, msg)
+            if msg is None:
+                return  # waiting for more chunks
+        captures = match_topic(self.topic_in, topic)
         try:
-            # Parse JSON message
-            data = json.loads(msg.decode())
-            
-            # Create InboundMessage
+            text = msg.decode()
+            try:
+                data = json.loads(text)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                data = {"content": text}
+            chat_id = captures[-1] if captures and captures[-1] else data.get("chat_id", topic)
             inbound = InboundMessage(
                 channel="mqtt",
-                sender_id=data.get("sender_id", "unknown"),
-                chat_id=data.get("chat_id", topic.decode()),
+                sender_id=data.get("sender_id") or chat_id,
+                chat_id=chat_id,
                 content=data.get("content", "")
             )
-            
-            # Schedule publish to bus
-            asyncio.create_task(self.bus.publish_inbound(inbound))
-        
         except Exception as e:
             print(f"Error parsing MQTT message: {e}")
+            return
+        await self.handle_inbound(inbound)
+    
+    async def _publish(self, topic, payload):
+        """Publish a payload, chunked if it is over chunk_threshold"""
+        self._msg_id = (self._msg_id + 1) & 0xFFFF
+        for packet in split_payload(payload, self._msg_id, self.chunk_threshold, self.chunk_size):
+            await self.client.publish(topic, packet, self.qos)
     
-    async def _poll_loop(self):
-        """Background loop to check for MQTT messages"""
+    async def _metrics_loop(self):
+        """Periodically publish bus queue counters and latencies"""
         while self._running:
+            await asyncio.sleep(self.metrics_interval)
+            if not self.connected:
+                continue
             try:
-                if self.client:
-                    # Check for messages (non-blocking)
-                    self.client.check_msg()
-                await asyncio.sleep_ms(100)
+                payload = json.dumps({
+                    "queues": self.bus.stats(),
+                    "latency": self.bus.latency(),
+                    "health": self.bus.health()
+                })
+                await self.client.publish(self.metrics_topic, payload)
             except Exception as e:
-                print(f"Error in MQTT poll loop: {e}")
-                # Try to reconnect
-                await asyncio.sleep(5)
-                try:
-                    self.client.connect()
-                    self.client.subscribe(self.topic_in)
-                except:
-                    pass
+                print(f"Error publishing MQTT metrics: {e}")
+    
+    async def _publish_record(self, record):
+        """Publish a spooled record; raises while disconnected"""
+        if not self.connected:
+            raise OSError("MQTT not connected")
+        await self._publish(record["topic"], record["payload"])
+    
+    async def _drain_loop(self):
+        """Drain the spool whenever connected, backing off after failures"""
+        while self._running:
+            await self._drain_event.wait()
+            self._drain_event.clear()
+            while self._running and self.connected and self.spool.pending():
+                delay = await self.spool.drain(self._publish_record)
+                if delay:
+                    print(f"MQTT spool retry in {delay:.1f}s")
+                    await asyncio.sleep(delay)
     
     async def send(self, msg):
         """Send OutboundMessage via MQTT"""
-        if not self.client:
+        payload = json.dumps({
+            "content": msg.content,
+            "chat_id": msg.chat_id
+        })
+        topic = self._reply_topic(msg.chat_id)
+        
+        if self.spool:
+            # Publish directly only when nothing older is waiting
+            if self.connected and not self.spool.pending():
+                try:
+                    await self._publish(topic, payload)
+                    print(f"MQTT sent to {topic}")
+                    return
+                except asyncio.CancelledError:
+                    # Cut off by the bus send_timeout; may be delivered twice
+                    self.spool.append({"topic": topic, "payload": payload})
+                    self._drain_event.set()
+                    raise
+                except Exception as e:
+                    print(f"Error sending MQTT message, spooling: {e}")
+            self.spool.append({"topic": topic, "payload": payload})
+            self._drain_event.set()
+            return
+        
+        if not self.connected:
             print("Error: MQTT client not connected")
             return
         
         try:
-            payload = json.dumps({
-                "content": msg.content,
-                "chat_id": msg.chat_id
-            })
-            self.client.publish(self.topic_out, payload)
-            print(f"MQTT sent to {self.topic_out}")
+            await self._publish(topic, payload)
+            print(f"MQTT sent to {topic}")
         
         except Exception as e:
             print(f"Error sending MQTT message: {e}")
@@ -122,8 +247,8 @@ class MQTTChannel(BaseChannel):
     async def stop(self):
         """Stop MQTT channel"""
         self._running = False
+        self.supervisor.stop()
+        self.connected = False
+        self._drain_event.set()
         if self.client:
-            try:
-                self.client.disconnect()
-            except:
-                pass
+            await self.client.disconnect()
@@ -0,0 +1,345 @@
+"""
+ChipClaw MQTT Client
+Minimal MQTT 3.1.1 client on asyncio streams (replaces umqtt.robust)
+
+Supports CONNECT with keepalive, SUBSCRIBE, PUBLISH at QoS 0 and 1 in
+both directions, and DISCONNECT. Reconnecting is left to the caller: when
+the connection drops, `closed` is set and pending operations fail with
+OSError.
+"""
+import struct
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from ..utils import ticks_ms, ticks_diff
+from ..bus.queue import Queue
+
+CONNECT = 0x10
+CONNACK = 0x20
+PUBLISH = 0x30
+PUBACK = 0x40
+SUBSCRIBE = 0x82
+SUBACK = 0x90
+PINGREQ = 0xC0
+PINGRESP = 0xD0
+DISCONNECT = 0xE0
+
+
+def _encode_length(n):
+    """MQTT remaining-length encoding"""
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(out)
+
+
+def _encode_str(s):
+    if isinstance(s, str):
+        s = s.encode()
+    return struct.pack(">H", len(s)) + s
+
+
+def _packet(header, body):
+    return bytes((header,)) + _encode_length(len(body)) + body
+
+
+def match_topic(topic_filter, topic):
+    """
+    Match a topic against a subscription filter
+
+    Args:
+        topic_filter: Filter with optional + and # wildcards
+        topic: Concrete topic name
+
+    Returns:
+        List of the levels matched by each wildcard (a # capture keeps its
+        slashes), or None if the topic does not match
+    """
+    if topic_filter.startswith("$share/"):
+        topic_filter = topic_filter.split("/", 2)[2]
+    levels = topic.split("/")
+    captures = []
+    for i, part in enumerate(topic_filter.split("/")):
+        if part == "#":
+            captures.append("/".join(levels[i:]))
+            return captures
+        if i >= len(levels):
+            return None
+        if part == "+":
+            captures.append(levels[i])
+        elif part != levels[i]:
+            return None
+    return captures if len(levels) == i + 1 else None
+
+
+class MQTTClient:
+    """
+    Asyncio MQTT 3.1.1 client
+
+    Args:
+        client_id: Client identifier
+        server: Broker host
+        port: Broker port
+        user: Optional username
+        password: Optional password
+        keepalive: Keepalive in seconds (0 disables pings)
+        on_message: Async function(topic str, payload bytes) for PUBLISH
+            packets from the broker
+        ack_timeout: Seconds to wait for CONNACK/SUBACK/PUBACK
+        max_inflight: Most QoS 1 publishes awaiting PUBACK at once
+        max_inbox: Most received messages waiting for on_message; more
+            are dropped
+        max_packet: Largest packet body accepted; bigger packets are read
+            off the socket in small pieces and discarded (0 = no limit)
+
+    on_message runs on its own task, so a handler may publish at QoS 1
+    while the read loop keeps collecting the PUBACK.
+    """
+
+    def __init__(self, client_id, server, port=1883, user=None, password=None,
+                 keepalive=60, on_message=None, ack_timeout=10, max_inflight=8,
+                 max_inbox=16, max_packet=16384):
+        self.client_id = client_id
+        self.server = server
+        self.port = port
+        self.user = user
+        self.password = password
+        self.keepalive = keepalive
+        self.on_message = on_message
+        self.ack_timeout = ack_timeout
+        self.max_inflight = max_inflight
+        self.max_packet = max_packet
+        self.oversize = 0
+        self.closed = asyncio.Event()
+        self.closed.set()
+        self._reader = None
+        self._writer = None
+        self._pid = 0
+        self._pending = {}   # {packet id: [Event, result]}
+        self._inflight_free = asyncio.Event()
+        self._inbox = Queue(max_inbox)
+        self.dropped = 0
+        self._tasks = []
+        self._last_rx = 0
+        self._last_tx = 0
+
+    @property
+    def connected(self):
+        return not self.closed.is_set()
+
+    @property
+    def inflight(self):
+        """Number of QoS 1 publishes waiting for PUBACK"""
+        return len(self._pending)
+
+    def _next_pid(self):
+        while True:
+            self._pid = self._pid % 0xFFFF + 1
+            if self._pid not in self._pending:
+                return self._pid
+
+    async def _send(self, data):
+        if self._writer is None:
+            raise OSError("MQTT not connected")
+        self._writer.write(data)
+        await self._writer.drain()
+        self._last_tx = ticks_ms()
+
+    async def _read_packet(self):
+        """Return (header byte, body bytes) of the next packet within max_packet"""
+        while True:
+            header = (await self._reader.readexactly(1))[0]
+            length = 0
+            shift = 0
+            while True:
+                b = (await self._reader.readexactly(1))[0]
+                length |= (b & 0x7F) << shift
+                if not b & 0x80:
+                    break
+                shift += 7
+                if shift > 21:
+                    raise OSError("Malformed MQTT length")
+            if self.max_packet and length > self.max_packet:
+                # Never buffer it: drain in small reads and move on
+                while length:
+                    n = min(length, 512)
+                    await self._reader.readexactly(n)
+                    length -= n
+                self._last_rx = ticks_ms()
+                self.oversize += 1
+                print(f"MQTT packet over {self.max_packet} bytes, discarded")
+                continue
+            body = await self._reader.readexactly(length) if length else b''
+            self._last_rx = ticks_ms()
+            return header, body
+
+    async def connect(self, clean_session=True):
+        """Open the connection and wait for CONNACK"""
+        self._reader, self._writer = await asyncio.open_connection(self.server, self.port)
+        flags = 0x02 if clean_session else 0
+        payload = _encode_str(self.client_id)
+        if self.user:
+            flags |= 0x80
+            payload += _encode_str(self.user)
+            if self.password:
+                flags |= 0x40
+                payload += _encode_str(self.password)
+        body = _encode_str("MQTT") + bytes((4, flags)) + struct.pack(">H", int(self.keepalive)) + payload
+        try:
+            await self._send(_packet(CONNECT, body))
+            header, body = await asyncio.wait_for(self._read_packet(), self.ack_timeout)
+            if header != CONNACK or len(body) != 2:
+                raise OSError("Expected CONNACK")
+            if body[1]:
+                raise OSError(f"MQTT connection refused (code {body[1]})")
+        except Exception:
+            self._close_transport()
+            raise
+
+        self.closed.clear()
+        self._tasks = [asyncio.create_task(self._read_loop())]
+        if self.on_message:
+            self._tasks.append(asyncio.create_task(self._dispatch_loop()))
+        if self.keepalive:
+            self._tasks.append(asyncio.create_task(self._ping_loop()))
+
+    async def _request(self, pid, data):
+        """Send a packet and wait for the ack carrying pid"""
+        entry = [asyncio.Event(), None]
+        self._pending[pid] = entry
+        try:
+            await self._send(data)
+            await asyncio.wait_for(entry[0].wait(), self.ack_timeout)
+        except asyncio.TimeoutError:
+            raise OSError(f"MQTT ack timeout (packet {pid})")
+        finally:
+            self._pending.pop(pid, None)
+            self._inflight_free.set()
+        if entry[1] is None:
+            raise OSError("MQTT connection lost")
+        return entry[1]
+
+    async def subscribe(self, topic, qos=0):
+        """Subscribe and wait for SUBACK; returns the granted QoS"""
+        pid = self._next_pid()
+        body = struct.pack(">H", pid) + _encode_str(topic) + bytes((qos,))
+        codes = await self._request(pid, _packet(SUBSCRIBE, body))
+        if codes[0] == 0x80:
+            raise OSError(f"MQTT subscribe to {topic} refused")
+        return codes[0]
+
+    async def publish(self, topic, payload, qos=0, retain=False):
+        """
+        Publish a message
+
+        QoS 0 returns once the packet is written; QoS 1 returns once the
+        broker's PUBACK arrives and raises OSError on timeout or
+        disconnect.
+        """
+        if isinstance(payload, str):
+            payload = payload.encode()
+        header = PUBLISH | (qos << 1) | (1 if retain else 0)
+        if not qos:
+            await self._send(_packet(header, _encode_str(topic) + payload))
+            return
+        while len(self._pending) >= self.max_inflight:
+            self._inflight_free.clear()
+            await self._inflight_free.wait()
+        pid = self._next_pid()
+        body = _encode_str(topic) + struct.pack(">H", pid) + payload
+        await self._request(pid, _packet(header, body))
+
+    async def _read_loop(self):
+        try:
+            while True:
+                header, body = await self._read_packet()
+                kind = header & 0xF0
+                if kind == PUBLISH:
+                    await self._handle_publish(header, body)
+                elif kind in (PUBACK, SUBACK):
+                    pid = struct.unpack_from(">H", body)[0]
+                    entry = self._pending.get(pid)
+                    if entry:
+                        entry[1] = body[2:] if kind == SUBACK else True
+                        entry[0].set()
+                # PINGRESP only refreshes _last_rx
+        except Exception as e:
+            if self.connected:
+                print(f"MQTT connection lost: {e}")
+        self._close_transport()
+
+    async def _handle_publish(self, header, body):
+        qos = (header >> 1) & 0x03
+        n = struct.unpack_from(">H", body)[0]
+        topic = str(body[2:2 + n], 'utf-8')
+        pos = 2 + n
+        if qos:
+            pid = body[pos:pos + 2]
+            pos += 2
+            await self._send(_packet(PUBACK, pid))
+        if not self.on_message:
+            return
+        if self._inbox.full():
+            self.dropped += 1
+            print(f"MQTT inbox full, dropping message on {topic}")
+            return
+        self._inbox.put_nowait((topic, body[pos:]))
+
+    async def _dispatch_loop(self):
+        """Hand received messages to on_message off the read loop"""
+        while True:
+            topic, payload = await self._inbox.get()
+            try:
+                await self.on_message(topic, payload)
+            except Exception as e:
+                print(f"Error in MQTT message handler: {e}")
+
+    async def _ping_loop(self):
+        """Ping when idle; drop the connection if the broker goes silent"""
+        interval = self.keepalive * 1000
+        try:
+            while self.connected:
+                await asyncio.sleep(self.keepalive / 4)
+                now = ticks_ms()
+                if ticks_diff(now, self._last_rx) > interval * 3 // 2:
+                    print("MQTT keepalive timeout")
+                    break
+                if ticks_diff(now, self._last_tx) >= interval // 2:
+                    await self._send(_packet(PINGREQ, b''))
+        except Exception:
+            pass
+        self._close_transport()
+
+    def _close_transport(self):
+        """Drop the socket and fail everything waiting on it"""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        self._reader = self._writer = None
+        for entry in self._pending.values():
+            entry[0].set()  # result stays None: connection lost
+        self._inflight_free.set()
+        if not self.closed.is_set():
+            self.closed.set()
+            current = asyncio.current_task() if hasattr(asyncio, "current_task") else None
+            for task in self._tasks:
+                if task is not current:
+                    task.cancel()
+            self._tasks = []
+
+    async def disconnect(self):
+        """Send DISCONNECT and close"""
+        if self.connected:
+            try:
+                await self._send(_packet(DISCONNECT, b''))
+            except Exception:
+                pass
+        self._close_transport()
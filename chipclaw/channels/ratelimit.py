@@ -0,0 +1,92 @@
+"""
+ChipClaw Rate Limiter
+Token buckets per sender and per chat, held in a bounded LRU
+"""
+from ..utils import LRUCache, ticks_ms, ticks_diff
+
+ALLOW = 0    # within limits
+REJECT = 1   # over a limit; tell the sender
+DROP = 2     # still over a limit and already told; stay quiet
+
+
+class RateLimiter:
+    """
+    Admission control for inbound messages
+
+    Each sender and each chat has a bucket that refills at *_rate tokens
+    per second up to *_burst. A message needs a token from both buckets.
+    Buckets live in an LRUCache of max_keys entries, so memory is fixed
+    no matter how many sender ids appear; an evicted bucket comes back
+    full, which only errs on the side of letting a message through.
+
+    The first rejection in a run returns REJECT so the channel can send
+    one "rate limited" notice; later ones return DROP until a message is
+    allowed again, so a flood does not turn into a flood of notices.
+
+    Args:
+        config: Optional dict with sender_rate, sender_burst, chat_rate,
+            chat_burst, max_keys and exempt (list of channel names)
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.sender_rate = config.get("sender_rate", 0.2)
+        self.sender_burst = config.get("sender_burst", 5)
+        self.chat_rate = config.get("chat_rate", 0.5)
+        self.chat_burst = config.get("chat_burst", 10)
+        self.exempt = config.get("exempt", [])
+        self.allowed = 0
+        self.limited = 0
+        self._buckets = LRUCache(max_entries=config.get("max_keys", 64))
+
+    def _bucket(self, key, rate, burst, now):
+        """Return the refilled [tokens, last_ms, notified] bucket for key"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [burst, now, False]
+            self._buckets.put(key, bucket)
+        else:
+            bucket[0] = min(burst, bucket[0] + ticks_diff(now, bucket[1]) * rate / 1000)
+            bucket[1] = now
+        return bucket
+
+    def check(self, channel, sender_id, chat_id=None):
+        """
+        Take a token for one message if both buckets have one
+
+        Args:
+            channel: Channel name
+            sender_id: Sender identifier
+            chat_id: Chat identifier (None skips the chat bucket)
+
+        Returns:
+            ALLOW, REJECT or DROP
+        """
+        if channel in self.exempt:
+            return ALLOW
+        now = ticks_ms()
+        buckets = [self._bucket(f"s:{channel}:{sender_id}", self.sender_rate, self.sender_burst, now)]
+        if chat_id is not None:
+            buckets.append(self._bucket(f"c:{channel}:{chat_id}", self.chat_rate, self.chat_burst, now))
+
+        if all(b[0] >= 1 for b in buckets):
+            for b in buckets:
+                b[0] -= 1
+                b[2] = False
+            self.allowed += 1
+            return ALLOW
+
+        self.limited += 1
+        sender = buckets[0]
+        if sender[2]:
+            return DROP
+        sender[2] = True
+        return REJECT
+
+    def stats(self):
+        """Return limiter counters as a dict"""
+        return {
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "keys": len(self._buckets)
+        }
@@ -0,0 +1,257 @@
+"""
+ChipClaw Outbound Spool
+Flash-backed queue for outbound messages that could not be delivered yet
+"""
+import os
+import json
+import random
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from ..utils import file_exists, ensure_dir, replace_file, timestamp
+
+
+class Spool:
+    """
+    Durable FIFO of outbound records in append-only segment files
+
+    Records are JSON lines appended to numbered segments
+    (00000001.jsonl, ...) under directory. A small cursor file remembers
+    the segment, byte offset and attempt count of the oldest undelivered
+    record; fully delivered segments are deleted. A record that fails
+    max_attempts times is moved to dead.jsonl so it cannot block the
+    records behind it.
+
+    Args:
+        directory: Spool directory (created if missing)
+        config: Optional dict with segment_bytes, max_attempts,
+            base_delay, max_delay (seconds) and drain_rate (records/s)
+    """
+
+    CURSOR = "cursor.json"
+    DEAD = "dead.jsonl"
+    SEGMENT_EXT = ".jsonl"
+
+    def __init__(self, directory, config=None):
+        config = config or {}
+        self.directory = directory
+        self.segment_bytes = config.get("segment_bytes", 16384)
+        self.max_attempts = config.get("max_attempts", 5)
+        self.base_delay = config.get("base_delay", 1)
+        self.max_delay = config.get("max_delay", 60)
+        self.drain_rate = config.get("drain_rate", 5)
+        self.sent = 0
+        self.dead = 0
+        ensure_dir(directory)
+
+        segments = self._segments()
+        self._tail = segments[-1] if segments else 1
+        self._tail_size = self._size(self._tail)
+        if self._tail_size and not self._ends_with_newline(self._tail, self._tail_size):
+            # Torn write from a crash; never append after a partial line
+            self._tail += 1
+            self._tail_size = 0
+
+        self._segment, self._offset, self.attempts = self._read_cursor()
+        if segments and self._segment < segments[0]:
+            self._segment, self._offset = segments[0], 0
+        self._next_offset = None  # offset after the record returned by peek()
+
+    def _path(self, name):
+        return f"{self.directory}/{name}"
+
+    def _segment_path(self, number):
+        return self._path(f"{number:08d}{self.SEGMENT_EXT}")
+
+    def _segments(self):
+        """Existing segment numbers, oldest first"""
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SEGMENT_EXT) and name != self.DEAD:
+                try:
+                    numbers.append(int(name[:-len(self.SEGMENT_EXT)]))
+                except ValueError:
+                    pass
+        numbers.sort()
+        return numbers
+
+    def _size(self, number):
+        path = self._segment_path(number)
+        return os.stat(path)[6] if file_exists(path) else 0
+
+    def _ends_with_newline(self, number, size):
+        with open(self._segment_path(number), 'rb') as f:
+            f.seek(size - 1)
+            return f.read(1) == b'\n'
+
+    def _read_cursor(self):
+        """Return (segment, offset, attempts) from the cursor file"""
+        path = self._path(self.CURSOR)
+        if file_exists(path):
+            try:
+                with open(path, 'r') as f:
+                    cursor = json.loads(f.read())
+                return cursor["segment"], cursor["offset"], cursor.get("attempts", 0)
+            except (ValueError, KeyError) as e:
+                print(f"Spool cursor unreadable, starting from oldest segment: {e}")
+        return 1, 0, 0
+
+    def _write_cursor(self):
+        path = self._path(self.CURSOR)
+        with open(path + ".tmp", 'w') as f:
+            f.write(json.dumps({
+                "segment": self._segment,
+                "offset": self._offset,
+                "attempts": self.attempts
+            }))
+        replace_file(path + ".tmp", path)
+
+    def append(self, record):
+        """
+        Add a record to the end of the spool
+
+        Args:
+            record: JSON-serialisable dict
+        """
+        line = json.dumps(record) + '\n'
+        if self._tail_size and self._tail_size + len(line) > self.segment_bytes:
+            self._tail += 1
+            self._tail_size = 0
+        with open(self._segment_path(self._tail), 'a') as f:
+            f.write(line)
+        self._tail_size += len(line)
+
+    def peek(self):
+        """
+        Return the oldest undelivered record without removing it
+
+        Returns:
+            Record dict, or None when the spool is empty
+        """
+        while True:
+            path = self._segment_path(self._segment)
+            line = b''
+            if file_exists(path):
+                with open(path, 'rb') as f:
+                    f.seek(self._offset)
+                    line = f.readline()
+
+            if not line.endswith(b'\n'):
+                if self._segment >= self._tail:
+                    return None  # caught up (or the tail is mid-write)
+                # Finished with this segment
+                if file_exists(path):
+                    os.remove(path)
+                self._segment += 1
+                self._offset = 0
+                self._write_cursor()
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"Skipping corrupt spool record in {path}")
+                self._offset += len(line)
+                continue
+            self._next_offset = self._offset + len(line)
+            return record
+
+    def pending(self):
+        """Return True if any record is waiting for delivery"""
+        return self.peek() is not None
+
+    def _advance(self):
+        """Move the cursor past the record returned by peek()"""
+        self._offset = self._next_offset
+        self._next_offset = None
+        self.attempts = 0
+        self._write_cursor()
+
+    def ack(self):
+        """Mark the record returned by peek() as delivered"""
+        if self._next_offset is None:
+            return
+        self._advance()
+        self.sent += 1
+
+    def fail(self, error):
+        """
+        Record a failed delivery of the record returned by peek()
+
+        Args:
+            error: Exception or message describing the failure
+
+        Returns:
+            Seconds to wait before retrying (0 when the record was
+            dead-lettered and the next one can be tried immediately)
+        """
+        self.attempts += 1
+        if self.attempts < self.max_attempts:
+            self._write_cursor()
+            delay = min(self.max_delay, self.base_delay * (2 ** (self.attempts - 1)))
+            # Equal jitter: half fixed, half random, so retries spread out
+            return delay / 2 + delay / 2 * random.getrandbits(16) / 65536
+
+        record = self.peek()
+        with open(self._path(self.DEAD), 'a') as f:
+            f.write(json.dumps({
+                "record": record,
+                "error": str(error),
+                "attempts": self.attempts,
+                "time": timestamp()
+            }) + '\n')
+        print(f"Spool gave up after {self.attempts} attempts: {error}")
+        self.dead += 1
+        self._advance()
+        return 0
+
+    async def drain(self, send):
+        """
+        Deliver records in order at up to drain_rate per second
+
+        Args:
+            send: Async function(record) that raises on failure
+
+        Returns:
+            0 when the spool is empty, otherwise the backoff in seconds
+            after a failed delivery
+        """
+        interval = 1 / self.drain_rate if self.drain_rate else 0
+        while True:
+            record = self.peek()
+            if record is None:
+                return 0
+            try:
+                await send(record)
+            except Exception as e:
+                delay = self.fail(e)
+                if delay:
+                    return delay
+                continue
+            self.ack()
+            await asyncio.sleep(interval)
+
+    def stats(self):
+        """
+        Spool counters
+
+        Returns:
+            Dict with pending_bytes, segments, sent, dead and attempts
+        """
+        segments = self._segments()
+        pending = 0
+        for number in segments:
+            if number >= self._segment:
+                pending += self._size(number)
+        if segments and self._segment in segments:
+            pending -= self._offset
+        return {
+            "pending_bytes": pending,
+            "segments": len(segments),
+            "sent": self.sent,
+            "dead": self.dead,
+            "attempts": self.attempts
+        }
@@ -2,6 +2,7 @@
 ChipClaw UART Channel
 Reuses MicroPython REPL stdio (sys.stdin/sys.stdout) for input/output
 """
+import os
 import sys
 import json
 
@@ -15,58 +16,264 @@ try:
 except ImportError:
     import select
 
+try:
+    import micropython
+except ImportError:
+    micropython = None
+
+try:
+    import builtins
+except ImportError:
+    builtins = None
+
 from .base import BaseChannel
+from .framing import (FrameDecoder, encode_frame, text_body, parse_text_body,
+                      media_body, parse_media_body, HANDSHAKE, HANDSHAKE_OK,
+                      decode_varint, TYPE_TEXT, TYPE_JSON, TYPE_MEDIA, TYPE_BYE, TYPE_CREDIT)
 from ..bus.events import InboundMessage
+from ..bus.queue import Queue
+
+XON = 0x11
+XOFF = 0x13
 
 
 class UARTChannel(BaseChannel):
-    """UART channel using REPL stdio for communication"""
+    """
+    UART channel using REPL stdio for communication
+
+    Each wakeup drains everything the stream has ready (os.read on the
+    file descriptor where the port has one, otherwise byte reads while
+    poll() reports data) into one reusable bytearray, and complete lines
+    are split out through a memoryview. The loop polls again immediately
+    while data keeps arriving and backs off to idle_ms when the line is
+    quiet.
+
+    Sending the text line HANDSHAKE switches the link to binary frames
+    (see framing.py) until a BYE frame arrives; text mode is unchanged
+    for clients that never ask.
+
+    Output goes through a writer task fed from a buffer bounded at
+    tx_buffer bytes. It writes write_chunk bytes at a time, paced to the
+    baud rate, so a multi-KB reply never blocks the event loop. Flow
+    control is XON/XOFF in text mode (flow_control "xonxoff"), or CREDIT
+    frames in framed mode once the host sends one; both are checked
+    before every chunk. When replies go to stdout, print() is wrapped so
+    that output from other tasks is held while a record is half written
+    and emitted right after it (up to tx_buffer bytes; more is dropped).
+    """
     
-    def __init__(self, bus, config):
+    def __init__(self, bus, config, stream=None, out_stream=None):
         super().__init__("uart", bus, config)
-        self.buffer = ""
+        self.stream = stream          # Defaults to sys.stdin at start()
+        self.out_stream = out_stream  # Defaults to sys.stdout at start()
+        self.buffer = bytearray()     # Bytes received but not yet split into lines
+        self.read_size = config.get("read_size", 512)
+        self.max_line = config.get("max_line", 16384)
+        self.idle_ms = config.get("idle_ms", 50)
+        self.frame_compress_min = config.get("frame_compress_min", 256)
+        self.framed = False
+        self.decoder = FrameDecoder(max_body=self.max_line)
+        self.write_chunk = config.get("write_chunk", 128)
+        self.tx_buffer = config.get("tx_buffer", 8192)
+        self.flow_control = config.get("flow_control", "none")
+        self.baudrate = config.get("baudrate", 115200)
+        self.paused = False           # XOFF received
+        self.credits = None           # Bytes the host will accept (framed, once granted)
+        self._tx_queue = Queue()
+        self._tx_bytes = 0
+        self._tx_space = asyncio.Event()
+        self._tx_ready = asyncio.Event()
+        self._out = None
+        self._print = None            # builtins.print before _hold_print()
+        self._held = None             # print() text held during a record
+        self._held_bytes = 0
         self._running = False
         self._poller = None
+        self._raw = None
+        self._fd = None
     
     async def start(self):
         """Initialize stdio polling and start reading"""
         print("Starting UART channel (stdio mode)")
         
+        stream = self.stream or sys.stdin
+        self._raw = getattr(stream, "buffer", stream)
+        self._fd = None
+        if hasattr(os, "read"):
+            try:
+                self._fd = self._raw.fileno()
+            except Exception:
+                pass
+        
         try:
             self._poller = select.poll()
-            self._poller.register(sys.stdin, select.POLLIN)
+            self._poller.register(self._raw, select.POLLIN)
         except Exception as e:
             print("Warning: Could not setup stdin polling: {}".format(e))
             self._poller = None
         
+        out = self.out_stream or sys.stdout
+        self._out = getattr(out, "buffer", out)
+        if self.out_stream is None:
+            self._hold_print()
+        
         self._running = True
-        asyncio.create_task(self._read_loop())
+        self.spawn("read", self._read_loop)
+        self.spawn("write", self._write_loop)
+        self.supervisor.up()
+    
+    def _readable(self):
+        for _, ev in self._poller.poll(0):
+            if ev & select.POLLIN:
+                return True
+        return False
+    
+    def _read_available(self):
+        """
+        Append everything ready on the stream to self.buffer
+        
+        Returns:
+            Number of bytes read
+        """
+        total = 0
+        while total < self.read_size and self._readable():
+            if self._fd is not None:
+                chunk = os.read(self._fd, self.read_size - total)
+            else:
+                chunk = self._raw.read(1)
+            if not chunk:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            self.buffer.extend(chunk)
+            total += len(chunk)
+        return total
+    
+    def _split_lines(self):
+        """
+        Remove complete lines from self.buffer
+        
+        Returns:
+            List of stripped, non-empty lines
+        """
+        buf = self.buffer
+        lines = []
+        start = 0
+        idx = buf.find(b'\n')
+        if idx >= 0:
+            mv = memoryview(buf)
+            while idx >= 0:
+                try:
+                    line = str(mv[start:idx], 'utf-8').strip()
+                    if line:
+                        lines.append(line)
+                except UnicodeError:
+                    line = None
+                    print("Skipping UART line with invalid UTF-8")
+                start = idx + 1
+                if line == HANDSHAKE:
+                    break  # what follows is framed
+                idx = buf.find(b'\n', start)
+            del mv  # release the export before resizing buf
+            del buf[:start]
+        if not self.framed and len(buf) > self.max_line and HANDSHAKE not in lines:
+            print("Warning: UART line exceeds {} bytes, discarding".format(self.max_line))
+            del buf[:]
+        return lines
     
     async def _read_loop(self):
         """Background loop to read stdin data"""
+        idle = 1
         while self._running:
             try:
-                if self._poller:
-                    events = self._poller.poll(0)
-                    for _, ev in events:
-                        if ev & select.POLLIN:
-                            ch = sys.stdin.read(1)
-                            if ch:
-                                self.buffer += ch
-                    
-                    # Process complete lines
-                    while '\n' in self.buffer:
-                        line, self.buffer = self.buffer.split('\n', 1)
-                        line = line.strip()
-                        if line:
-                            await self._handle_line(line)
-                
-                await asyncio.sleep_ms(50)
+                if self._poller and self._read_available():
+                    await self._process_buffer()
+                    idle = 1
+                    await asyncio.sleep(0)
+                else:
+                    await asyncio.sleep(idle / 1000)
+                    idle = min(idle * 2, self.idle_ms)
             
             except Exception as e:
                 print("Error in UART read loop: {}".format(e))
                 await asyncio.sleep(1)
     
+    async def _process_buffer(self):
+        """Dispatch complete lines or frames from self.buffer"""
+        while True:
+            if not self.framed:
+                if self.flow_control == "xonxoff":
+                    self._take_flow_control()
+                for line in self._split_lines():
+                    if line == HANDSHAKE:
+                        self._set_framed(True)
+                        await self._write(HANDSHAKE_OK + '\n')
+                        break
+                    await self._handle_line(line)
+                if not self.framed:
+                    return
+            for ftype, body in self.decoder.decode(self.buffer, until=TYPE_BYE):
+                await self._handle_frame(ftype, body)
+            if self.framed:
+                return
+    
+    def _take_flow_control(self):
+        """Strip XON/XOFF bytes from the text input; the last one wins"""
+        buf = self.buffer
+        on, off = buf.rfind(bytes((XON,))), buf.rfind(bytes((XOFF,)))
+        if on < 0 and off < 0:
+            return
+        self.paused = off > on
+        self.buffer = buf.replace(bytes((XON,)), b'').replace(bytes((XOFF,)), b'')
+        self._tx_ready.set()
+    
+    def _set_framed(self, framed):
+        """Switch link mode; Ctrl-C must not interrupt while bytes are binary"""
+        self.framed = framed
+        self.credits = None
+        self.paused = False
+        self._tx_ready.set()
+        if micropython and hasattr(micropython, "kbd_intr"):
+            micropython.kbd_intr(-1 if framed else 3)
+        print("UART {} mode".format("framed" if framed else "text"))
+    
+    async def _publish(self, content, sender_id="uart_user", chat_id="uart_default", media=None):
+        inbound = InboundMessage(
+            channel="uart",
+            sender_id=sender_id,
+            chat_id=chat_id,
+            content=content,
+            media=media
+        )
+        await self.handle_inbound(inbound)
+    
+    async def _handle_frame(self, ftype, body):
+        """Turn a decoded frame into an InboundMessage"""
+        try:
+            if ftype == TYPE_TEXT:
+                chat_id, content = parse_text_body(body)
+                await self._publish(content, chat_id=chat_id)
+            elif ftype == TYPE_JSON:
+                await self._handle_line(str(body, 'utf-8'))
+            elif ftype == TYPE_MEDIA:
+                header, data = parse_media_body(body)
+                await self._publish(
+                    header.get("content", ""),
+                    sender_id=header.get("sender_id", "uart_user"),
+                    chat_id=header.get("chat_id", "uart_default"),
+                    media=data
+                )
+            elif ftype == TYPE_CREDIT:
+                grant = decode_varint(body, 0)[0] or 0
+                self.credits = (self.credits or 0) + grant
+                self._tx_ready.set()
+            elif ftype == TYPE_BYE:
+                self._set_framed(False)
+            else:
+                print("Ignoring UART frame type {}".format(ftype))
+        except Exception as e:
+            print("Error handling UART frame: {}".format(e))
+    
     async def _handle_line(self, line):
         """Parse line (JSON or plain text) and create InboundMessage"""
         try:
@@ -82,26 +289,120 @@ class UARTChannel(BaseChannel):
                 sender_id = "uart_user"
                 chat_id = "uart_default"
             
-            inbound = InboundMessage(
-                channel="uart",
-                sender_id=sender_id,
-                chat_id=chat_id,
-                content=content
-            )
-            
-            await self.bus.publish_inbound(inbound)
+            await self._publish(content, sender_id, chat_id)
         
         except Exception as e:
             print("Error handling UART line: {}".format(e))
     
-    async def send(self, msg):
-        """Send OutboundMessage via stdout"""
-        try:
+    def _encode(self, msg):
+        """Encode an OutboundMessage for the current link mode"""
+        if not self.framed:
             payload = json.dumps({
                 "content": msg.content,
                 "chat_id": msg.chat_id
             })
-            sys.stdout.write(payload + '\n')
+            return payload + '\n'
+        if isinstance(msg.media, (bytes, bytearray)):
+            header = {"chat_id": msg.chat_id, "content": msg.content}
+            return encode_frame(TYPE_MEDIA, media_body(header, msg.media), self.frame_compress_min)
+        return encode_frame(TYPE_TEXT, text_body(msg.chat_id, msg.content), self.frame_compress_min)
+    
+    async def _write(self, data):
+        """
+        Queue data for the writer, waiting while tx_buffer is full
+        Before start() there is no writer, so data is written directly
+        """
+        if not self._running:
+            if isinstance(data, str):
+                sys.stdout.write(data)
+            else:
+                getattr(sys.stdout, "buffer", sys.stdout).write(data)
+            return
+        
+        if isinstance(data, str):
+            data = data.encode()
+        while self._tx_bytes and self._tx_bytes + len(data) > self.tx_buffer:
+            self._tx_space.clear()
+            await self._tx_space.wait()
+        self._tx_bytes += len(data)
+        self._tx_queue.put_nowait(data)
+    
+    def _hold_print(self):
+        """Wrap builtins.print so text printed mid-record is held back"""
+        if builtins is None or self._print is not None:
+            return
+        original = builtins.print
+        
+        def held_print(*args, **kwargs):
+            if self._held is None or kwargs.get("file") is not None:
+                original(*args, **kwargs)
+                return
+            sep = kwargs.get("sep")
+            end = kwargs.get("end")
+            text = (" " if sep is None else sep).join([str(a) for a in args])
+            text += "\n" if end is None else end
+            if self._held_bytes + len(text) <= self.tx_buffer:
+                self._held.append(text)
+                self._held_bytes += len(text)
+        
+        try:
+            builtins.print = held_print
+        except (AttributeError, TypeError):
+            return  # port built without overridable builtins
+        self._print = original
+    
+    def _release_print(self):
+        """Write out print() text held during the last record"""
+        held, self._held = self._held, None
+        self._held_bytes = 0
+        if held:
+            self._out.write("".join(held).encode())
+            if hasattr(self._out, "flush"):
+                self._out.flush()
+    
+    async def _allowance(self, remaining):
+        """Wait until flow control allows output, then return the chunk size"""
+        while self._running and (self.paused or self.credits == 0):
+            self._tx_ready.clear()
+            await self._tx_ready.wait()
+        n = min(remaining, self.write_chunk)
+        if self.credits is not None:
+            n = min(n, self.credits)
+        return n
+    
+    async def _write_loop(self):
+        """Background writer: chunked, paced output from the tx queue"""
+        while self._running:
+            data = await self._tx_queue.get()
+            mv = memoryview(data)
+            pos = 0
+            if self._print is not None:
+                self._held = []
+            try:
+                while pos < len(data) and self._running:
+                    n = await self._allowance(len(data) - pos)
+                    if not n:
+                        continue
+                    self._out.write(mv[pos:pos + n])
+                    if hasattr(self._out, "flush"):
+                        self._out.flush()
+                    pos += n
+                    if self.credits is not None:
+                        self.credits -= n
+                    # Roughly the time the UART needs to shift the chunk out
+                    await asyncio.sleep(n * 10 / self.baudrate if self.baudrate else 0)
+            except Exception as e:
+                print("Error writing UART output: {}".format(e))
+                await asyncio.sleep(1)
+            finally:
+                self._tx_bytes -= len(data)
+                self._tx_space.set()
+                self._release_print()
+    
+    async def send(self, msg):
+        """Send OutboundMessage via stdout"""
+        try:
+            await self._write(self._encode(msg))
         
         except Exception as e:
             print("Error sending UART message: {}".format(e))
@@ -109,8 +410,14 @@ class UARTChannel(BaseChannel):
     async def stop(self):
         """Stop UART channel"""
         self._running = False
+        self.supervisor.stop()
+        if self._print is not None:
+            builtins.print = self._print
+            self._print = None
+        self._tx_ready.set()
+        self._tx_queue.put_nowait(b'')  # wake the writer so it can exit
         if self._poller:
             try:
-                self._poller.unregister(sys.stdin)
+                self._poller.unregister(self._raw)
             except:
                 pass
@@ -0,0 +1,442 @@
+"""
+ChipClaw WebSocket Channel
+RFC 6455 server on asyncio.start_server; one chat per connection
+"""
+import json
+import struct
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+try:
+    import hashlib
+except ImportError:
+    import uhashlib as hashlib
+
+try:
+    import binascii
+except ImportError:
+    import ubinascii as binascii
+
+from .base import BaseChannel
+from .http import read_head, parse_target, response_head
+from ..bus.events import InboundMessage
+from ..bus.queue import Queue
+from ..utils import ticks_ms, ticks_diff
+
+GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+CLOSE_NORMAL = 1000
+CLOSE_GOING_AWAY = 1001
+CLOSE_PROTOCOL = 1002
+CLOSE_UNSUPPORTED = 1003
+CLOSE_TOO_BIG = 1009
+CLOSE_OVERLOAD = 1013
+
+
+def accept_key(key):
+    """Sec-WebSocket-Accept value for a client's Sec-WebSocket-Key"""
+    digest = hashlib.sha1(key.encode() + GUID).digest()
+    return binascii.b2a_base64(digest).strip().decode()
+
+
+def apply_mask(data, mask):
+    """XOR data with the 4-byte mask (masking and unmasking are the same)"""
+    n = len(data)
+    if not n:
+        return b""
+    # One big-int XOR instead of a Python-level loop over every byte
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+
+
+def encode_frame(opcode, payload, mask=None):
+    """
+    Build one unfragmented frame
+
+    Args:
+        opcode: OP_* value
+        payload: Payload bytes
+        mask: 4 mask bytes (clients must mask; the server never does)
+
+    Returns:
+        Frame bytes
+    """
+    n = len(payload)
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head = bytes((0x80 | opcode, bit | n))
+    elif n < 65536:
+        head = bytes((0x80 | opcode, bit | 126)) + struct.pack(">H", n)
+    else:
+        head = bytes((0x80 | opcode, bit | 127)) + struct.pack(">Q", n)
+    if mask:
+        return head + mask + apply_mask(payload, mask)
+    return head + payload
+
+
+async def read_frame(reader, max_size):
+    """
+    Read one frame
+
+    Returns:
+        Tuple of (fin, opcode, masked, unmasked payload)
+
+    Raises:
+        ValueError: With a close code and reason as its arguments, for
+            oversized frames and for control frames that are fragmented
+            or carry more than 125 bytes (RFC 6455 section 5.5)
+    """
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if b0 & 0x08 and (not b0 & 0x80 or n > 125):
+        raise ValueError(CLOSE_PROTOCOL, "Bad control frame")
+    if n == 126:
+        n = struct.unpack(">H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack(">Q", await reader.readexactly(8))[0]
+    if n > max_size:
+        raise ValueError(CLOSE_TOO_BIG, "Message too big")
+    mask = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n) if n else b""
+    if mask:
+        payload = apply_mask(payload, mask)
+    return bool(b0 & 0x80), b0 & 0x0F, mask is not None, payload
+
+
+def close_payload(code, reason=""):
+    return struct.pack(">H", code) + reason.encode()
+
+
+class _Connection:
+    """One upgraded client"""
+
+    __slots__ = ("writer", "chat_id", "sender_id", "outbox", "last_seen", "closed")
+
+    def __init__(self, writer, chat_id, sender_id, outbox_size):
+        self.writer = writer
+        self.chat_id = chat_id
+        self.sender_id = sender_id
+        self.outbox = Queue(outbox_size)  # frames waiting for the writer task
+        self.last_seen = ticks_ms()
+        self.closed = False
+
+
+class WebSocketChannel(BaseChannel):
+    """
+    WebSocket channel: persistent, bidirectional sessions
+
+    Clients connect to ws://<device>:<port>/ws, optionally with
+    ?chat_id=<id> (default: a fresh id per connection) and ?token=<token>
+    when a token is configured (browsers cannot set an Authorization
+    header on WebSocket requests; the header works too). Without a token,
+    a client-chosen chat_id is prefixed with the peer address
+    ("<ip>:<id>"), so one LAN client cannot attach to another's chat.
+
+    Client text messages are JSON {"content", "sender_id"?} or plain
+    text. The server pushes JSON text messages:
+        {"type": "partial", ...}  what the agent said before calling tools
+        {"type": "message", ...}  other messages to the chat (send_message)
+        {"type": "reply", ...}    the answer to a client message
+    each with content and chat_id.
+
+    Every connection has a writer task fed from a bounded outbox, so a
+    slow client cannot stall delivery to the others; a client whose
+    outbox fills up is disconnected. The server pings every
+    ping_interval seconds and drops clients silent for twice that.
+    """
+
+    def __init__(self, bus, config):
+        super().__init__("websocket", bus, config)
+        self.host = config.get("host", "0.0.0.0")
+        self.port = config.get("port", 8081)
+        self.path = config.get("path", "/ws")
+        self.max_connections = config.get("max_connections", 8)
+        self.max_message = config.get("max_message", 16384)
+        self.max_header = config.get("max_header", 4096)
+        self.token = config.get("token", "")
+        self.header_timeout = config.get("header_timeout", 10)
+        self.ping_interval = config.get("ping_interval", 20)
+        self.outbox_size = config.get("outbox_size", 16)
+        self.partial_replies = config.get("partial_replies", True)
+        self.server = None
+        self.connections = {}  # {chat_id: [_Connection, ...]}
+        self.count = 0
+        self._idle = asyncio.Event()  # set while no connection is open
+        self._idle.set()
+        self.stats = {"accepted": 0, "rejected": 0, "received": 0, "sent": 0, "dropped": 0}
+        self._next_id = 0
+
+    async def start(self):
+        """Start listening"""
+        print(f"Starting WebSocket channel on {self.host}:{self.port}{self.path}")
+        try:
+            self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        except Exception as e:
+            self.supervisor.failure(e)
+            raise
+        self.supervisor.up()
+
+    async def _reject(self, writer, status, extra=""):
+        try:
+            writer.write(response_head(status, extra).encode())
+            await writer.drain()
+        except Exception:
+            pass
+        await self._close_writer(writer)
+
+    async def _close_writer(self, writer):
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+    async def _handshake(self, reader, writer):
+        """
+        Validate the upgrade request and send 101
+
+        Returns:
+            Query parameters dict, or None after rejecting the request
+        """
+        try:
+            method, target, headers = await asyncio.wait_for(
+                read_head(reader, self.max_header), self.header_timeout)
+        except ValueError as e:
+            await self._reject(writer, e.args[0] if e.args else 400)
+            return None
+        path, params = parse_target(target)
+        key = headers.get("sec-websocket-key")
+        if path != self.path:
+            await self._reject(writer, 404)
+        elif method != "GET" or "websocket" not in headers.get("upgrade", "").lower() or not key:
+            await self._reject(writer, 400)
+        elif headers.get("sec-websocket-version", "13") != "13":
+            await self._reject(writer, 400, "Sec-WebSocket-Version: 13\r\n")
+        elif self.token and params.get("token") != self.token \
+                and headers.get("authorization") != f"Bearer {self.token}":
+            await self._reject(writer, 401)
+        else:
+            writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                          "Upgrade: websocket\r\n"
+                          "Connection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n").encode())
+            await writer.drain()
+            return params
+        return None
+
+    async def _serve(self, reader, writer):
+        """Handle one client from upgrade to close"""
+        if self.count >= self.max_connections:
+            self.stats["rejected"] += 1
+            await self._reject(writer, 503, "Retry-After: 1\r\n")
+            return
+        self.count += 1
+        self._idle.clear()
+        conn = None
+        try:
+            params = await self._handshake(reader, writer)
+            if params is None:
+                return
+            peer = writer.get_extra_info("peername")
+            peer = peer[0] if peer else "unknown"
+            self._next_id += 1
+            chat_id = params.get("chat_id")
+            if not chat_id:
+                chat_id = f"ws_{self._next_id}"
+            elif not self.token:
+                chat_id = f"{peer}:{chat_id}"
+            conn = _Connection(writer, chat_id, params.get("sender_id") or peer, self.outbox_size)
+            self.connections.setdefault(chat_id, []).append(conn)
+            self.stats["accepted"] += 1
+
+            tasks = [asyncio.create_task(self._write_loop(conn))]
+            if self.ping_interval:
+                tasks.append(asyncio.create_task(self._ping_loop(conn)))
+            try:
+                await self._read_loop(reader, conn)
+            finally:
+                conn.closed = True
+                for task in tasks:
+                    task.cancel()
+        except (EOFError, OSError):
+            pass  # client went away
+        except Exception as e:
+            print(f"WebSocket error: {e}")
+        finally:
+            self.count -= 1
+            if not self.count:
+                self._idle.set()
+            if conn:
+                peers = self.connections.get(conn.chat_id, [])
+                if conn in peers:
+                    peers.remove(conn)
+                if not peers:
+                    self.connections.pop(conn.chat_id, None)
+            await self._close_writer(writer)
+
+    async def _write(self, conn, frame):
+        conn.writer.write(frame)
+        await conn.writer.drain()
+
+    async def _close(self, conn, code, reason=""):
+        """Send a close frame (once) and stop the connection"""
+        if conn.closed:
+            return
+        conn.closed = True
+        try:
+            await self._write(conn, encode_frame(OP_CLOSE, close_payload(code, reason)))
+        except Exception:
+            pass
+        conn.writer.close()
+
+    async def _read_loop(self, reader, conn):
+        """Receive frames until the client closes or breaks protocol"""
+        fragments = None
+        size = 0
+        while not conn.closed:
+            try:
+                fin, opcode, masked, payload = await read_frame(reader, self.max_message)
+            except ValueError as e:
+                await self._close(conn, *e.args)
+                return
+            conn.last_seen = ticks_ms()
+            if not masked:
+                await self._close(conn, CLOSE_PROTOCOL, "Client frames must be masked")
+                return
+
+            if opcode == OP_PING:
+                await self._write(conn, encode_frame(OP_PONG, payload))
+            elif opcode == OP_PONG:
+                pass
+            elif opcode == OP_CLOSE:
+                code = struct.unpack(">H", payload[:2])[0] if len(payload) >= 2 else CLOSE_NORMAL
+                await self._close(conn, code)
+                return
+            elif opcode in (OP_TEXT, OP_BINARY) and fragments is None:
+                if opcode == OP_BINARY:
+                    await self._close(conn, CLOSE_UNSUPPORTED, "Text messages only")
+                    return
+                fragments, size = [payload], len(payload)
+            elif opcode == OP_CONT and fragments is not None:
+                fragments.append(payload)
+                size += len(payload)
+            else:
+                await self._close(conn, CLOSE_PROTOCOL, "Unexpected frame")
+                return
+
+            if fragments is not None:
+                if size > self.max_message:
+                    await self._close(conn, CLOSE_TOO_BIG, "Message too big")
+                    return
+                if fin:
+                    message, fragments = b"".join(fragments), None
+                    await self._handle_text(conn, message)
+
+    async def _handle_text(self, conn, message):
+        try:
+            text = message.decode()
+        except UnicodeError:
+            await self._close(conn, CLOSE_PROTOCOL, "Invalid UTF-8")
+            return
+        data = None
+        if text.startswith("{"):
+            try:
+                data = json.loads(text)
+            except ValueError:
+                pass
+        if not isinstance(data, dict):
+            data = {"content": text}
+        if not data.get("content"):
+            return
+        self.stats["received"] += 1
+        inbound = InboundMessage(
+            channel="websocket",
+            sender_id=str(data.get("sender_id", conn.sender_id)),
+            chat_id=conn.chat_id,
+            content=data["content"]
+        )
+        if self.partial_replies:
+            inbound.metadata["partial"] = True
+        await self.handle_inbound(inbound)
+
+    async def _write_loop(self, conn):
+        """Drain the connection's outbox"""
+        try:
+            while not conn.closed:
+                frame = await conn.outbox.get()
+                await self._write(conn, frame)
+        except Exception:
+            conn.closed = True
+            conn.writer.close()
+
+    async def _ping_loop(self, conn):
+        """Ping while idle; drop clients that stop answering"""
+        interval = self.ping_interval * 1000
+        while not conn.closed:
+            await asyncio.sleep(self.ping_interval)
+            if ticks_diff(ticks_ms(), conn.last_seen) > 2 * interval:
+                await self._close(conn, CLOSE_GOING_AWAY, "Ping timeout")
+                return
+            if not conn.outbox.full():
+                conn.outbox.put_nowait(encode_frame(OP_PING, b""))
+
+    def _kind(self, msg):
+        if msg.reply_to is not None:
+            return "reply"
+        if msg.meta("partial"):
+            return "partial"
+        return "message"
+
+    async def send(self, msg):
+        """Push an OutboundMessage to every connection on its chat"""
+        peers = self.connections.get(msg.chat_id)
+        if not peers:
+            print(f"WebSocket reply for {msg.chat_id} has no open connection, dropping")
+            return
+        frame = encode_frame(OP_TEXT, json.dumps({
+            "type": self._kind(msg),
+            "content": msg.content,
+            "chat_id": msg.chat_id
+        }).encode())
+        for conn in list(peers):
+            if conn.closed:
+                continue
+            if conn.outbox.full():
+                self.stats["dropped"] += 1
+                await self._close(conn, CLOSE_OVERLOAD, "Client too slow")
+                continue
+            conn.outbox.put_nowait(frame)
+            self.stats["sent"] += 1
+
+    def metrics(self):
+        """Return connection counters as a dict"""
+        stats = dict(self.stats)
+        stats["connections"] = self.count
+        stats["chats"] = len(self.connections)
+        return stats
+
+    async def stop(self):
+        """Stop listening and close every connection"""
+        self.supervisor.stop()
+        if self.server:
+            self.server.close()
+            for peers in list(self.connections.values()):
+                for conn in list(peers):
+                    await self._close(conn, CLOSE_GOING_AWAY, "Server stopping")
+            try:
+                await asyncio.wait_for(self._idle.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(0)  # let cancelled per-connection tasks finish
+            await self.server.wait_closed()
+            self.server = None
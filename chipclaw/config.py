@@ -16,12 +16,41 @@ class Config:
             "max_tokens": 4096,
             "temperature": 0.7,
             "max_tool_iterations": 15,
-            "max_session_messages": 20
+            "max_session_messages": 20,
+            "inline_skills": False,
+            "skill_cache_bytes": 16384
+        },
+        "bus": {
+            "outbound_maxsize": 16,
+            "send_timeout": 10
+        },
+        "sessions": {
+            "format": "jsonl",
+            "compress_min": 256,
+            "shards": 0,
+            "compact_factor": 4,
+            "cache_entries": 16,
+            "cache_bytes": 131072,
+            "flush_interval": 5,
+            "flush_threshold": 8,
+            "ttl": {},
+            "expire_action": "delete",
+            "sweep_interval": 3600,
+            "sweep_batch": 8
         },
         "provider": {
             "api_key": "",
             "api_base": "https://api.deepseek.com/v1"
         },
+        "rate_limit": {
+            "enabled": True,
+            "sender_rate": 0.2,
+            "sender_burst": 5,
+            "chat_rate": 0.5,
+            "chat_burst": 10,
+            "max_keys": 64,
+            "exempt": ["uart"]
+        },
         "channels": {
             "mqtt": {
                 "enabled": False,
@@ -30,15 +59,71 @@ class Config:
                 "client_id": "chipclaw-01",
                 "topic_in": "chipclaw/in",
                 "topic_out": "chipclaw/out",
+                "share_group": "",
+                "metrics_topic": "chipclaw/metrics",
+                "metrics_interval": 0,
+                "keepalive": 60,
+                "qos": 0,
+                "ack_timeout": 5,
+                "max_packet": 16384,
+                "reconnect_delay": 1,
+                "reconnect_max": 60,
+                "reconnect_jitter": 0.5,
+                "breaker_threshold": 5,
+                "breaker_cooldown": 300,
+                "chunk_threshold": 4096,
+                "chunk_size": 1024,
+                "reassembly": {
+                    "max_messages": 4,
+                    "max_bytes": 32768,
+                    "timeout": 30
+                },
                 "username": "",
-                "password": ""
+                "password": "",
+                "spool": {
+                    "enabled": False,
+                    "max_attempts": 5,
+                    "base_delay": 1,
+                    "max_delay": 60,
+                    "drain_rate": 5,
+                    "segment_bytes": 16384
+                }
+            },
+            "http": {
+                "enabled": False,
+                "host": "0.0.0.0",
+                "port": 8080,
+                "max_connections": 4,
+                "max_body": 16384,
+                "token": "",
+                "reply_timeout": 120,
+                "ping_interval": 15
+            },
+            "websocket": {
+                "enabled": False,
+                "host": "0.0.0.0",
+                "port": 8081,
+                "path": "/ws",
+                "max_connections": 8,
+                "max_message": 16384,
+                "token": "",
+                "ping_interval": 20,
+                "outbox_size": 16,
+                "partial_replies": True
             },
             "uart": {
                 "enabled": True,
                 "uart_id": 1,
                 "baudrate": 115200,
                 "tx_pin": 17,
-                "rx_pin": 18
+                "rx_pin": 18,
+                "read_size": 512,
+                "max_line": 16384,
+                "idle_ms": 50,
+                "frame_compress_min": 256,
+                "write_chunk": 128,
+                "tx_buffer": 8192,
+                "flow_control": "none"
             }
         },
         "hardware": {
@@ -1,10 +1,18 @@
 """
 ChipClaw Session Manager
-Manages conversation sessions with JSONL storage
+Manages conversation sessions with JSONL (or compact binary) storage
 """
 import os
 import json
-from ..utils import ensure_dir, safe_filename, file_exists
+import time
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from ..utils import ensure_dir, safe_filename, file_exists, is_dir, LRUCache
+from .store import JsonlStore, BinaryStore
 
 
 class Session:
@@ -13,6 +21,10 @@ class Session:
     def __init__(self, key):
         self.key = key          # "channel:chat_id"
         self.messages = []      # List of message dicts
+        self._saved = 0         # Number of messages already persisted
+        self._records = 0       # Records in the session file (live + stale)
+        self._rewrite = False   # File no longer matches messages
+        self._head = 0          # Store position of the oldest record in messages
     
     def add_message(self, role, content, **kwargs):
         """
@@ -45,16 +57,105 @@ class Session:
     def clear(self):
         """Clear all messages"""
         self.messages = []
+        self._saved = 0
+        self._rewrite = True
+        self._head = 0
 
 
 class SessionManager:
-    """Manages sessions with JSONL file storage"""
+    """
+    Manages sessions with append-only file storage
+    
+    Each save appends only the messages added since the previous save.
+    Once a file holds more than compact_factor times the live window
+    (max_messages, or all messages when 0) it is compacted: rewritten
+    with just the live window, which also trims the in-memory session.
+    
+    Loading reads only the last max_messages records (JSONL files are
+    scanned backwards in blocks, binary files seek via their index);
+    older records stay on flash until requested through load_older().
+    Set sessions.format to "binary" for the compact BinaryStore format;
+    existing .jsonl files are migrated when first loaded.
+    
+    With sessions.shards > 0, files are spread over that many (max 256)
+    hash-named subdirectories so no directory grows with the number of
+    chats. Flat files are moved into their shard when first loaded, or
+    all at once by migrate_all(). check_layout() runs migrate_all() at
+    startup whenever shards or format differ from the layout recorded in
+    sessions/layout.json; until then, lazy loads also look in the
+    previous shard layout.
+    
+    Sessions in RAM are held in an LRU cache bounded by entry count and
+    estimated bytes; evicted sessions are saved before being dropped.
+    
+    Callers normally mark_dirty() instead of saving; run_flusher() then
+    writes all dirty sessions every flush_interval seconds, as soon as
+    flush_threshold sessions are dirty, or on flush() at shutdown.
+    """
     
-    def __init__(self, workspace):
+    MESSAGE_OVERHEAD = 64  # Estimated per-message bytes beyond content
+    PATH_CACHE_SIZE = 256  # Resolved key -> path entries kept in RAM
+    LAYOUT_FILE = "layout.json"
+    
+    def __init__(self, workspace, max_messages=0, config=None):
+        config = config or {}
         self.workspace = workspace
         self.sessions_dir = f"{workspace}/sessions"
         ensure_dir(self.sessions_dir)
-        self.sessions = {}  # {key: Session}
+        self.max_messages = max_messages
+        self.compact_factor = config.get("compact_factor", 4)
+        self.format = config.get("format", "jsonl")
+        if self.format == "binary":
+            self.store = BinaryStore(compress_min=config.get("compress_min", 256))
+        else:
+            self.store = JsonlStore()
+        self.sessions = LRUCache(  # {key: Session}
+            max_entries=config.get("cache_entries", 16),
+            max_bytes=config.get("cache_bytes", 131072),
+            on_evict=self._on_evict
+        )
+        self.flush_interval = config.get("flush_interval", 5)
+        self.flush_threshold = config.get("flush_threshold", 8)
+        self._dirty = {}          # {key: Session} awaiting write-behind
+        self._flush_event = None  # Created by run_flusher() inside the loop
+        self._flushing = False
+        self.shards = min(config.get("shards", 0), 256)
+        self._bases = LRUCache(max_entries=self.PATH_CACHE_SIZE)  # {key: path without ext}
+        self._shard_dirs = set()  # Shard directories known to exist
+        layout = self._read_layout() or {}
+        self.prev_shards = layout.get("shards", 0)  # Shard count of the recorded layout
+        self.migrate_errors = 0
+        self.ttl = config.get("ttl") or {}  # {channel: seconds}, "default" for others
+        self.expire_action = config.get("expire_action", "delete")
+        self.sweep_interval = config.get("sweep_interval", 3600)
+        self.sweep_batch = config.get("sweep_batch", 8)
+        self.reclaimed = 0  # Bytes freed by expiry since start
+    
+    def _shard_of(self, name, shards=None):
+        """Shard directory name for a session file stem (FNV-1a hash)"""
+        h = 0x811c9dc5
+        for b in name.encode():
+            h = ((h ^ b) * 0x01000193) & 0xffffffff
+        return "%02x" % (h % (shards or self.shards))
+    
+    def _dir_for(self, name):
+        """Directory holding the session file stem, created on first use"""
+        if not self.shards:
+            return self.sessions_dir
+        directory = f"{self.sessions_dir}/{self._shard_of(name)}"
+        if directory not in self._shard_dirs:
+            ensure_dir(directory)
+            self._shard_dirs.add(directory)
+        return directory
+    
+    def _path(self, key, store=None):
+        """Return session file path for key"""
+        base = self._bases.get(key)
+        if base is None:
+            name = safe_filename(key)
+            base = f"{self._dir_for(name)}/{name}"
+            self._bases.put(key, base)
+        return base + (store or self.store).ext
     
     def get_or_create(self, key):
         """
@@ -66,28 +167,134 @@ class SessionManager:
         Returns:
             Session instance
         """
-        if key not in self.sessions:
-            self.sessions[key] = self._load(key)
-        return self.sessions[key]
+        session = self.sessions.get(key)
+        if session is None:
+            session = self._load(key)
+            self.sessions.put(key, session, self._estimate_size(session))
+        return session
+    
+    def _estimate_size(self, session):
+        """Rough RAM footprint of a session in bytes"""
+        size = self.MESSAGE_OVERHEAD
+        for msg in session.messages:
+            content = msg.get("content")
+            size += self.MESSAGE_OVERHEAD + (len(content) if content else 0)
+        return size
+    
+    def _on_evict(self, key, session):
+        """Persist a session pushed out of the RAM cache"""
+        self.save(session)
+    
+    def stats(self):
+        """
+        Return session cache metrics
+        
+        Returns:
+            Dict with entries, bytes, hits, misses, evictions, dirty count
+            and bytes reclaimed by expiry
+        """
+        stats = self.sessions.stats()
+        stats["dirty"] = len(self._dirty)
+        stats["reclaimed"] = self.reclaimed
+        return stats
+    
+    def mark_dirty(self, session):
+        """
+        Schedule a session for write-behind persistence
+        
+        Args:
+            session: Session instance with unsaved changes
+        """
+        self._dirty[session.key] = session
+        if self._flush_event and len(self._dirty) >= self.flush_threshold:
+            self._flush_event.set()
+    
+    def flush(self):
+        """
+        Save all dirty sessions now
+        
+        Returns:
+            Number of sessions written
+        """
+        dirty = self._dirty
+        self._dirty = {}
+        for session in dirty.values():
+            self.save(session)
+        return len(dirty)
+    
+    async def run_flusher(self):
+        """
+        Background loop: flush dirty sessions on interval or threshold
+        Runs until stop_flusher() is called, then flushes once more
+        """
+        self._flush_event = asyncio.Event()
+        self._flushing = True
+        while self._flushing:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            if self._dirty:
+                self.flush()
+        self.flush()
+    
+    def stop_flusher(self):
+        """Stop the flusher loop"""
+        self._flushing = False
+        if self._flush_event:
+            self._flush_event.set()
     
     def save(self, session):
         """
-        Save session to JSONL file
+        Persist new session messages, compacting the file when needed
         
         Args:
             session: Session instance
         """
-        path = f"{self.sessions_dir}/{safe_filename(session.key)}.jsonl"
+        self._dirty.pop(session.key, None)
         try:
-            with open(path, 'w') as f:
-                for msg in session.messages:
-                    f.write(json.dumps(msg) + '\n')
+            pending = len(session.messages) - session._saved
+            if session._rewrite or pending < 0 or self._needs_compaction(session, pending):
+                self._compact(session)
+            elif pending:
+                self._append(session)
         except Exception as e:
             print(f"Error saving session {session.key}: {e}")
+        
+        # Refresh size accounting for sessions still cached
+        if session.key in self.sessions:
+            self.sessions.put(session.key, session, self._estimate_size(session))
+    
+    def _needs_compaction(self, session, pending):
+        """Check if file would exceed compact_factor times the live window"""
+        live = len(session.messages)
+        if self.max_messages and live > self.max_messages:
+            live = self.max_messages
+        return session._records + pending > self.compact_factor * max(live, 1)
+    
+    def _append(self, session):
+        """Append unsaved messages to the session file"""
+        pending = session.messages[session._saved:]
+        self.store.append(self._path(session.key), pending)
+        session._records += len(pending)
+        session._saved = len(session.messages)
+    
+    def _compact(self, session):
+        """Rewrite the session file with only the live window"""
+        if self.max_messages and len(session.messages) > self.max_messages:
+            session.messages = session.messages[-self.max_messages:]
+        
+        self.store.rewrite(self._path(session.key), session.messages)
+        
+        session._records = len(session.messages)
+        session._saved = len(session.messages)
+        session._rewrite = False
+        session._head = 0
     
     def _load(self, key):
         """
-        Load session from JSONL file
+        Load session from its session file
         
         Args:
             key: Session key
@@ -96,22 +303,266 @@ class SessionManager:
             Session instance (new or loaded)
         """
         session = Session(key)
-        path = f"{self.sessions_dir}/{safe_filename(key)}.jsonl"
+        path = self._path(key)
+        
+        if not file_exists(path):
+            self._migrate(key)
         
         if file_exists(path):
             try:
-                with open(path, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            msg = json.loads(line)
-                            session.messages.append(msg)
+                messages, head, records, torn = self.store.load(path, self.max_messages)
+                session.messages = messages
+                session._saved = len(messages)
+                session._head = head
+                session._records = records
+                # A torn final write must not be appended to
+                session._rewrite = torn
                 print(f"Loaded session {key} with {len(session.messages)} messages")
             except Exception as e:
                 print(f"Error loading session {key}: {e}")
         
         return session
     
+    def _move(self, old_path, new_path, store=None):
+        """Rename a session file and its sidecars"""
+        store = store or self.store
+        for src, dst in zip(store.paths(old_path), store.paths(new_path)):
+            if file_exists(src):
+                os.rename(src, dst)
+    
+    def _convert(self, old_path, new_path):
+        """Rewrite a legacy .jsonl file in the configured format"""
+        legacy = JsonlStore()
+        self.store.rewrite(new_path, legacy.read_tail(old_path, 0)[0])
+        legacy.remove(old_path)
+    
+    def _old_dirs(self, name):
+        """Directories an earlier layout may have left a session file in"""
+        dirs = [self.sessions_dir]
+        if self.prev_shards and self.prev_shards != self.shards:
+            dirs.append(f"{self.sessions_dir}/{self._shard_of(name, self.prev_shards)}")
+        return dirs
+    
+    def _migrate(self, key):
+        """Move a session file from an earlier layout or format to its configured path"""
+        name = safe_filename(key)
+        path = self._path(key)
+        try:
+            for directory in self._old_dirs(name):
+                old_path = f"{directory}/{name}{self.store.ext}"
+                if old_path != path and file_exists(old_path):
+                    self._move(old_path, path)
+                    return
+            
+            if isinstance(self.store, JsonlStore):
+                return
+            
+            ext = JsonlStore.ext
+            old_paths = [self._path(key, JsonlStore)]
+            old_paths += [f"{directory}/{name}{ext}" for directory in self._old_dirs(name)]
+            for old_path in old_paths:
+                if file_exists(old_path):
+                    self._convert(old_path, path)
+                    print(f"Migrated session {key} to {self.store.ext}")
+                    return
+        except Exception as e:
+            print(f"Error migrating session {key}: {e}")
+    
+    def _session_dirs(self):
+        """List the flat sessions directory and all shard directories"""
+        dirs = [self.sessions_dir]
+        for name in os.listdir(self.sessions_dir):
+            path = f"{self.sessions_dir}/{name}"
+            if len(name) == 2 and is_dir(path):
+                dirs.append(path)
+        return dirs
+    
+    def _session_files(self, directory=None):
+        """
+        List session data files in one directory, or across all shards
+        
+        Returns:
+            List of (directory, filename) tuples
+        """
+        dirs = [directory] if directory else self._session_dirs()
+        files = []
+        for directory in dirs:
+            for name in os.listdir(directory):
+                if name.endswith(JsonlStore.ext) or name.endswith(BinaryStore.ext):
+                    files.append((directory, name))
+        return files
+    
+    def migrate_all(self):
+        """
+        Move every session file to the configured format and shard layout
+        
+        Returns:
+            Number of session files converted or moved
+        """
+        migrated = 0
+        self.migrate_errors = 0
+        for directory, name in self._session_files():
+            old_path = f"{directory}/{name}"
+            if name.endswith(JsonlStore.ext):
+                stem = name[:-len(JsonlStore.ext)]
+            elif isinstance(self.store, BinaryStore):
+                stem = name[:-len(BinaryStore.ext)]
+            else:
+                continue  # binary files are not converted back to JSONL
+            new_path = f"{self._dir_for(stem)}/{stem}{self.store.ext}"
+            try:
+                if not name.endswith(self.store.ext):
+                    self._convert(old_path, new_path)
+                elif old_path != new_path:
+                    self._move(old_path, new_path)
+                else:
+                    continue
+                migrated += 1
+            except Exception as e:
+                self.migrate_errors += 1
+                print(f"Error migrating {old_path}: {e}")
+        self._bases.clear()
+        return migrated
+    
+    def _read_layout(self):
+        """Return the recorded layout dict, or None if there is none"""
+        try:
+            with open(f"{self.sessions_dir}/{self.LAYOUT_FILE}") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def check_layout(self):
+        """
+        Migrate all session files if shards or format changed since last start
+        
+        Call once at startup. The layout is recorded only after a migration
+        without errors, so a failed run is retried on the next start.
+        
+        Returns:
+            Number of session files converted or moved
+        """
+        layout = {"shards": self.shards, "format": self.format}
+        if self._read_layout() == layout:
+            return 0
+        migrated = self.migrate_all()
+        if migrated:
+            print(f"Migrated {migrated} session file(s) to the new layout")
+        if not self.migrate_errors:
+            with open(f"{self.sessions_dir}/{self.LAYOUT_FILE}", 'w') as f:
+                json.dump(layout, f)
+        return migrated
+    
+    def _ttl_for(self, name):
+        """TTL in seconds for a session file name (0 = never expires)"""
+        # safe_filename turns "channel:chat_id" into "channel_chat_id"
+        channel = name.split('_', 1)[0]
+        ttl = self.ttl.get(channel)
+        if ttl is None:
+            ttl = self.ttl.get("default", 0)
+        return ttl
+    
+    def _expire(self, directory, name, store):
+        """
+        Delete or archive one session file and its sidecars
+        
+        Returns:
+            Bytes removed from the live session files (archived files
+            are moved to sessions/archive/ rather than freed)
+        """
+        freed = 0
+        for path in store.paths(f"{directory}/{name}"):
+            if not file_exists(path):
+                continue
+            freed += os.stat(path)[6]
+            if self.expire_action == "archive":
+                archive_dir = f"{self.sessions_dir}/archive"
+                ensure_dir(archive_dir)
+                os.rename(path, archive_dir + path[path.rindex('/'):])
+            else:
+                os.remove(path)
+        return freed
+    
+    async def sweep(self):
+        """
+        Expire session files older than their channel TTL
+        
+        Files are checked sweep_batch at a time, yielding to the event
+        loop between batches. Sessions held in RAM are never expired.
+        
+        Returns:
+            Dict with scanned, expired and reclaimed (bytes) counts
+        """
+        result = {"scanned": 0, "expired": 0, "reclaimed": 0}
+        if not self.ttl:
+            return result
+        
+        active = set(self._path(key) for key in self.sessions.keys())
+        active.update(self._path(key) for key in self._dirty)
+        now = time.time()
+        
+        for session_dir in self._session_dirs():
+            for directory, name in self._session_files(session_dir):
+                result["scanned"] += 1
+                if result["scanned"] % self.sweep_batch == 0:
+                    await asyncio.sleep(0)
+                
+                path = f"{directory}/{name}"
+                store = BinaryStore if name.endswith(BinaryStore.ext) else JsonlStore
+                ttl = self._ttl_for(name[:-len(store.ext)])
+                if not ttl or path in active:
+                    continue
+                try:
+                    if now - os.stat(path)[8] > ttl:
+                        result["reclaimed"] += self._expire(directory, name, store())
+                        result["expired"] += 1
+                except OSError as e:
+                    print(f"Error expiring session {path}: {e}")
+        
+        self.reclaimed += result["reclaimed"]
+        return result
+    
+    async def run_sweeper(self):
+        """Background loop: run sweep() every sweep_interval seconds"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                result = await self.sweep()
+                if result["expired"]:
+                    print(f"Session sweep: expired {result['expired']} of "
+                          f"{result['scanned']} sessions, {result['reclaimed']} bytes")
+            except Exception as e:
+                print(f"Error in session sweeper: {e}")
+    
+    def load_older(self, session, count=20):
+        """
+        Prepend older messages from flash that were skipped at load time
+        
+        Args:
+            session: Session instance
+            count: Maximum number of older messages to load
+        
+        Returns:
+            Number of messages added
+        """
+        if session._head <= 0 or session._rewrite:
+            return 0
+        
+        path = self._path(session.key)
+        if not file_exists(path):
+            return 0
+        
+        try:
+            older, head, _ = self.store.read_tail(path, count, end=session._head)
+        except Exception as e:
+            print(f"Error loading history for {session.key}: {e}")
+            return 0
+        
+        session.messages = older + session.messages
+        session._saved += len(older)
+        session._head = head if older else 0
+        return len(older)
+    
     def delete(self, key):
         """
         Delete session
@@ -119,12 +570,12 @@ class SessionManager:
         Args:
             key: Session key
         """
-        if key in self.sessions:
-            del self.sessions[key]
+        self.sessions.pop(key)
+        self._dirty.pop(key, None)
         
-        path = f"{self.sessions_dir}/{safe_filename(key)}.jsonl"
+        path = self._path(key)
         if file_exists(path):
             try:
-                os.remove(path)
+                self.store.remove(path)
             except Exception as e:
                 print(f"Error deleting session file {key}: {e}")
@@ -0,0 +1,321 @@
+"""
+ChipClaw Session Stores
+On-flash formats for session history: JSONL (default) and compact binary
+
+Both stores expose the same interface to SessionManager. Positions
+returned as `head` are opaque cursors to the oldest record read (a byte
+offset for JSONL, a record number for binary) and are only passed back
+to read_tail() as `end`.
+"""
+import os
+import json
+import struct
+from ..utils import file_exists, compress, decompress, replace_file
+
+
+class JsonlStore:
+    """One JSON object per line, appended in order"""
+
+    ext = ".jsonl"
+    BLOCK_SIZE = 512  # Bytes read per step when scanning files backwards
+
+    def paths(self, path):
+        """All files backing a session file"""
+        return [path]
+
+    def append(self, path, messages):
+        """Append messages to the end of the file"""
+        with open(path, 'a') as f:
+            for msg in messages:
+                f.write(json.dumps(msg) + '\n')
+
+    def rewrite(self, path, messages):
+        """Atomically replace the file with messages"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            for msg in messages:
+                f.write(json.dumps(msg) + '\n')
+        replace_file(tmp_path, path)
+
+    def read_tail(self, path, limit, end=None):
+        """
+        Parse the last records of a JSONL file without reading all of it
+
+        Args:
+            path: Session file path
+            limit: Maximum records to parse (0 for all)
+            end: File offset to scan back from (default: end of file)
+
+        Returns:
+            Tuple of (messages oldest first, offset of oldest record, file size)
+        """
+        messages = []
+        with open(path, 'rb') as f:
+            size = f.seek(0, 2)
+            pos = size if end is None else end
+            head = pos
+            buf = b''
+            while pos > 0 and (not limit or len(messages) < limit):
+                step = min(self.BLOCK_SIZE, pos)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+
+                # Peel complete lines off the end of the buffer
+                while not limit or len(messages) < limit:
+                    idx = buf.rfind(b'\n')
+                    if idx < 0:
+                        if pos > 0:
+                            break  # first line is still partial
+                        idx = -1
+                    raw = buf[idx + 1:]
+                    buf = buf[:max(idx, 0)]
+                    if raw.strip():
+                        try:
+                            messages.append(json.loads(raw))
+                            head = pos + idx + 1
+                        except ValueError:
+                            print(f"Skipping corrupt record in {path}")
+                    if idx < 0:
+                        break
+
+        messages.reverse()
+        return messages, head, size
+
+    def load(self, path, limit):
+        """
+        Load the last records of a session file
+
+        Args:
+            path: Session file path
+            limit: Maximum records to parse (0 for all)
+
+        Returns:
+            Tuple of (messages, head, record count, torn) where torn means
+            the file must be rewritten before it can be appended to
+        """
+        messages, head, size = self.read_tail(path, limit)
+        # Older records are not parsed; estimate their count by size
+        records = len(messages)
+        if head and size > head:
+            records += head * len(messages) // (size - head)
+        return messages, head, records, self._is_torn(path, size)
+
+    def _is_torn(self, path, size):
+        """Check if a non-empty file lacks its final newline"""
+        if not size:
+            return False
+        with open(path, 'rb') as f:
+            f.seek(size - 1)
+            return f.read(1) != b'\n'
+
+    def remove(self, path):
+        """Delete the session file"""
+        os.remove(path)
+
+
+class BinaryStore:
+    """
+    Length-prefixed binary records with a sidecar offset index
+
+    Data file (.ccs): MAGIC, then per record a header
+        <payload length u32> <role u8> <flags u8> <content length u32>
+    followed by the content bytes (deflated when FLAG_DEFLATE) and any
+    remaining message fields as JSON. Index file (.cci): one u32 data
+    offset per record, so the last N records are one seek away.
+    """
+
+    ext = ".ccs"
+    index_ext = ".cci"
+    MAGIC = b"CCS1"
+    HEADER = "<IBBI"
+    HEADER_SIZE = 10
+    ROLES = ("", "user", "assistant", "system", "tool")
+    FLAG_DEFLATE = 1
+    FLAG_NONE = 2  # content is None (assistant turns with only tool calls)
+
+    def __init__(self, compress_min=256):
+        # Content at least this long is deflated when it saves space (0 disables)
+        self.compress_min = compress_min
+
+    def _index_path(self, path):
+        return path[:-len(self.ext)] + self.index_ext
+
+    def paths(self, path):
+        """All files backing a session file"""
+        return [path, self._index_path(path)]
+
+    def _encode(self, msg):
+        """Encode one message dict as a record"""
+        role = msg.get("role", "")
+        content = msg.get("content")
+        extras = {}
+        for k, v in msg.items():
+            if k != "content" and (k != "role" or role not in self.ROLES):
+                extras[k] = v
+
+        flags = 0
+        if content is None:
+            flags |= self.FLAG_NONE
+            body = b''
+        else:
+            body = content.encode('utf-8')
+            if self.compress_min and len(body) >= self.compress_min:
+                packed = compress(body)
+                if packed is not None and len(packed) < len(body):
+                    body = packed
+                    flags |= self.FLAG_DEFLATE
+
+        tail = json.dumps(extras).encode('utf-8') if extras else b''
+        role_id = self.ROLES.index(role) if role in self.ROLES else 0
+        header = struct.pack(self.HEADER, len(body) + len(tail), role_id, flags, len(body))
+        return header + body + tail
+
+    def _decode(self, data, pos):
+        """
+        Decode the record at data[pos:]
+
+        Returns:
+            Tuple of (message dict, position after record)
+        """
+        length, role_id, flags, content_len = struct.unpack_from(self.HEADER, data, pos)
+        start = pos + self.HEADER_SIZE
+        body = data[start:start + content_len]
+        tail = data[start + content_len:start + length]
+
+        msg = {}
+        if role_id:
+            msg["role"] = self.ROLES[role_id]
+        if flags & self.FLAG_NONE:
+            msg["content"] = None
+        else:
+            if flags & self.FLAG_DEFLATE:
+                body = decompress(body)
+            msg["content"] = body.decode('utf-8')
+        if tail:
+            msg.update(json.loads(tail))
+        return msg, start + length
+
+    def _write(self, data_path, index_path, messages, mode):
+        """Write records to data/index files opened with mode"""
+        with open(data_path, mode) as f:
+            offset = f.seek(0, 2)
+            if offset == 0:
+                f.write(self.MAGIC)
+                offset = len(self.MAGIC)
+            offsets = []
+            for msg in messages:
+                record = self._encode(msg)
+                f.write(record)
+                offsets.append(offset)
+                offset += len(record)
+        # Data first: an index entry must never point past the data
+        with open(index_path, mode) as f:
+            f.write(struct.pack("<%dI" % len(offsets), *offsets))
+
+    def append(self, path, messages):
+        """Append messages as records and index entries"""
+        self._write(path, self._index_path(path), messages, 'ab')
+
+    def rewrite(self, path, messages):
+        """Atomically replace data and index with messages"""
+        index_path = self._index_path(path)
+        self._write(path + ".tmp", index_path + ".tmp", messages, 'wb')
+        replace_file(path + ".tmp", path)
+        replace_file(index_path + ".tmp", index_path)
+
+    def _count(self, path):
+        """Number of indexed records"""
+        index_path = self._index_path(path)
+        if not file_exists(index_path):
+            return 0
+        return os.stat(index_path)[6] // 4
+
+    def read_tail(self, path, limit, end=None):
+        """
+        Read the last records before record number `end`
+
+        Args:
+            path: Data file path
+            limit: Maximum records to read (0 for all)
+            end: Record number to read up to (default: record count)
+
+        Returns:
+            Tuple of (messages oldest first, record number of oldest, count)
+        """
+        count = self._count(path)
+        if end is None or end > count:
+            end = count
+        start = max(0, end - limit) if limit else 0
+        if start >= end:
+            return [], end, count
+
+        with open(self._index_path(path), 'rb') as f:
+            f.seek(start * 4)
+            raw = f.read((end - start + (1 if end < count else 0)) * 4)
+        offsets = struct.unpack("<%dI" % (len(raw) // 4), raw)
+
+        with open(path, 'rb') as f:
+            stop = offsets[-1] if end < count else f.seek(0, 2)
+            f.seek(offsets[0])
+            data = f.read(stop - offsets[0])
+
+        messages = []
+        pos = 0
+        for _ in range(end - start):
+            msg, pos = self._decode(data, pos)
+            messages.append(msg)
+        return messages, start, count
+
+    def load(self, path, limit):
+        """
+        Load the last records of a session, repairing a torn index
+
+        Returns:
+            Tuple of (messages, head, record count, torn)
+        """
+        torn = not self._index_ok(path)
+        if torn:
+            self._rebuild_index(path)
+        messages, head, count = self.read_tail(path, limit)
+        return messages, head, count, torn
+
+    def _index_ok(self, path):
+        """Check that the last indexed record ends exactly at end of data"""
+        count = self._count(path)
+        size = os.stat(path)[6]
+        if not count:
+            return size <= len(self.MAGIC)
+        with open(self._index_path(path), 'rb') as f:
+            f.seek((count - 1) * 4)
+            offset = struct.unpack("<I", f.read(4))[0]
+        if offset + self.HEADER_SIZE > size:
+            return False
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            length = struct.unpack_from(self.HEADER, f.read(self.HEADER_SIZE))[0]
+        return offset + self.HEADER_SIZE + length == size
+
+    def _rebuild_index(self, path):
+        """Recreate the index by walking record headers; drops a partial tail"""
+        size = os.stat(path)[6]
+        offsets = []
+        with open(path, 'rb') as f:
+            pos = len(self.MAGIC)
+            while pos + self.HEADER_SIZE <= size:
+                f.seek(pos)
+                length = struct.unpack_from(self.HEADER, f.read(self.HEADER_SIZE))[0]
+                if pos + self.HEADER_SIZE + length > size:
+                    break
+                offsets.append(pos)
+                pos += self.HEADER_SIZE + length
+        with open(self._index_path(path), 'wb') as f:
+            f.write(struct.pack("<%dI" % len(offsets), *offsets))
+        print(f"Rebuilt session index for {path} ({len(offsets)} records)")
+
+    def remove(self, path):
+        """Delete data and index files"""
+        os.remove(path)
+        index_path = self._index_path(path)
+        if file_exists(index_path):
+            os.remove(index_path)
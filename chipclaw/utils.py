@@ -4,6 +4,21 @@ ChipClaw Utility Functions
 import os
 import time
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+try:
+    import zlib
+except ImportError:
+    zlib = None
+
+try:
+    import deflate  # MicroPython 1.21+
+except ImportError:
+    deflate = None
+
 
 def file_exists(path):
     """
@@ -28,6 +43,14 @@ def file_exists(path):
         return False
 
 
+def is_dir(path):
+    """Check if path exists and is a directory (MicroPython compatible)"""
+    try:
+        return os.stat(path)[0] & 0x4000 != 0
+    except OSError:
+        return False
+
+
 def ensure_dir(path):
     """
     Create directory if it doesn't exist (MicroPython compatible)
@@ -66,6 +89,30 @@ def timestamp():
     return time.time()
 
 
+def ticks_ms():
+    """Return monotonic milliseconds (wraps on MicroPython; use ticks_diff)"""
+    if hasattr(time, "ticks_ms"):
+        return time.ticks_ms()
+    return int(time.perf_counter() * 1000)
+
+
+def ticks_diff(end, start):
+    """Return milliseconds from start to end, handling ticks wraparound"""
+    if hasattr(time, "ticks_diff"):
+        return time.ticks_diff(end, start)
+    return end - start
+
+
+def replace_file(tmp_path, path):
+    """Move tmp_path over path"""
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # FAT refuses to rename over an existing file
+        os.remove(path)
+        os.rename(tmp_path, path)
+
+
 def safe_filename(name):
     """Sanitize filename (replace : / \\ with _)"""
     return name.replace(":", "_").replace("/", "_").replace("\\", "_")
@@ -78,6 +125,72 @@ def truncate_string(s, max_len=1000):
     return s
 
 
+def compress(data):
+    """
+    Deflate-compress bytes (zlib container)
+    
+    Uses zlib on CPython and the deflate module on MicroPython, whose
+    compressor is optional in firmware builds.
+    
+    Returns:
+        Compressed bytes, or None if no compressor is available
+    """
+    if zlib and hasattr(zlib, 'compress'):
+        return zlib.compress(data)
+    if deflate:
+        try:
+            import io
+            buf = io.BytesIO()
+            with deflate.DeflateIO(buf, deflate.ZLIB) as d:
+                d.write(data)
+            return buf.getvalue()
+        except Exception:
+            return None
+    return None
+
+
+def decompress(data, limit=0):
+    """
+    Inverse of compress()
+    
+    With a limit, inflation stops after limit + 1 bytes, so a small
+    deflate bomb cannot exhaust the heap before the size is checked.
+    
+    Args:
+        data: Compressed bytes
+        limit: Largest accepted output in bytes (0 = no limit)
+    
+    Raises:
+        ValueError: If the output is larger than limit
+        OSError: If no decompressor is available
+        Exception: zlib.error / OSError for corrupt or truncated data
+    """
+    if limit and zlib and hasattr(zlib, 'decompressobj'):
+        d = zlib.decompressobj()
+        out = d.decompress(data, limit + 1)
+        if len(out) > limit:
+            raise ValueError("Inflated size over limit")
+        if not d.eof:
+            raise ValueError("Truncated deflate data")
+        return out
+    if limit and deflate:
+        import io
+        out = deflate.DeflateIO(io.BytesIO(data), deflate.ZLIB).read(limit + 1)
+        if len(out) > limit:
+            raise ValueError("Inflated size over limit")
+        return out
+    if zlib and hasattr(zlib, 'decompress'):
+        out = zlib.decompress(data)
+    elif deflate:
+        import io
+        out = deflate.DeflateIO(io.BytesIO(data), deflate.ZLIB).read()
+    else:
+        raise OSError("No deflate support")
+    if limit and len(out) > limit:
+        raise ValueError("Inflated size over limit")
+    return out
+
+
 def get_runtime_info():
     """Get ESP32-S3 runtime information"""
     info = {}
@@ -127,3 +240,115 @@ def format_runtime_info():
         lines.append(f"Flash Free: {info['flash_free']} KB / {info.get('flash_total', 0)} KB")
     
     return "\n".join(lines) if lines else "Runtime info unavailable"
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by entry count and/or total bytes
+    
+    Each entry carries a caller-supplied size estimate so the cache can
+    enforce a RAM budget. A limit of 0 disables that bound. The most
+    recently inserted entry is never evicted, so a single oversized
+    value is still served until something else replaces it.
+    
+    on_evict(key, value) is called for entries dropped to honour a
+    limit, but not for pop() or clear().
+    """
+    
+    def __init__(self, max_entries=0, max_bytes=0, on_evict=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()  # {key: (value, size)}, oldest first
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def __contains__(self, key):
+        return key in self._data
+    
+    def keys(self):
+        """Return keys from least to most recently used"""
+        return list(self._data.keys())
+    
+    def get(self, key, default=None):
+        """
+        Look up key and mark it most recently used
+        
+        Args:
+            key: Cache key
+            default: Value returned on miss
+        
+        Returns:
+            Cached value or default
+        """
+        entry = self._data.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._data[key] = entry
+        self.hits += 1
+        return entry[0]
+    
+    def peek(self, key, default=None):
+        """Look up key without changing its recency or the hit counters"""
+        entry = self._data.get(key)
+        return default if entry is None else entry[0]
+    
+    def put(self, key, value, size=0):
+        """
+        Insert or replace key, then evict until within limits
+        
+        Args:
+            key: Cache key
+            value: Value to store
+            size: Estimated size of value in bytes
+        """
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._data[key] = (value, size)
+        self.bytes += size
+        self._evict()
+    
+    def pop(self, key, default=None):
+        """Remove key without counting an eviction"""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        self.bytes -= entry[1]
+        return entry[0]
+    
+    def clear(self):
+        """Drop all entries"""
+        self._data = OrderedDict()
+        self.bytes = 0
+    
+    def _over_limit(self):
+        if self.max_entries and len(self._data) > self.max_entries:
+            return True
+        return self.max_bytes > 0 and self.bytes > self.max_bytes
+    
+    def _evict(self):
+        """Evict least recently used entries while over a limit"""
+        while len(self._data) > 1 and self._over_limit():
+            key = next(iter(self._data))
+            value, size = self._data.pop(key)
+            self.bytes -= size
+            self.evictions += 1
+            if self.on_evict:
+                self.on_evict(key, value)
+    
+    def stats(self):
+        """Return cache counters as a dict"""
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
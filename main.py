@@ -12,8 +12,12 @@ from chipclaw.bus.queue import MessageBus
 from chipclaw.providers.http_provider import HTTPProvider
 from chipclaw.session.manager import SessionManager
 from chipclaw.agent.loop import AgentLoop
+from chipclaw.channels.http import HTTPChannel
 from chipclaw.channels.mqtt import MQTTChannel
+from chipclaw.channels.ratelimit import RateLimiter
+from chipclaw.channels.spool import Spool
 from chipclaw.channels.uart import UARTChannel
+from chipclaw.channels.websocket import WebSocketChannel
 
 
 async def main():
@@ -28,7 +32,7 @@ async def main():
     
     # Initialize message bus
     print("Initializing message bus...")
-    bus = MessageBus()
+    bus = MessageBus(config.get("bus"))
     
     # Initialize LLM provider
     print("Initializing LLM provider...")
@@ -39,7 +43,13 @@ async def main():
     
     # Initialize session manager
     print("Initializing session manager...")
-    sessions = SessionManager(config.workspace)
+    sessions = SessionManager(
+        config.workspace,
+        max_messages=config.get("agent", "max_session_messages", default=20),
+        config=config.get("sessions")
+    )
+    # Move session files if sessions.shards or sessions.format changed
+    sessions.check_layout()
     
     # Initialize agent
     print("Initializing agent...")
@@ -51,10 +61,27 @@ async def main():
     # MQTT channel
     if config.get("channels", "mqtt", "enabled"):
         print("Initializing MQTT channel...")
-        mqtt = MQTTChannel(bus, config.get("channels", "mqtt"))
+        spool = None
+        if config.get("channels", "mqtt", "spool", "enabled"):
+            spool = Spool(f"{config.workspace}/spool/mqtt", config.get("channels", "mqtt", "spool"))
+        mqtt = MQTTChannel(bus, config.get("channels", "mqtt"), spool=spool)
         channels.append(mqtt)
         bus.subscribe_outbound("mqtt", mqtt.send)
     
+    # HTTP channel
+    if config.get("channels", "http", "enabled"):
+        print("Initializing HTTP channel...")
+        http = HTTPChannel(bus, config.get("channels", "http"))
+        channels.append(http)
+        bus.subscribe_outbound("http", http.send)
+    
+    # WebSocket channel
+    if config.get("channels", "websocket", "enabled"):
+        print("Initializing WebSocket channel...")
+        websocket = WebSocketChannel(bus, config.get("channels", "websocket"))
+        channels.append(websocket)
+        bus.subscribe_outbound("websocket", websocket.send)
+    
     # UART channel
     if config.get("channels", "uart", "enabled"):
         print("Initializing UART channel...")
@@ -62,13 +89,25 @@ async def main():
         channels.append(uart)
         bus.subscribe_outbound("uart", uart.send)
     
+    # One limiter shared by every channel
+    if config.get("rate_limit", "enabled"):
+        limiter = RateLimiter(config.get("rate_limit"))
+        for ch in channels:
+            ch.limiter = limiter
+    
+    # Channel health for metrics and the bus_stats tool
+    for ch in channels:
+        bus.register_health(ch.name, ch.supervisor)
+    
     print(f"Initialized {len(channels)} channel(s)")
     
     # Gather all tasks
     print("Starting tasks...")
     tasks = [
         agent.run(),
-        bus.dispatch_outbound()
+        bus.dispatch_outbound(),
+        sessions.run_flusher(),
+        sessions.run_sweeper()
     ]
     
     # Add channel tasks
@@ -80,7 +119,11 @@ async def main():
     print("=" * 50)
     
     # Run all tasks
-    await asyncio.gather(*tasks)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # Persist sessions still waiting for write-behind
+        sessions.flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+"""
+Benchmark: bus event allocation and construction cost
+
+Compares the slotted events with the previous __dict__-based classes
+(reproduced below) for bytes allocated per message and microseconds
+to create a message and read its session key twice:
+
+    python tests/benchmarks/bench_events.py
+
+Bytes come from tracemalloc on CPython and gc.mem_alloc() on MicroPython.
+"""
+import sys
+import os
+import gc
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from chipclaw.bus.events import InboundMessage
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+COUNT = 10000
+
+
+class LegacyInboundMessage:
+    """InboundMessage before __slots__ and lazy metadata"""
+    
+    def __init__(self, channel, sender_id, chat_id, content, media=None, metadata=None):
+        self.channel = channel
+        self.sender_id = sender_id
+        self.chat_id = chat_id
+        self.content = content
+        self.media = media
+        self.metadata = metadata or {}
+    
+    @property
+    def session_key(self):
+        return f"{self.channel}:{self.chat_id}"
+
+
+def ticks_us():
+    """Monotonic microseconds on both runtimes"""
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+    return int(time.perf_counter() * 1000000)
+
+
+def make(cls, n):
+    msg = cls("uart", "user1", n, "hello")
+    msg.session_key
+    msg.session_key
+    return msg
+
+
+def bytes_per_message(cls):
+    """Average bytes held per live message"""
+    gc.collect()
+    if tracemalloc:
+        tracemalloc.start()
+        keep = [make(cls, i) for i in range(COUNT)]
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    else:
+        before = gc.mem_alloc()
+        keep = [make(cls, i) for i in range(COUNT)]
+        used = gc.mem_alloc() - before
+    del keep
+    return used // COUNT
+
+
+def us_per_message(cls):
+    gc.collect()
+    start = ticks_us()
+    for i in range(COUNT):
+        make(cls, i)
+    return (ticks_us() - start) / COUNT
+
+
+def main():
+    print(f"{COUNT} messages each")
+    print(f"{'class':<22}{'bytes/msg':>12}{'us/msg':>10}")
+    for label, cls in (("legacy (__dict__)", LegacyInboundMessage), ("slotted", InboundMessage)):
+        print(f"{label:<22}{bytes_per_message(cls):>12}{us_per_message(cls):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
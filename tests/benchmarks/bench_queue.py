@@ -0,0 +1,100 @@
+"""
+Benchmark: message bus Queue throughput
+
+Measures messages per second for synchronous put/get on a deep queue
+and for an async producer/consumer pair, single and batched:
+
+    python tests/benchmarks/bench_queue.py
+    micropython tests/benchmarks/bench_queue.py
+
+The MicroPython unix port has no os.path; run it from the repository
+root so `chipclaw` is importable from the current directory.
+"""
+import sys
+import os
+import time
+try:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+except AttributeError:
+    sys.path.insert(0, "")
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.bus.queue import Queue
+
+MESSAGES = 20000
+DEPTHS = (10, 1000, 10000)
+BATCH = 32
+
+
+def ticks_us():
+    """Monotonic microseconds on both runtimes"""
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+    return int(time.perf_counter() * 1000000)
+
+
+def rate(count, elapsed_us):
+    return int(count * 1000000 / max(elapsed_us, 1))
+
+
+def bench_nowait(depth):
+    """Fill to depth, then alternate put/get so the queue stays deep"""
+    q = Queue()
+    for i in range(depth):
+        q.put_nowait(i)
+    start = ticks_us()
+    for i in range(MESSAGES):
+        q.put_nowait(i)
+        q.get_nowait()
+    return rate(MESSAGES, ticks_us() - start)
+
+
+async def bench_async(maxsize, batch):
+    """Producer and consumer tasks exchanging MESSAGES items"""
+    q = Queue(maxsize)
+    
+    async def producer():
+        if batch:
+            for i in range(0, MESSAGES, batch):
+                await q.put_many(range(i, min(i + batch, MESSAGES)))
+        else:
+            for i in range(MESSAGES):
+                await q.put(i)
+    
+    async def consumer():
+        received = 0
+        while received < MESSAGES:
+            if batch:
+                received += len(await q.get_many(batch))
+            else:
+                await q.get()
+                received += 1
+    
+    start = ticks_us()
+    await asyncio.gather(producer(), consumer())
+    return rate(MESSAGES, ticks_us() - start)
+
+
+def main():
+    print(f"{MESSAGES} messages per run, results in msg/s")
+    print()
+    print(f"{'put/get_nowait at depth':<28}{'msg/s':>12}")
+    for depth in DEPTHS:
+        print(f"{depth:<28}{bench_nowait(depth):>12}")
+    
+    print()
+    print(f"{'async producer/consumer':<28}{'msg/s':>12}")
+    for label, maxsize, batch in (
+        ("maxsize=0", 0, 0),
+        ("maxsize=64", 64, 0),
+        (f"maxsize=64 batch={BATCH}", 64, BATCH),
+    ):
+        print(f"{label:<28}{asyncio.run(bench_async(maxsize, batch)):>12}")
+
+
+if __name__ == "__main__":
+    main()
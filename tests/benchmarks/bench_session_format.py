@@ -0,0 +1,86 @@
+"""
+Benchmark: session file size and load time, JSONL vs binary
+
+Writes the same history with each store and times loading the last
+20 records (what the agent does) and the full history:
+
+    python tests/benchmarks/bench_session_format.py
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from chipclaw.utils import ensure_dir
+from chipclaw.session.store import JsonlStore, BinaryStore
+
+WORKSPACE = "/tmp/chipclaw_bench_format"
+HISTORY_SIZES = (100, 1000)
+TAIL = 20
+SAMPLES = 5
+
+STORES = (
+    ("jsonl", JsonlStore()),
+    ("binary", BinaryStore(compress_min=0)),
+    ("binary+deflate", BinaryStore(compress_min=256)),
+)
+
+
+def ticks_us():
+    """Monotonic microseconds on both runtimes"""
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+    return int(time.perf_counter() * 1000000)
+
+
+def make_history(count):
+    reply = "Pin 2 is now HIGH. The LED should be on; I also read ADC 34 = 1820. " * 6
+    messages = []
+    for i in range(count):
+        if i % 2:
+            messages.append({"role": "assistant", "content": reply})
+        else:
+            messages.append({"role": "user", "content": "turn on the led and read sensor %d" % i})
+    return messages
+
+
+def file_size(path):
+    try:
+        return os.stat(path)[6]
+    except OSError:
+        return 0
+
+
+def cleanup():
+    try:
+        for name in os.listdir(WORKSPACE):
+            os.remove(WORKSPACE + "/" + name)
+    except OSError:
+        pass
+
+
+def time_load(store, path, limit):
+    start = ticks_us()
+    for _ in range(SAMPLES):
+        store.load(path, limit)
+    return (ticks_us() - start) // SAMPLES
+
+
+def main():
+    ensure_dir(WORKSPACE)
+    print("history  format           bytes    tail_us    full_us")
+    for count in HISTORY_SIZES:
+        messages = make_history(count)
+        for name, store in STORES:
+            cleanup()
+            path = WORKSPACE + "/bench" + store.ext
+            store.append(path, messages)
+            size = file_size(path) + file_size(path[:-len(store.ext)] + ".cci")
+            tail_us = time_load(store, path, TAIL)
+            full_us = time_load(store, path, 0)
+            print("%7d  %-14s %7d %10d %10d" % (count, name, size, tail_us, full_us))
+    cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: session save latency as history grows
+
+Compares append-only saves against the previous full-file rewrite.
+Runs on CPython and on MicroPython (unix port or device):
+
+    python tests/benchmarks/bench_session_save.py
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from chipclaw.session.manager import SessionManager
+
+WORKSPACE = "/tmp/chipclaw_bench_save"
+HISTORY_SIZES = (10, 100, 500, 1000)
+SAMPLES = 20
+
+
+def ticks_us():
+    """Monotonic microseconds on both runtimes"""
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+    return int(time.perf_counter() * 1000000)
+
+
+def cleanup():
+    sessions_dir = WORKSPACE + "/sessions"
+    try:
+        for name in os.listdir(sessions_dir):
+            os.remove(sessions_dir + "/" + name)
+    except OSError:
+        pass
+
+
+def bench(history, rewrite):
+    """Average microseconds to save one new message on top of history"""
+    cleanup()
+    manager = SessionManager(WORKSPACE)
+    session = manager.get_or_create("bench:%d" % history)
+    for i in range(history):
+        session.add_message("user", "message %d with some typical chat text" % i)
+    manager.save(session)
+    
+    total = 0
+    for i in range(SAMPLES):
+        session.add_message("assistant", "reply %d with some typical chat text" % i)
+        if rewrite:
+            session._rewrite = True  # force the old whole-file rewrite
+        start = ticks_us()
+        manager.save(session)
+        total += ticks_us() - start
+    return total // SAMPLES
+
+
+def main():
+    print("history   append_us  rewrite_us")
+    for history in HISTORY_SIZES:
+        append_us = bench(history, rewrite=False)
+        rewrite_us = bench(history, rewrite=True)
+        print("%7d %11d %11d" % (history, append_us, rewrite_us))
+    cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: session open latency, flat directory vs hash shards
+
+Creates N session files in each layout and times opening existing
+sessions and probing for missing ones:
+
+    python tests/benchmarks/bench_session_shards.py
+
+Desktop filesystems such as ext4 hash directory entries, so the flat
+layout stays fast there; the difference shows on FAT and LittleFS.
+10k files take a while to create on a device; pass a smaller maximum
+as the first argument (e.g. 1000) when running on flash.
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from chipclaw.session.manager import SessionManager
+
+WORKSPACE = "/tmp/chipclaw_bench_shards"
+SESSION_COUNTS = (10, 1000, 10000)
+LAYOUTS = (("flat", 0), ("shards=256", 256))
+PROBES = 200
+
+
+def ticks_us():
+    """Monotonic microseconds on both runtimes"""
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+    return int(time.perf_counter() * 1000000)
+
+
+def rmtree(path):
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return
+    for name in names:
+        child = path + "/" + name
+        if os.stat(child)[0] & 0x4000:
+            rmtree(child)
+        else:
+            os.remove(child)
+    os.rmdir(path)
+
+
+def bench(count, shards):
+    """Average microseconds per open of an existing / missing session"""
+    rmtree(WORKSPACE)
+    manager = SessionManager(WORKSPACE, config={"shards": shards})
+    for i in range(count):
+        with open(manager._path("mqtt:chat%d" % i), 'w') as f:
+            f.write('{"role": "user", "content": "hi"}\n')
+    
+    # Fresh manager so path resolution is part of the measurement
+    manager = SessionManager(WORKSPACE, config={"shards": shards})
+    start = ticks_us()
+    for i in range(PROBES):
+        with open(manager._path("mqtt:chat%d" % (i * 7919 % count)), 'rb') as f:
+            f.read(1)
+    open_us = (ticks_us() - start) // PROBES
+    
+    start = ticks_us()
+    for i in range(PROBES):
+        try:
+            os.stat(manager._path("mqtt:missing%d" % i))
+        except OSError:
+            pass
+    miss_us = (ticks_us() - start) // PROBES
+    return open_us, miss_us
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else SESSION_COUNTS[-1]
+    print("sessions  layout        open_us   miss_us")
+    for count in SESSION_COUNTS:
+        if count > limit:
+            continue
+        for name, shards in LAYOUTS:
+            open_us, miss_us = bench(count, shards)
+            print("%8d  %-12s %8d %9d" % (count, name, open_us, miss_us))
+    rmtree(WORKSPACE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: UART ingest throughput through a pseudo-terminal
+
+Writes JSON lines of several sizes into the master side of a pty and
+times how long UARTChannel takes to publish them all, reading from the
+slave side in raw mode as it would read the REPL UART:
+
+    python tests/benchmarks/bench_uart_ingest.py
+
+Needs the pty and tty modules (CPython on Linux/macOS). The previous
+read loop took one byte per 50 ms wakeup, i.e. about 20 B/s, so a 2 KB
+line took over 100 s.
+"""
+import sys
+import os
+import json
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import asyncio
+import pty
+import tty
+
+from chipclaw.channels.uart import UARTChannel
+
+LINE_SIZES = (64, 2048, 16384)
+TOTAL_BYTES = 256 * 1024
+
+
+class CountingBus:
+    """Stands in for MessageBus; counts published messages"""
+    
+    def __init__(self):
+        self.count = 0
+    
+    async def publish_inbound(self, msg):
+        self.count += 1
+
+
+def ticks_us():
+    """Monotonic microseconds on both runtimes"""
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+    return int(time.perf_counter() * 1000000)
+
+
+async def bench(line_size):
+    """Return (lines, bytes/s) for TOTAL_BYTES of line_size-byte lines"""
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    os.set_blocking(master, False)
+    stream = os.fdopen(slave, 'rb', buffering=0)
+    bus = CountingBus()
+    channel = UARTChannel(bus, {"max_line": line_size * 2}, stream=stream)
+    
+    body = "x" * (line_size - len(json.dumps({"content": ""})) - 1)
+    line = (json.dumps({"content": body}) + "\n").encode()
+    lines = TOTAL_BYTES // len(line)
+    
+    await channel.start()
+    start = ticks_us()
+    pending = line * lines
+    while pending:
+        try:
+            pending = pending[os.write(master, pending[:4096]):]
+        except BlockingIOError:
+            pass  # pty buffer full; let the reader catch up
+        await asyncio.sleep(0)
+    while bus.count < lines:
+        await asyncio.sleep(0.001)
+    elapsed = ticks_us() - start
+    
+    await channel.stop()
+    await asyncio.sleep(0.1)
+    stream.close()
+    os.close(master)
+    return lines, int(lines * len(line) * 1000000 / elapsed)
+
+
+def main():
+    print(f"{TOTAL_BYTES // 1024} KB per run")
+    print(f"{'line bytes':<12}{'lines':>8}{'bytes/s':>12}")
+    for size in LINE_SIZES:
+        lines, rate = asyncio.run(bench(size))
+        print(f"{size:<12}{lines:>8}{rate:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: WebSocket channel under many concurrent clients
+
+Opens CLIENTS simulated clients against a WebSocketChannel on localhost.
+Each client sends ROUNDS messages, one at a time, and waits for each
+reply. A stand-in agent answers every message immediately, so the
+numbers measure the channel itself: handshakes, framing, masking and
+per-connection writer tasks.
+
+    python tests/benchmarks/bench_websocket.py [clients] [rounds]
+
+CPython host build only (a few hundred sockets).
+"""
+import sys
+import os
+import json
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import asyncio
+
+from chipclaw.channels.websocket import WebSocketChannel, encode_frame, read_frame, OP_TEXT, OP_CLOSE
+from chipclaw.bus.events import OutboundMessage
+
+CLIENTS = 300
+ROUNDS = 5
+MASK = b"\x0f\x1e\x2d\x3c"
+
+
+class ReplyBus:
+    """Stands in for bus + agent: answers each message at once"""
+
+    def __init__(self):
+        self.channel = None
+
+    async def publish_inbound(self, msg):
+        await self.channel.send(OutboundMessage("websocket", msg.chat_id, msg.content, reply_to=msg))
+
+
+def ticks_us():
+    """Monotonic microseconds on both runtimes"""
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+    return int(time.perf_counter() * 1000000)
+
+
+async def client(port, index, rounds, rtts):
+    """One simulated client; appends each round-trip time in us to rtts"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write((f"GET /ws?chat_id=load{index} HTTP/1.1\r\nHost: bench\r\n"
+                  "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                  "Sec-WebSocket-Key: YmVuY2htYXJrLWtleS0wMQ==\r\n"
+                  "Sec-WebSocket-Version: 13\r\n\r\n").encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 101"), head
+
+    for n in range(rounds):
+        body = json.dumps({"content": f"message {n} from {index}"}).encode()
+        start = ticks_us()
+        writer.write(encode_frame(OP_TEXT, body, MASK))
+        _, opcode, _, payload = await read_frame(reader, 1 << 16)
+        rtts.append(ticks_us() - start)
+        assert opcode == OP_TEXT and json.loads(payload)["type"] == "reply"
+
+    writer.write(encode_frame(OP_CLOSE, b"\x03\xe8", MASK))
+    await read_frame(reader, 1 << 16)
+    writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def bench(clients, rounds):
+    bus = ReplyBus()
+    channel = WebSocketChannel(bus, {"host": "127.0.0.1", "port": 0,
+                                     "max_connections": clients, "ping_interval": 0})
+    bus.channel = channel
+    await channel.start()
+    port = channel.server.sockets[0].getsockname()[1]
+
+    rtts = []
+    start = ticks_us()
+    await asyncio.gather(*[client(port, i, rounds, rtts) for i in range(clients)])
+    elapsed = ticks_us() - start
+    await channel.stop()
+
+    print(f"{clients} clients x {rounds} round trips in {elapsed / 1000:.0f} ms "
+          f"({len(rtts) * 1000000 / elapsed:.0f} msg/s)")
+    print(f"round trip us: p50={percentile(rtts, 50)} p95={percentile(rtts, 95)} max={max(rtts)}")
+    print(f"server: {channel.metrics()}")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else CLIENTS
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else ROUNDS
+    asyncio.run(bench(clients, rounds))
+
+
+if __name__ == "__main__":
+    main()
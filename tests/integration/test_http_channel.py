@@ -0,0 +1,221 @@
+"""
+Integration tests for chipclaw.channels.http
+Drives the server over real localhost sockets
+"""
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.channels.http import HTTPChannel
+from chipclaw.bus.events import OutboundMessage
+
+
+class EchoBus:
+    """Stands in for bus + agent: answers each inbound message"""
+    def __init__(self):
+        self.channel = None
+        self.inbound_messages = []
+
+    async def publish_inbound(self, msg):
+        self.inbound_messages.append(msg)
+        asyncio.create_task(self._answer(msg))
+
+    async def _answer(self, msg):
+        await asyncio.sleep(0.01)
+        await self.channel.send(OutboundMessage("http", msg.chat_id, "working..."))
+        await self.channel.send(OutboundMessage("http", msg.chat_id, f"echo: {msg.content}", reply_to=msg))
+
+    def stats(self):
+        return {"http": {"sent": 1}}
+
+    def latency(self):
+        return {}
+
+    def health(self):
+        return {"http": {"state": "connected"}}
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+async def _start(config=None):
+    bus = EchoBus()
+    cfg = {"host": "127.0.0.1", "port": 0}
+    cfg.update(config or {})
+    channel = HTTPChannel(bus, cfg)
+    bus.channel = channel
+    await channel.start()
+    return channel, channel.server.sockets[0].getsockname()[1]
+
+
+async def _request(port, method, path, body=b"", headers=None):
+    """Send one request and return (status, headers, body) after the server closes"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+    for name, value in (headers or {}).items():
+        head += f"{name}: {value}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    raw = await asyncio.wait_for(reader.read(-1), 5)
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    lines = head.decode().split("\r\n")
+    status = int(lines[0].split()[1])
+    response_headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        response_headers[name.lower()] = value.strip()
+    return status, response_headers, payload
+
+
+def _events(payload):
+    events = []
+    for block in payload.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_http_chat_streams_sse():
+    """Test POST /chat streams each reply as an event, then done"""
+    async def run_test():
+        channel, port = await _start()
+        try:
+            body = json.dumps({"content": "hi", "chat_id": "dash"}).encode()
+            status, headers, payload = await _request(port, "POST", "/chat", body,
+                                                      {"Content-Type": "application/json"})
+            assert status == 200
+            assert headers["content-type"] == "text/event-stream"
+            chat = "127.0.0.1:dash"  # no token: namespaced by peer
+            assert _events(payload) == [
+                ("message", {"content": "working...", "chat_id": chat}),
+                ("message", {"content": "echo: hi", "chat_id": chat}),
+                ("done", {})
+            ]
+            assert channel.bus.inbound_messages[0].channel == "http"
+        finally:
+            await channel.stop()
+
+    run_async_test(run_test)
+
+
+def test_http_chat_json_reply():
+    """Test Accept: application/json returns only the final reply"""
+    async def run_test():
+        channel, port = await _start()
+        try:
+            status, _, payload = await _request(port, "POST", "/chat", b"plain words",
+                                                {"Accept": "application/json"})
+            assert status == 200
+            reply = json.loads(payload)
+            assert reply == {"content": "echo: plain words", "chat_id": "http_127.0.0.1"}
+        finally:
+            await channel.stop()
+
+    run_async_test(run_test)
+
+
+def test_http_concurrent_chats():
+    """Test parallel requests for one chat each get their own reply"""
+    async def run_test():
+        channel, port = await _start()
+        try:
+            requests = [
+                _request(port, "POST", "/chat", json.dumps({"content": str(i), "chat_id": "c"}).encode(),
+                         {"Accept": "application/json"})
+                for i in range(3)
+            ]
+            results = await asyncio.gather(*requests)
+            assert sorted(json.loads(r[2])["content"] for r in results) == ["echo: 0", "echo: 1", "echo: 2"]
+        finally:
+            await channel.stop()
+
+    run_async_test(run_test)
+
+
+def test_http_connection_cap():
+    """Test connections past max_connections get 503"""
+    async def run_test():
+        channel, port = await _start({"max_connections": 1})
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics HTTP/1.1\r\n")  # headers never finished
+            await writer.drain()
+            await asyncio.sleep(0.05)
+            status, headers, _ = await _request(port, "GET", "/metrics")
+            assert status == 503
+            assert headers["retry-after"] == "1"
+            assert channel.stats["rejected"] == 1
+            writer.close()
+        finally:
+            await channel.stop()
+            await asyncio.sleep(0.01)
+
+    run_async_test(run_test)
+
+
+def test_http_chat_ids_namespaced_without_token():
+    """Test client chat_ids are prefixed with the peer unless a token is set"""
+    async def run_test():
+        accept = {"Accept": "application/json"}
+        channel, port = await _start()
+        try:
+            body = json.dumps({"content": "hi", "chat_id": "http_10.0.0.9"}).encode()
+            _, _, payload = await _request(port, "POST", "/chat", body, accept)
+            assert json.loads(payload)["chat_id"] == "127.0.0.1:http_10.0.0.9"
+        finally:
+            await channel.stop()
+
+        channel, port = await _start({"token": "s3cret"})
+        try:
+            body = json.dumps({"content": "hi", "chat_id": "dash"}).encode()
+            headers = {"Accept": "application/json", "Authorization": "Bearer s3cret"}
+            _, _, payload = await _request(port, "POST", "/chat", body, headers)
+            assert json.loads(payload)["chat_id"] == "dash"
+        finally:
+            await channel.stop()
+
+    run_async_test(run_test)
+
+
+def test_http_metrics_and_errors():
+    """Test /metrics, auth, unknown paths, wrong methods and body limits"""
+    async def run_test():
+        channel, port = await _start({"token": "s3cret", "max_body": 10})
+        auth = {"Authorization": "Bearer s3cret"}
+        try:
+            status, _, payload = await _request(port, "GET", "/metrics", headers=auth)
+            assert status == 200
+            data = json.loads(payload)
+            assert data["queues"] == {"http": {"sent": 1}}
+            assert data["health"]["http"]["state"] == "connected"
+            assert data["http"]["connections"] == 1
+
+            assert (await _request(port, "GET", "/metrics"))[0] == 401
+            assert (await _request(port, "GET", "/nope", headers=auth))[0] == 404
+            assert (await _request(port, "GET", "/chat", headers=auth))[0] == 405
+            assert (await _request(port, "POST", "/chat", b"x" * 11, auth))[0] == 413
+            assert (await _request(port, "POST", "/chat", b"{}", auth))[0] == 400
+        finally:
+            await channel.stop()
+
+    run_async_test(run_test)
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
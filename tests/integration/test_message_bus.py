@@ -11,7 +11,7 @@ try:
 except ImportError:
     import asyncio
 
-from chipclaw.bus.queue import MessageBus
+from chipclaw.bus.queue import MessageBus, compile_pattern
 from chipclaw.bus.events import InboundMessage, OutboundMessage
 
 
@@ -96,6 +96,151 @@ def test_message_bus_multiple_messages():
     run_async_test(run_test)
 
 
+def test_slow_channel_does_not_block_others():
+    """Test a stalled channel only delays its own replies"""
+    async def run_test():
+        bus = MessageBus({"send_timeout": 0.05})
+        fast_received = []
+        
+        async def slow(msg):
+            await asyncio.sleep(1)
+        
+        async def fast(msg):
+            fast_received.append(msg.content)
+        
+        bus.subscribe_outbound("slow", slow)
+        bus.subscribe_outbound("fast", fast)
+        dispatcher = asyncio.create_task(bus.dispatch_outbound())
+        
+        await bus.publish_outbound(OutboundMessage("slow", "c1", "stuck"))
+        for i in range(3):
+            await bus.publish_outbound(OutboundMessage("fast", "c1", f"reply {i}"))
+        await asyncio.sleep(0.01)
+        assert fast_received == ["reply 0", "reply 1", "reply 2"]
+        
+        await asyncio.sleep(0.1)
+        stats = bus.stats()
+        assert stats["fast"]["sent"] == 3
+        assert stats["slow"]["timeouts"] == 1
+        assert stats["slow"]["depth"] == 0
+        
+        bus.stop()
+        await dispatcher
+    
+    run_async_test(run_test)
+
+
+def test_outbound_queue_drops_oldest_when_full():
+    """Test a full channel queue drops its oldest pending message"""
+    async def run_test():
+        bus = MessageBus({"outbound_maxsize": 2})
+        received = []
+        
+        async def handler(msg):
+            received.append(msg.content)
+        
+        bus.subscribe_outbound("test", handler)
+        for i in range(3):
+            await bus.publish_outbound(OutboundMessage("test", "c1", f"m{i}"))
+        stats = bus.stats()["test"]
+        assert stats["dropped"] == 1
+        assert stats["depth"] == 2
+        assert stats["max_depth"] == 2
+        
+        dispatcher = asyncio.create_task(bus.dispatch_outbound())
+        await asyncio.sleep(0.01)
+        assert received == ["m1", "m2"]
+        bus.stop()
+        await dispatcher
+        
+        # Messages for unknown channels are not queued
+        await bus.publish_outbound(OutboundMessage("nowhere", "c1", "lost"))
+        assert "nowhere" not in bus.stats()
+    
+    run_async_test(run_test)
+
+
+def test_latency_stages_recorded():
+    """Test a round trip records every stage for the channel"""
+    async def run_test():
+        bus = MessageBus()
+        
+        async def handler(msg):
+            await asyncio.sleep(0.01)
+        
+        bus.subscribe_outbound("uart", handler)
+        dispatcher = asyncio.create_task(bus.dispatch_outbound())
+        
+        await bus.publish_inbound(InboundMessage("uart", "u1", "c1", "ping"))
+        inbound = await bus.consume_inbound()
+        assert inbound.consumed_at is not None
+        await bus.publish_outbound(OutboundMessage("uart", "c1", "pong", reply_to=inbound))
+        await asyncio.sleep(0.05)
+        
+        latency = bus.latency()["uart"]
+        for stage in ("queue_wait", "processing", "outbound_wait", "send", "end_to_end"):
+            assert latency[stage]["count"] == 1
+        assert latency["end_to_end"]["max"] >= latency["send"]["max"] >= 10
+        
+        bus.stop()
+        await dispatcher
+    
+    run_async_test(run_test)
+
+
+def test_compile_pattern():
+    """Test exact, wildcard and prefix subscription patterns"""
+    assert compile_pattern("mqtt")("mqtt", "c1")
+    assert not compile_pattern("mqtt")("uart", "c1")
+    assert compile_pattern("*")("uart", "c1")
+    assert compile_pattern("mqtt:ops-*")("mqtt", "ops-alerts")
+    assert not compile_pattern("mqtt:ops-*")("mqtt", "dev")
+    assert not compile_pattern("mqtt:ops-*")("uart", "ops-alerts")
+    assert compile_pattern("*:42")("uart", 42)
+    try:
+        compile_pattern("mq*tt")
+        assert False, "Expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_outbound_fan_out():
+    """Test a message reaches every matching subscriber"""
+    async def run_test():
+        bus = MessageBus()
+        received = {"mqtt": [], "log": [], "ops": []}
+        
+        def make_handler(name):
+            async def handler(msg):
+                received[name].append(msg.chat_id)
+            return handler
+        
+        bus.subscribe_outbound("mqtt", make_handler("mqtt"))
+        bus.subscribe_outbound("*", make_handler("log"))
+        dispatcher = asyncio.create_task(bus.dispatch_outbound())
+        
+        await bus.publish_outbound(OutboundMessage("mqtt", "ops-1", "a"))
+        # Subscribing after a route was cached must still take effect
+        bus.subscribe_outbound("mqtt:ops-*", make_handler("ops"))
+        await bus.publish_outbound(OutboundMessage("mqtt", "ops-1", "b"))
+        await bus.publish_outbound(OutboundMessage("uart", "c1", "c"))
+        await asyncio.sleep(0.01)
+        
+        assert received["mqtt"] == ["ops-1", "ops-1"]
+        assert received["log"] == ["ops-1", "ops-1", "c1"]
+        assert received["ops"] == ["ops-1"]
+        assert bus.stats()["*"]["sent"] == 3
+        
+        bus.unsubscribe_outbound("*")
+        await bus.publish_outbound(OutboundMessage("uart", "c1", "d"))
+        assert "*" not in bus.stats()
+        
+        bus.stop()
+        await dispatcher
+    
+    run_async_test(run_test)
+
+
 if __name__ == "__main__":
     from tests import run_tests
     import sys
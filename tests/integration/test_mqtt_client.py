@@ -0,0 +1,390 @@
+"""
+Integration tests for the asyncio MQTT client and channel
+Runs against a minimal in-process broker on localhost
+"""
+import sys
+import os
+import json
+import struct
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.channels.mqtt_client import MQTTClient, match_topic
+from chipclaw.channels.mqtt import MQTTChannel
+from chipclaw.bus.events import OutboundMessage
+
+
+class StubBroker:
+    """
+    Just enough of an MQTT 3.1.1 broker for the tests: CONNACK, SUBACK,
+    PINGRESP, PUBACK (unless ack is False) and exact-topic routing
+    """
+
+    def __init__(self, ack=True, port=0):
+        self.ack = ack
+        self.subs = {}        # {topic: [writer, ...]}
+        self.received = []    # (topic, payload, qos) of every PUBLISH
+        self.pings = 0
+        self.clients = []
+        self.server = None
+        self.port = port
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        for w in self.clients:
+            w.close()
+        await asyncio.sleep(0.01)  # let _serve see EOF and exit
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_clients(self):
+        for w in self.clients:
+            w.close()
+        self.clients = []
+
+    async def _read(self, reader):
+        header = (await reader.readexactly(1))[0]
+        length, shift = 0, 0
+        while True:
+            b = (await reader.readexactly(1))[0]
+            length |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80:
+                break
+        return header, await reader.readexactly(length)
+
+    def _send(self, writer, header, body):
+        writer.write(bytes((header, len(body))) + body)
+
+    async def _serve(self, reader, writer):
+        self.clients.append(writer)
+        try:
+            while True:
+                header, body = await self._read(reader)
+                kind = header & 0xF0
+                if kind == 0x10:
+                    self._send(writer, 0x20, b"\x00\x00")
+                elif kind == 0x80:
+                    n = struct.unpack_from(">H", body, 2)[0]
+                    topic = body[4:4 + n].decode()
+                    self.subs.setdefault(topic, []).append(writer)
+                    self._send(writer, 0x90, body[:2] + bytes((body[4 + n],)))
+                elif kind == 0x30:
+                    qos = (header >> 1) & 3
+                    n = struct.unpack_from(">H", body)[0]
+                    topic = body[2:2 + n].decode()
+                    pos = 2 + n + (2 if qos else 0)
+                    self.received.append((topic, body[pos:], qos))
+                    if qos and self.ack:
+                        self._send(writer, 0x40, body[2 + n:pos])
+                    for sub in self.subs.get(topic, []):
+                        self._send(sub, 0x30, body[:2 + n] + body[pos:])
+                elif kind == 0xC0:
+                    self.pings += 1
+                    self._send(writer, 0xD0, b"")
+                elif kind == 0xE0:
+                    break
+        except Exception:
+            pass
+        writer.close()
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+async def _wait_for(condition, timeout=1.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return True
+        await asyncio.sleep(0.01)
+    return condition()
+
+
+def test_mqtt_client_publish_subscribe():
+    """Test QoS 0 and QoS 1 messages round-trip through the broker"""
+    async def run_test():
+        broker = StubBroker()
+        await broker.start()
+        got = []
+
+        async def on_message(topic, payload):
+            got.append((topic, payload))
+
+        client = MQTTClient("t1", "127.0.0.1", broker.port, on_message=on_message)
+        try:
+            await client.connect()
+            assert client.connected
+            assert await client.subscribe("a/b", 1) == 1
+            await client.publish("a/b", "zero")
+            await client.publish("a/b", b"one", qos=1)
+            assert client.inflight == 0
+            assert await _wait_for(lambda: len(got) == 2)
+            assert got == [("a/b", b"zero"), ("a/b", b"one")]
+            assert [r[2] for r in broker.received] == [0, 1]
+        finally:
+            await client.disconnect()
+            await broker.close()
+
+    run_async_test(run_test)
+
+
+def test_mqtt_client_handler_publishes_qos1():
+    """Test on_message can publish at QoS 1 without stalling the read loop"""
+    async def run_test():
+        broker = StubBroker()
+        await broker.start()
+        replies = []
+        client = None
+
+        async def on_message(topic, payload):
+            await client.publish("a/reply", payload, qos=1)
+            replies.append(payload)
+
+        client = MQTTClient("t1", "127.0.0.1", broker.port, on_message=on_message,
+                            ack_timeout=5)
+        try:
+            await client.connect()
+            await client.subscribe("a/in", 1)
+            await client.publish("a/in", b"ping", qos=1)
+            assert await _wait_for(lambda: replies == [b"ping"], 0.5)
+            assert ("a/reply", b"ping", 1) in broker.received
+            assert client.inflight == 0
+        finally:
+            await client.disconnect()
+            await broker.close()
+
+    run_async_test(run_test)
+
+
+def _raw_publish(topic, payload):
+    """PUBLISH packet with a multi-byte remaining length when needed"""
+    body = struct.pack(">H", len(topic)) + topic.encode() + payload
+    n, length = len(body), b""
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        length += bytes((b | 0x80 if n else b,))
+        if not n:
+            return bytes((0x30,)) + length + body
+
+
+def test_mqtt_client_discards_oversize_packets():
+    """Test a PUBLISH over max_packet is skipped and the link stays up"""
+    async def run_test():
+        broker = StubBroker()
+        await broker.start()
+        got = []
+
+        async def on_message(topic, payload):
+            got.append(payload)
+
+        client = MQTTClient("t1", "127.0.0.1", broker.port, on_message=on_message, max_packet=100)
+        try:
+            await client.connect()
+            await client.subscribe("a/b")
+            writer = broker.subs["a/b"][0]
+            writer.write(_raw_publish("a/b", b"x" * 5000) + _raw_publish("a/b", b"small"))
+            assert await _wait_for(lambda: got)
+            assert got == [b"small"]
+            assert client.oversize == 1
+            assert client.connected
+        finally:
+            await client.disconnect()
+            await broker.close()
+
+    run_async_test(run_test)
+
+
+def test_mqtt_client_puback_timeout():
+    """Test a QoS 1 publish without PUBACK raises instead of hanging"""
+    async def run_test():
+        broker = StubBroker(ack=False)
+        await broker.start()
+        client = MQTTClient("t2", "127.0.0.1", broker.port, ack_timeout=0.1)
+        try:
+            await client.connect()
+            try:
+                await client.publish("x", "lost", qos=1)
+                assert False, "expected OSError"
+            except OSError as e:
+                assert "timeout" in str(e)
+            assert client.inflight == 0
+        finally:
+            await client.disconnect()
+            await broker.close()
+
+    run_async_test(run_test)
+
+
+def test_mqtt_client_keepalive_ping():
+    """Test an idle client sends PINGREQ within the keepalive"""
+    async def run_test():
+        broker = StubBroker()
+        await broker.start()
+        client = MQTTClient("t3", "127.0.0.1", broker.port, keepalive=0.2)
+        try:
+            await client.connect()
+            assert await _wait_for(lambda: broker.pings > 0)
+            assert client.connected
+        finally:
+            await client.disconnect()
+            await broker.close()
+
+    run_async_test(run_test)
+
+
+def test_mqtt_client_connection_lost():
+    """Test closed is set and pending publishes fail when the link drops"""
+    async def run_test():
+        broker = StubBroker(ack=False)
+        await broker.start()
+        client = MQTTClient("t4", "127.0.0.1", broker.port)
+        try:
+            await client.connect()
+            pending = asyncio.create_task(client.publish("x", "y", qos=1))
+            await asyncio.sleep(0.05)
+            broker.drop_clients()
+            await asyncio.wait_for(client.closed.wait(), 1)
+            try:
+                await pending
+                assert False, "expected OSError"
+            except OSError:
+                pass
+        finally:
+            await client.disconnect()
+            await broker.close()
+
+    run_async_test(run_test)
+
+
+class MockBus:
+    """Mock message bus for testing"""
+    def __init__(self):
+        self.inbound_messages = []
+
+    async def publish_inbound(self, msg):
+        self.inbound_messages.append(msg)
+
+
+def test_mqtt_channel_reconnects():
+    """Test the channel delivers inbound messages and reconnects after a drop"""
+    async def run_test():
+        broker = StubBroker()
+        await broker.start()
+        bus = MockBus()
+        config = {"broker": "127.0.0.1", "port": broker.port, "topic_in": "in",
+                  "topic_out": "out", "reconnect_delay": 0.05}
+        channel = MQTTChannel(bus, config)
+        peer = MQTTClient("peer", "127.0.0.1", broker.port)
+        try:
+            await channel.start()
+            assert await _wait_for(lambda: channel.connected)
+            await peer.connect()
+            await peer.publish("in", json.dumps({"content": "hi", "sender_id": "u1"}))
+            assert await _wait_for(lambda: len(bus.inbound_messages) == 1)
+            assert bus.inbound_messages[0].chat_id == "in"
+
+            assert channel.health() == "connected"
+
+            broker.drop_clients()
+            assert await _wait_for(lambda: not channel.connected)
+            assert await _wait_for(lambda: channel.connected)
+            assert channel.supervisor.stats()["last_error"] == "connection lost"
+            assert channel.supervisor.failures == 0
+            await channel.send(OutboundMessage("mqtt", "c1", "reply"))
+            assert await _wait_for(lambda: any(r[0] == "out" for r in broker.received))
+        finally:
+            await channel.stop()
+            await peer.disconnect()
+            await broker.close()
+        assert channel.health() == "down"
+
+    run_async_test(run_test)
+
+
+def test_mqtt_channel_breaker_opens():
+    """Test repeated connect failures go degraded, then down, then recover"""
+    async def run_test():
+        broker = StubBroker()
+        await broker.start()
+        port = broker.port
+        await broker.close()
+        config = {"broker": "127.0.0.1", "port": port, "topic_in": "in", "topic_out": "out",
+                  "reconnect_delay": 0.1, "breaker_threshold": 3, "breaker_cooldown": 0.3}
+        channel = MQTTChannel(MockBus(), config)
+        try:
+            await channel.start()
+            assert await _wait_for(lambda: channel.supervisor.failures >= 1)
+            assert channel.health() == "degraded"
+            assert await _wait_for(lambda: channel.health() == "down")
+            assert channel.supervisor.breaker_open
+
+            broker = StubBroker(port=port)
+            await broker.start()
+            assert await _wait_for(lambda: channel.connected)
+            assert channel.health() == "connected"
+        finally:
+            await channel.stop()
+            await broker.close()
+
+    run_async_test(run_test)
+
+
+def test_match_topic():
+    """Test + and # captures and $share filters"""
+    assert match_topic("a/b", "a/b") == []
+    assert match_topic("a/b", "a/c") is None
+    assert match_topic("dev/+/in/+", "dev/d1/in/chat7") == ["d1", "chat7"]
+    assert match_topic("dev/+", "dev/d1/x") is None
+    assert match_topic("dev/#", "dev/d1/x") == ["d1/x"]
+    assert match_topic("$share/g/dev/+", "dev/d1") == ["d1"]
+
+
+def test_mqtt_channel_per_chat_topics():
+    """Test chat_id comes from the topic and replies go to the chat's topic"""
+    async def run_test():
+        broker = StubBroker()
+        await broker.start()
+        bus = MockBus()
+        config = {"broker": "127.0.0.1", "port": broker.port, "client_id": "dev1",
+                  "topic_in": "cc/{client_id}/in/{chat_id}",
+                  "topic_out": "cc/{client_id}/out/{chat_id}",
+                  "share_group": "fleet"}
+        channel = MQTTChannel(bus, config)
+        assert channel.subscription == "$share/fleet/cc/dev1/in/+"
+        try:
+            await channel._on_message("cc/dev1/in/c42", b'{"content": "hi", "chat_id": "ignored"}')
+            await channel._on_message("cc/dev1/in/c43", b"plain text")
+            assert [(m.chat_id, m.content) for m in bus.inbound_messages] == [
+                ("c42", "hi"), ("c43", "plain text")]
+
+            await channel.start()
+            assert await _wait_for(lambda: channel.connected)
+            assert "$share/fleet/cc/dev1/in/+" in broker.subs
+            await channel.send(OutboundMessage("mqtt", "c42", "reply"))
+            assert await _wait_for(lambda: broker.received)
+            assert broker.received[0][0] == "cc/dev1/out/c42"
+        finally:
+            await channel.stop()
+            await broker.close()
+
+    run_async_test(run_test)
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
@@ -0,0 +1,200 @@
+"""
+Integration tests for chipclaw.channels.websocket
+Drives the server with a minimal RFC 6455 client over localhost
+"""
+import sys
+import os
+import json
+import struct
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.channels import websocket as ws
+from chipclaw.channels.websocket import WebSocketChannel, accept_key, apply_mask, encode_frame, read_frame
+from chipclaw.bus.events import OutboundMessage
+
+MASK = b"\x12\x34\x56\x78"
+
+
+class EchoBus:
+    """Stands in for bus + agent: a partial, then the reply"""
+    def __init__(self):
+        self.channel = None
+        self.inbound_messages = []
+
+    async def publish_inbound(self, msg):
+        self.inbound_messages.append(msg)
+        asyncio.create_task(self._answer(msg))
+
+    async def _answer(self, msg):
+        await self.channel.send(OutboundMessage("websocket", msg.chat_id, "thinking",
+                                                metadata={"partial": True}))
+        await self.channel.send(OutboundMessage("websocket", msg.chat_id, f"echo: {msg.content}",
+                                                reply_to=msg))
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+async def _start(config=None):
+    bus = EchoBus()
+    cfg = {"host": "127.0.0.1", "port": 0}
+    cfg.update(config or {})
+    channel = WebSocketChannel(bus, cfg)
+    bus.channel = channel
+    await channel.start()
+    return channel, channel.server.sockets[0].getsockname()[1]
+
+
+async def _connect(port, query=""):
+    """Open and upgrade a connection; returns (reader, writer, status)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write((f"GET /ws{query} HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\n"
+                  "Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                  "Sec-WebSocket-Version: 13\r\n\r\n").encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split()[1])
+    if status == 101:
+        assert b"Sec-WebSocket-Accept: s3pPLMBiTxaQ9kYGzzhZRbK+xOo=" in head
+    return reader, writer, status
+
+
+async def _recv(reader):
+    fin, opcode, masked, payload = await asyncio.wait_for(read_frame(reader, 1 << 20), 2)
+    assert fin and not masked
+    return opcode, payload
+
+
+async def _recv_json(reader):
+    opcode, payload = await _recv(reader)
+    assert opcode == ws.OP_TEXT
+    return json.loads(payload)
+
+
+def test_websocket_accept_key_and_mask():
+    """Test the RFC 6455 handshake example and mask round trip"""
+    assert accept_key("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+    data = bytes(range(256)) * 3
+    assert apply_mask(apply_mask(data, MASK), MASK) == data
+    assert apply_mask(b"", MASK) == b""
+    assert len(encode_frame(ws.OP_TEXT, b"x" * 70000)) == 70000 + 10
+
+
+def test_websocket_chat_round_trip():
+    """Test a text message gets a partial and a reply on the same connection"""
+    async def run_test():
+        channel, port = await _start()
+        try:
+            reader, writer, status = await _connect(port, "?chat_id=dash")
+            assert status == 101
+            writer.write(encode_frame(ws.OP_TEXT, json.dumps({"content": "hi"}).encode(), MASK))
+            chat = "127.0.0.1:dash"  # no token: namespaced by peer
+            assert await _recv_json(reader) == {"type": "partial", "content": "thinking", "chat_id": chat}
+            assert await _recv_json(reader) == {"type": "reply", "content": "echo: hi", "chat_id": chat}
+            inbound = channel.bus.inbound_messages[0]
+            assert inbound.session_key == f"websocket:{chat}"
+            assert inbound.metadata["partial"] is True
+
+            # send_message output pushed without a request
+            await channel.send(OutboundMessage("websocket", chat, "alert"))
+            assert (await _recv_json(reader))["type"] == "message"
+            writer.close()
+        finally:
+            await channel.stop()
+
+    run_async_test(run_test)
+
+
+def test_websocket_fragments_and_ping():
+    """Test fragmented messages are joined and pings get pongs"""
+    async def run_test():
+        channel, port = await _start()
+        try:
+            reader, writer, _ = await _connect(port)
+            writer.write(encode_frame(ws.OP_PING, b"p1", MASK))
+            assert await _recv(reader) == (ws.OP_PONG, b"p1")
+
+            first = bytes((ws.OP_TEXT, 0x80 | 3)) + MASK + apply_mask(b"hel", MASK)
+            writer.write(first + encode_frame(ws.OP_CONT, b"lo", MASK))
+            await _recv_json(reader)  # partial
+            reply = await _recv_json(reader)
+            assert reply["content"] == "echo: hello"
+            assert reply["chat_id"].startswith("ws_")
+            writer.close()
+        finally:
+            await channel.stop()
+
+    run_async_test(run_test)
+
+
+def test_websocket_protocol_errors():
+    """Test unmasked frames, oversized messages and bad control frames close the connection"""
+    async def run_test():
+        channel, port = await _start({"max_message": 100})
+        try:
+            reader, writer, _ = await _connect(port)
+            writer.write(encode_frame(ws.OP_TEXT, b"unmasked"))
+            opcode, payload = await _recv(reader)
+            assert opcode == ws.OP_CLOSE
+            assert struct.unpack(">H", payload[:2])[0] == ws.CLOSE_PROTOCOL
+
+            reader, writer, _ = await _connect(port)
+            writer.write(encode_frame(ws.OP_TEXT, b"x" * 101, MASK))
+            opcode, payload = await _recv(reader)
+            assert struct.unpack(">H", payload[:2])[0] == ws.CLOSE_TOO_BIG
+
+            # Control frames must not be fragmented or exceed 125 bytes
+            for frame in (bytes((ws.OP_PING, 0x80 | 1)) + MASK + apply_mask(b"p", MASK),
+                          encode_frame(ws.OP_PING, b"x" * 126, MASK)):
+                reader, writer, _ = await _connect(port)
+                writer.write(frame)
+                opcode, payload = await _recv(reader)
+                assert opcode == ws.OP_CLOSE
+                assert struct.unpack(">H", payload[:2])[0] == ws.CLOSE_PROTOCOL
+            await asyncio.sleep(0.02)
+            assert channel.count == 0
+            assert channel.connections == {}
+        finally:
+            await channel.stop()
+
+    run_async_test(run_test)
+
+
+def test_websocket_limits_and_auth():
+    """Test the connection cap and token check happen before upgrading"""
+    async def run_test():
+        channel, port = await _start({"max_connections": 1, "token": "t0k"})
+        try:
+            _, _, status = await _connect(port)
+            assert status == 401
+            await asyncio.sleep(0.01)
+            reader, writer, status = await _connect(port, "?token=t0k&chat_id=dash")
+            assert status == 101
+            assert list(channel.connections) == ["dash"]  # token: taken as given
+            _, _, status = await _connect(port, "?token=t0k")
+            assert status == 503
+            assert channel.stats["rejected"] == 1
+            writer.write(encode_frame(ws.OP_CLOSE, struct.pack(">H", 1000), MASK))
+            opcode, _ = await _recv(reader)
+            assert opcode == ws.OP_CLOSE
+        finally:
+            await channel.stop()
+
+    run_async_test(run_test)
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
@@ -0,0 +1,66 @@
+"""
+Unit tests for chipclaw.bus.metrics and the bus_stats tool
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from chipclaw.bus.metrics import Histogram, BusMetrics
+from chipclaw.bus.queue import MessageBus
+from chipclaw.agent.tools.bus_stats import BusStatsTool
+
+
+def test_histogram_buckets():
+    """Test samples land in the right buckets and overflow"""
+    h = Histogram(bounds=(10, 100))
+    for value in (0, 10, 11, 100, 250):
+        h.record(value)
+    assert h.counts == [2, 2, 1]
+    assert h.count == 5
+    assert h.max == 250
+    assert h.total == 371
+
+
+def test_histogram_percentiles():
+    """Test percentiles report bucket upper bounds"""
+    h = Histogram()
+    assert h.percentile(50) == 0
+    for _ in range(90):
+        h.record(3)
+    for _ in range(10):
+        h.record(40000)
+    summary = h.summary()
+    assert summary["p50"] == 5
+    assert summary["p95"] == 40000  # overflow bucket reports max
+    assert summary["count"] == 100
+
+
+def test_bus_metrics_summary_skips_empty_stages():
+    """Test only stages with samples are summarised"""
+    metrics = BusMetrics()
+    metrics.record("uart", "queue_wait", 4)
+    summary = metrics.summary()
+    assert list(summary["uart"].keys()) == ["queue_wait"]
+    assert summary["uart"]["queue_wait"]["max"] == 4
+
+
+def test_bus_stats_tool():
+    """Test the tool formats queue counters and latencies"""
+    bus = MessageBus()
+    tool = BusStatsTool(bus)
+    assert tool.execute() == "No bus activity yet"
+    
+    async def handler(msg):
+        pass
+    
+    bus.subscribe_outbound("uart", handler)
+    bus.metrics.record("uart", "end_to_end", 120)
+    result = tool.execute()
+    assert "uart: depth=0" in result
+    assert "end_to_end: n=1" in result
+    assert "p95<=200" in result
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
@@ -0,0 +1,117 @@
+"""
+Unit tests for chipclaw.channels.base.Supervisor and channel health reporting
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.channels.base import BaseChannel, Supervisor, CONNECTED, DEGRADED, DOWN
+from chipclaw.bus.queue import MessageBus
+from chipclaw.agent.tools.bus_stats import BusStatsTool
+
+
+class IdleChannel(BaseChannel):
+    def __init__(self, config):
+        super().__init__("test", None, config)
+
+    async def send(self, msg):
+        pass
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+def test_backoff_jitter_and_cap():
+    """Test delays double up to the cap and jitter stays within its share"""
+    sup = Supervisor("t", {"reconnect_delay": 1, "reconnect_max": 8, "reconnect_jitter": 0.5,
+                           "breaker_threshold": 10, "breaker_cooldown": 100})
+    for attempts, delay in ((1, 1), (2, 2), (3, 4), (4, 8), (6, 8)):
+        samples = [sup.backoff(attempts) for _ in range(50)]
+        assert all(delay / 2 <= d <= delay for d in samples)
+        assert len(set(samples)) > 1
+    assert 50 <= sup.backoff(10) <= 100
+
+    exact = Supervisor("t", {"reconnect_jitter": 0})
+    assert exact.backoff(3) == 4
+
+
+def test_breaker_states():
+    """Test failures go degraded, then down past the threshold, and up() resets"""
+    sup = Supervisor("t", {"breaker_threshold": 3, "breaker_cooldown": 120, "reconnect_jitter": 0})
+    assert sup.state == DOWN
+    sup.up()
+    assert sup.state == CONNECTED
+
+    assert sup.failure("refused") == 1
+    assert sup.state == DEGRADED
+    sup.failure("refused")
+    assert not sup.breaker_open
+    assert sup.failure(OSError("timeout")) == 120
+    assert sup.state == DOWN and sup.breaker_open
+    assert sup.stats()["last_error"] == "timeout"
+
+    sup.up()
+    assert sup.stats()["state"] == CONNECTED
+    assert sup.failures == 0
+
+
+def test_spawn_restarts_dead_task():
+    """Test a crashing task is restarted and stop() ends it"""
+    async def run_test():
+        channel = IdleChannel({"reconnect_delay": 0.01, "reconnect_jitter": 0})
+        channel.supervisor.up()
+        runs = []
+
+        async def flaky():
+            runs.append(1)
+            if len(runs) < 3:
+                raise ValueError(f"boom {len(runs)}")
+            await asyncio.sleep(10)
+
+        channel.spawn("flaky", flaky)
+        await asyncio.sleep(0)
+        assert channel.health() == DEGRADED
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+        assert len(runs) == 3
+        assert channel.health() == CONNECTED
+        stats = channel.supervisor.stats()
+        assert stats["restarts"] == 2
+        assert stats["last_error"] == "flaky: boom 2"
+
+        channel.supervisor.stop()
+        await asyncio.sleep(0)
+        assert channel.health() == DOWN
+        assert len(runs) == 3
+
+    run_async_test(run_test)
+
+
+def test_bus_health_reporting():
+    """Test registered supervisors appear in bus.health() and the bus_stats tool"""
+    bus = MessageBus()
+    sup = Supervisor("mqtt")
+    bus.register_health("mqtt", sup)
+    sup.failure("refused")
+    assert bus.health()["mqtt"]["state"] == DEGRADED
+
+    result = BusStatsTool(bus).execute()
+    assert "mqtt is degraded for 0s: failures=1 restarts=0 last_error=refused" in result
+    assert "mqtt:" not in result
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
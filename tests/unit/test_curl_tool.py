@@ -3,10 +3,75 @@ Unit tests for chipclaw.agent.tools.curl module
 """
 import sys
 import os
+import hashlib
+import tempfile
+import shutil
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.agent.tools import curl, ToolRegistry
 from chipclaw.agent.tools.curl import CurlTool
 
+BLOB = bytes(range(256)) * 40  # 10240 bytes
+
+
+class FakeResponse:
+    def __init__(self, status, body, headers=None):
+        self.status_code = status
+        self.reason = "OK"
+        self.body = body
+        self.headers = headers if headers is not None else {"content-length": str(len(body))}
+        self.closed = False
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), size):
+            yield self.body[i:i + size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeRequests:
+    """Serves BLOB for GET, honouring Range unless ranges is False"""
+    def __init__(self, ranges=True, body=BLOB):
+        self.ranges = ranges
+        self.body = body
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(kwargs)
+        rng = kwargs.get("headers", {}).get("Range")
+        if rng and self.ranges:
+            start = int(rng[6:-1])
+            return FakeResponse(206, self.body[start:])
+        return FakeResponse(200, self.body)
+
+
+def run_async(coro):
+    """Run a coroutine on a fresh event loop and return its result"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def _with_fake(fake, test):
+    """Run test(tool, temp_dir) with curl.requests replaced by fake"""
+    temp_dir = tempfile.mkdtemp()
+    saved = curl.requests
+    curl.requests = fake
+    try:
+        test(CurlTool(allowed_dir=temp_dir, chunk_size=1000), temp_dir)
+    finally:
+        curl.requests = saved
+        shutil.rmtree(temp_dir)
+
 
 def test_curl_tool_creation():
     """Test CurlTool instantiation and attributes"""
@@ -34,7 +99,7 @@ def test_curl_tool_default_method():
     """Test that default method is GET"""
     tool = CurlTool()
     # Mock a request to a non-existent host to verify error handling
-    result = tool.execute(url="http://localhost:99999/nonexistent")
+    result = run_async(tool.execute(url="http://localhost:99999/nonexistent"))
     # Should return an error string, not raise an exception
     assert isinstance(result, str)
     assert "Error" in result or "HTTP" in result
@@ -43,7 +108,7 @@ def test_curl_tool_default_method():
 def test_curl_tool_unsupported_method():
     """Test unsupported HTTP method returns error"""
     tool = CurlTool()
-    result = tool.execute(url="http://example.com", method="OPTIONS")
+    result = run_async(tool.execute(url="http://example.com", method="OPTIONS"))
     assert "Error" in result
     assert "Unsupported" in result
 
@@ -52,7 +117,7 @@ def test_curl_tool_method_case_insensitive():
     """Test that method parameter is case-insensitive"""
     tool = CurlTool()
     # Lowercase should be normalized to uppercase
-    result = tool.execute(url="http://localhost:99999/nonexistent", method="get")
+    result = run_async(tool.execute(url="http://localhost:99999/nonexistent", method="get"))
     # Should not fail with "Unsupported method" error
     assert "Unsupported" not in result
 
@@ -83,11 +148,124 @@ def test_curl_tool_with_data_param():
 def test_curl_tool_error_handling():
     """Test that connection errors return error strings"""
     tool = CurlTool()
-    result = tool.execute(url="http://localhost:99999/invalid", method="POST", data='{"key":"value"}')
+    result = run_async(tool.execute(url="http://localhost:99999/invalid", method="POST", data='{"key":"value"}'))
     assert isinstance(result, str)
     assert "Error" in result
 
 
+
+def test_curl_tool_save_to_streams_file():
+    """Test save_to writes the body to disk and returns only a summary"""
+    def test(tool, temp_dir):
+        path = temp_dir + "/fw/app.bin"
+        result = run_async(tool.execute(url="http://host/app.bin", save_to=path,
+                                        sha256=hashlib.sha256(BLOB).hexdigest().upper()))
+        assert result.startswith("Saved 10240 bytes to " + path)
+        assert hashlib.sha256(BLOB).hexdigest() in result
+        assert len(result) < 200
+        with open(path, "rb") as f:
+            assert f.read() == BLOB
+        assert not os.path.exists(path + ".part")
+        assert tool.progress is None
+
+    _with_fake(FakeRequests(), test)
+
+
+def test_curl_tool_save_to_yields_between_chunks():
+    """Test other tasks run and see progress while the registry awaits a download"""
+    def test(tool, temp_dir):
+        registry = ToolRegistry()
+        registry.register(tool)
+        seen = []
+
+        async def watch():
+            while True:
+                if tool.progress:
+                    seen.append(tool.progress[1])
+                await asyncio.sleep(0)
+
+        async def run():
+            watcher = asyncio.create_task(watch())
+            result = await registry.execute("curl", {"url": "http://host/a.bin",
+                                                     "save_to": temp_dir + "/a.bin"})
+            watcher.cancel()
+            return result
+
+        assert run_async(run()).startswith("Saved 10240 bytes")
+        assert seen[:3] == [1000, 2000, 3000]
+        assert tool.progress is None
+
+    _with_fake(FakeRequests(), test)
+
+
+def test_curl_tool_save_to_resumes():
+    """Test a partial download continues with a Range request"""
+    fake = FakeRequests()
+
+    def test(tool, temp_dir):
+        path = temp_dir + "/data.bin"
+        with open(path + ".part", "wb") as f:
+            f.write(BLOB[:4000])
+        result = run_async(tool.execute(url="http://host/data.bin", save_to=path))
+        assert fake.calls[0]["headers"]["Range"] == "bytes=4000-"
+        assert fake.calls[0]["stream"] is True
+        assert "resumed at 4000" in result
+        assert hashlib.sha256(BLOB).hexdigest() in result
+        with open(path, "rb") as f:
+            assert f.read() == BLOB
+
+    _with_fake(fake, test)
+
+
+def test_curl_tool_save_to_range_ignored():
+    """Test a 200 reply to a Range request restarts the file"""
+    def test(tool, temp_dir):
+        path = temp_dir + "/data.bin"
+        with open(path + ".part", "wb") as f:
+            f.write(b"stale bytes")
+        result = run_async(tool.execute(url="http://host/data.bin", save_to=path))
+        assert "resumed" not in result
+        with open(path, "rb") as f:
+            assert f.read() == BLOB
+
+    _with_fake(FakeRequests(ranges=False), test)
+
+
+def test_curl_tool_save_to_incomplete_and_mismatch():
+    """Test a short body keeps the partial file and a bad hash discards it"""
+    fake = FakeRequests()
+
+    def short(url, **kwargs):
+        return FakeResponse(200, BLOB[:3000], {"Content-Length": str(len(BLOB))})
+
+    def test(tool, temp_dir):
+        path = temp_dir + "/data.bin"
+        fake.get = short
+        result = run_async(tool.execute(url="http://host/data.bin", save_to=path))
+        assert "incomplete: 3000/10240" in result
+        assert os.path.getsize(path + ".part") == 3000
+
+        fake.get = FakeRequests().get
+        result = run_async(tool.execute(url="http://host/data.bin", save_to=path, sha256="00" * 32))
+        assert "SHA-256 mismatch" in result
+        assert not os.path.exists(path)
+        assert not os.path.exists(path + ".part")
+
+    _with_fake(fake, test)
+
+
+def test_curl_tool_save_to_outside_allowed_dir():
+    """Test save_to paths outside allowed_dir are refused before any request"""
+    fake = FakeRequests()
+
+    def test(tool, temp_dir):
+        assert "Access denied" in run_async(tool.execute(url="http://host/x", save_to="/etc/x"))
+        assert "Access denied" in run_async(tool.execute(url="http://host/x", save_to=temp_dir + "/../x"))
+        assert fake.calls == []
+
+    _with_fake(fake, test)
+
+
 if __name__ == "__main__":
     from tests import run_tests
     import sys
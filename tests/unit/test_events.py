@@ -89,6 +89,39 @@ def test_session_key():
     assert msg.session_key == "mqtt:room123"
 
 
+def test_session_key_cached():
+    """Test session key is built once"""
+    msg = InboundMessage("uart", "user1", 7, "Test")
+    assert msg.session_key is msg.session_key
+    assert msg.session_key == "uart:7"
+
+
+def test_metadata_allocated_lazily():
+    """Test metadata is only created when used and can be replaced"""
+    msg = OutboundMessage("uart", "chat1", "Hi")
+    assert msg._metadata is None
+    assert msg.meta("retry") is None
+    assert msg.meta("retry", 0) == 0
+    assert msg._metadata is None
+    msg.metadata["retry"] = 1
+    assert msg.meta("retry") == 1
+    assert msg.metadata == {"retry": 1}
+    msg.metadata = {"other": True}
+    assert msg.metadata == {"other": True}
+
+
+def test_events_have_no_instance_dict():
+    """Test events reject unknown attributes where __slots__ is honoured"""
+    msg = InboundMessage("uart", "user1", "chat1", "Test")
+    if hasattr(msg, "__dict__"):
+        return  # MicroPython ignores __slots__
+    try:
+        msg.unknown = 1
+        assert False, "Expected AttributeError"
+    except AttributeError:
+        pass
+
+
 if __name__ == "__main__":
     from tests import run_tests
     import sys
@@ -0,0 +1,158 @@
+"""
+Unit tests for chipclaw.channels.chunking and chunked MQTT payloads
+"""
+import sys
+import os
+import json
+import random
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.channels.chunking import Reassembler, split_payload, is_chunk, HEADER_SIZE
+from chipclaw.channels.mqtt import MQTTChannel
+
+
+class MockBus:
+    """Mock message bus for testing"""
+    def __init__(self):
+        self.inbound_messages = []
+    
+    async def publish_inbound(self, msg):
+        self.inbound_messages.append(msg)
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+def test_small_payload_unchanged():
+    """Test payloads up to the threshold are sent as-is"""
+    assert split_payload('{"content": "hi"}', 1, threshold=100) == [b'{"content": "hi"}']
+    assert split_payload(b"x" * 500, 1, threshold=0) == [b"x" * 500]
+    assert not is_chunk(b'{"content": "hi"}')
+
+
+def test_split_and_reassemble_out_of_order():
+    """Test a compressed, chunked payload survives reordering and duplicates"""
+    words = ["led", "on", "off", "gpio", "temp", "ok", "sensor", "read"]
+    text = " ".join(random.choice(words) for _ in range(4000))
+    payload = json.dumps({"content": text}).encode()
+    chunks = split_payload(payload, 7, threshold=1024, chunk_size=256)
+    assert len(chunks) > 1
+    assert all(is_chunk(c) and len(c) <= 256 + HEADER_SIZE for c in chunks)
+    assert sum(len(c) for c in chunks) < len(payload) // 2  # deflated
+    
+    shuffled = list(chunks)
+    random.shuffle(shuffled)
+    shuffled.insert(1, shuffled[0])
+    r = Reassembler()
+    results = [r.feed("t", c) for c in shuffled]
+    assert [x for x in results if x is not None] == [payload]
+    assert r.stats()["partial"] == 0
+    assert r.completed == 1
+
+
+def test_reassembler_bounded():
+    """Test partial messages are evicted past max_messages and max_bytes"""
+    data = bytes(random.getrandbits(8) for _ in range(3000))  # incompressible
+    r = Reassembler(max_messages=2, max_bytes=2500)
+    for msg_id in range(3):
+        first = split_payload(data, msg_id, threshold=100, chunk_size=500)[0]
+        assert r.feed("t", first) is None
+    assert r.stats()["partial"] == 2
+    assert r.dropped == 1
+    
+    # The whole message is larger than max_bytes, so it is never completed
+    for chunk in split_payload(data, 9, threshold=100, chunk_size=500):
+        assert r.feed("u", chunk) is None
+    assert r.stats()["bytes"] <= 2500
+
+
+def test_reassembler_rejects_deflate_bomb():
+    """Test a small compressed message inflating past max_bytes is dropped"""
+    chunks = split_payload(b"a" * 100000, 3, threshold=100, chunk_size=500)
+    assert sum(len(c) for c in chunks) < 1000
+    r = Reassembler(max_bytes=4096)
+    assert [r.feed("t", c) for c in chunks] == [None] * len(chunks)
+    assert r.dropped == 1
+    assert r.completed == 0
+    
+    ok = split_payload(b"a" * 4096, 4, threshold=100, chunk_size=500)
+    assert [r.feed("t", c) for c in ok][-1] == b"a" * 4096
+
+
+def test_reassembler_timeout():
+    """Test stale partial messages are dropped"""
+    r = Reassembler(timeout_ms=0)
+    data = bytes(random.getrandbits(8) for _ in range(1000))
+    chunks = split_payload(data, 1, threshold=10, chunk_size=400)
+    assert r.feed("t", chunks[0]) is None
+    import time
+    time.sleep(0.005)
+    assert r.feed("t", chunks[1]) is None
+    assert r.dropped == 1
+
+
+def test_reference_decoder_matches():
+    """Test tools/mqtt_decode.py decodes what the device sends"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "tools"))
+    from mqtt_decode import ChunkDecoder
+    
+    payload = json.dumps({"content": "x" * 10000, "chat_id": "c1"}).encode()
+    decoder = ChunkDecoder()
+    out = [decoder.feed("t", c) for c in split_payload(payload, 3, threshold=1024, chunk_size=100)]
+    assert out[-1] == payload and out[:-1] == [None] * (len(out) - 1)
+    assert decoder.feed("t", b'{"content": "small"}') == b'{"content": "small"}'
+
+
+def test_mqtt_channel_reassembles_inbound():
+    """Test chunked inbound messages reach the bus once complete"""
+    async def run_test():
+        bus = MockBus()
+        channel = MQTTChannel(bus, {"topic_in": "in"})
+        payload = json.dumps({"content": "y" * 8000, "chat_id": "c1"})
+        for chunk in split_payload(payload, 1, threshold=1024, chunk_size=512):
+            await channel._on_message("in", chunk)
+        assert len(bus.inbound_messages) == 1
+        assert bus.inbound_messages[0].content == "y" * 8000
+    
+    run_async_test(run_test)
+
+
+def test_mqtt_channel_sends_chunks():
+    """Test large replies are published as chunks"""
+    class Recorder:
+        def __init__(self):
+            self.published = []
+        
+        async def publish(self, topic, payload, qos=0):
+            self.published.append(payload)
+    
+    async def run_test():
+        channel = MQTTChannel(None, {"chunk_threshold": 1000, "chunk_size": 200})
+        channel.client = Recorder()
+        await channel._publish("out", json.dumps({"content": "z" * 5000}))
+        await channel._publish("out", json.dumps({"content": "short"}))
+        assert all(is_chunk(p) for p in channel.client.published[:-1])
+        assert json.loads(channel.client.published[-1])["content"] == "short"
+        
+        r = Reassembler()
+        whole = [r.feed("out", p) for p in channel.client.published[:-1]][-1]
+        assert json.loads(whole)["content"] == "z" * 5000
+    
+    run_async_test(run_test)
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
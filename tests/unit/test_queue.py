@@ -0,0 +1,184 @@
+"""
+Unit tests for chipclaw.bus.queue.Queue
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.bus.queue import Queue
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+def test_fifo_across_wraparound():
+    """Test order is kept when the ring wraps"""
+    q = Queue(maxsize=4)
+    q.put_nowait(0)
+    q.put_nowait(1)
+    for i in range(2, 20):
+        q.put_nowait(i)
+        assert q.get_nowait() == i - 2
+    assert q.qsize() == 2
+    assert q.get_nowait() == 18
+    assert q.get_nowait() == 19
+    assert q.empty()
+
+
+def test_unbounded_grows():
+    """Test an unbounded queue grows past its initial ring"""
+    q = Queue()
+    q.put_nowait("a")
+    q.get_nowait()  # move head off zero before growing
+    for i in range(100):
+        q.put_nowait(i)
+    assert q.qsize() == 100
+    assert not q.full()
+    assert [q.get_nowait() for _ in range(100)] == list(range(100))
+
+
+def test_nowait_limits():
+    """Test full and empty errors"""
+    q = Queue(maxsize=1)
+    q.put_nowait(1)
+    assert q.full()
+    try:
+        q.put_nowait(2)
+        assert False, "Expected full queue error"
+    except Exception as e:
+        assert "full" in str(e)
+    q.get_nowait()
+    try:
+        q.get_nowait()
+        assert False, "Expected empty queue error"
+    except Exception as e:
+        assert "empty" in str(e)
+
+
+def test_blocked_getters_woken():
+    """Test each waiting getter receives one item"""
+    async def run_test():
+        q = Queue()
+        results = []
+        
+        async def getter():
+            results.append(await q.get())
+        
+        tasks = [asyncio.create_task(getter()) for _ in range(3)]
+        await asyncio.sleep(0)
+        for i in range(3):
+            await q.put(i)
+        await asyncio.gather(*tasks)
+        assert results == [0, 1, 2]
+        assert len(q._getters) == 0
+    
+    run_async_test(run_test)
+
+
+def test_put_wakes_one_getter():
+    """Test one put wakes only the oldest of two blocked getters"""
+    async def run_test():
+        q = Queue()
+        woken = []
+        
+        async def getter(name):
+            await q._wait_not_empty()
+            woken.append(name)
+            return q.get_nowait()
+        
+        first = asyncio.create_task(getter("first"))
+        second = asyncio.create_task(getter("second"))
+        await asyncio.sleep(0)
+        assert len(q._getters) == 2
+        
+        q.put_nowait("item")
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert woken == ["first"]
+        assert await first == "item"
+        assert not second.done()
+        assert len(q._getters) == 1
+        
+        # A cancelled waiter leaves the ring
+        second.cancel()
+        await asyncio.sleep(0)
+        assert len(q._getters) == 0
+    
+    run_async_test(run_test)
+
+
+def test_waiter_events_reused():
+    """Test blocked gets reuse pooled Events and wake in FIFO order across ring growth"""
+    async def run_test():
+        q = Queue()
+        results = []
+        
+        async def getter(n):
+            results.append((n, await q.get()))
+        
+        for round_ in range(2):
+            tasks = [asyncio.create_task(getter(n)) for n in range(6)]  # past the ring's 4 slots
+            await asyncio.sleep(0)
+            assert len(q._getters) == 6
+            for i in range(6):
+                q.put_nowait(i)
+            await asyncio.gather(*tasks)
+        assert results == [(n, n) for n in range(6)] * 2
+        pool = list(q._getters._free)
+        assert len(pool) == 6
+        
+        task = asyncio.create_task(getter(9))
+        await asyncio.sleep(0)
+        assert len(q._getters._free) == 5  # took one from the pool
+        q.put_nowait(9)
+        await task
+        assert sorted(map(id, q._getters._free)) == sorted(map(id, pool))
+    
+    run_async_test(run_test)
+
+
+def test_blocked_putter_woken():
+    """Test a putter waits for space in a bounded queue"""
+    async def run_test():
+        q = Queue(maxsize=2)
+        await q.put_many([1, 2])
+        task = asyncio.create_task(q.put_many([3, 4]))
+        await asyncio.sleep(0)
+        assert q.qsize() == 2
+        
+        assert await q.get_many(10) == [1, 2]
+        await task
+        assert await q.get_many(10) == [3, 4]
+        assert len(q._putters) == 0
+    
+    run_async_test(run_test)
+
+
+def test_get_many_waits_for_first_item():
+    """Test get_many blocks until an item arrives and respects max_items"""
+    async def run_test():
+        q = Queue()
+        task = asyncio.create_task(q.get_many(2))
+        await asyncio.sleep(0)
+        await q.put_many(["a", "b", "c"])
+        assert await task == ["a", "b"]
+        assert q.get_nowait() == "c"
+    
+    run_async_test(run_test)
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
@@ -0,0 +1,170 @@
+"""
+Unit tests for chipclaw.channels.ratelimit and BaseChannel.handle_inbound
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.channels import ratelimit
+from chipclaw.channels.ratelimit import RateLimiter, ALLOW, REJECT, DROP
+from chipclaw.channels.base import BaseChannel
+from chipclaw.channels.mqtt import MQTTChannel
+from chipclaw.bus.events import InboundMessage
+
+
+class FakeClock:
+    """Replaces ratelimit.ticks_ms so refills do not need real sleeps"""
+    def __init__(self):
+        self.now = 1000
+        self._saved = None
+
+    def __enter__(self):
+        self._saved = ratelimit.ticks_ms
+        ratelimit.ticks_ms = lambda: self.now
+        return self
+
+    def __exit__(self, *exc):
+        ratelimit.ticks_ms = self._saved
+
+
+class MockBus:
+    def __init__(self):
+        self.inbound_messages = []
+        self.outbound_messages = []
+
+    async def publish_inbound(self, msg):
+        self.inbound_messages.append(msg)
+
+    async def publish_outbound(self, msg):
+        self.outbound_messages.append(msg)
+
+
+class RecordingChannel(BaseChannel):
+    def __init__(self, bus):
+        super().__init__("test", bus, {})
+        self.sent = []
+
+    async def send(self, msg):
+        self.sent.append(msg)
+        await asyncio.sleep(10)  # a stalled link must not hold up inbound
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+def test_sender_burst_and_refill():
+    """Test a sender gets burst messages, then one per 1/rate seconds"""
+    with FakeClock() as clock:
+        limiter = RateLimiter({"sender_rate": 1, "sender_burst": 3})
+        assert [limiter.check("mqtt", "a") for _ in range(3)] == [ALLOW] * 3
+        assert limiter.check("mqtt", "a") == REJECT
+        assert limiter.check("mqtt", "a") == DROP
+        assert limiter.check("mqtt", "b") == ALLOW  # other senders unaffected
+
+        clock.now += 999
+        assert limiter.check("mqtt", "a") == DROP
+        clock.now += 1
+        assert limiter.check("mqtt", "a") == ALLOW
+        # Allowed again, so the next rejection is reported once more
+        assert limiter.check("mqtt", "a") == REJECT
+
+        clock.now += 60000
+        assert [limiter.check("mqtt", "a") for _ in range(4)] == [ALLOW] * 3 + [REJECT]
+        assert limiter.stats()["limited"] == 5
+
+
+def test_chat_bucket_shared_by_senders():
+    """Test the chat limit holds across different senders"""
+    with FakeClock():
+        limiter = RateLimiter({"sender_burst": 5, "chat_burst": 3})
+        results = [limiter.check("http", f"s{i}", "room") for i in range(4)]
+        assert results == [ALLOW, ALLOW, ALLOW, REJECT]
+        assert limiter.check("http", "s9", "other") == ALLOW
+
+
+def test_keys_bounded_and_exempt():
+    """Test bucket count stays at max_keys and exempt channels skip checks"""
+    limiter = RateLimiter({"max_keys": 8, "sender_burst": 1, "exempt": ["uart"]})
+    for i in range(100):
+        limiter.check("mqtt", f"id{i}", f"chat{i}")
+    assert limiter.stats()["keys"] == 8
+
+    assert [limiter.check("uart", "uart_user") for _ in range(10)] == [ALLOW] * 10
+    assert limiter.stats()["keys"] == 8
+
+
+def test_handle_inbound_notifies_once():
+    """Test a limited sender gets one queued reply and nothing reaches the bus"""
+    async def run_test():
+        bus = MockBus()
+        channel = RecordingChannel(bus)
+        assert await channel.handle_inbound(InboundMessage("test", "u", "c", "first"))
+
+        with FakeClock():
+            channel.limiter = RateLimiter({"sender_burst": 1})
+            results = []
+            for n in range(4):
+                msg = InboundMessage("test", "u", "c", str(n))
+                results.append(await asyncio.wait_for(channel.handle_inbound(msg), 1))
+            assert channel.is_allowed("u", "c") == DROP
+        assert results == [True, False, False, False]
+        assert [m.content for m in bus.inbound_messages] == ["first", "0"]
+        assert channel.sent == []
+        assert len(bus.outbound_messages) == 1
+        notice = bus.outbound_messages[0]
+        assert notice.content == BaseChannel.RATE_LIMITED_REPLY
+        assert notice.channel == "test" and notice.reply_to.content == "1"
+
+    run_async_test(run_test)
+
+
+def test_handle_inbound_uses_is_allowed_override():
+    """Test a channel's is_allowed override decides, even with no limiter"""
+    class DenyList(RecordingChannel):
+        def is_allowed(self, sender_id, chat_id=None):
+            if sender_id == "banned":
+                return DROP
+            return super().is_allowed(sender_id, chat_id)
+    
+    async def run_test():
+        bus = MockBus()
+        channel = DenyList(bus)
+        assert not await channel.handle_inbound(InboundMessage("test", "banned", "c", "x"))
+        assert await channel.handle_inbound(InboundMessage("test", "u", "c", "y"))
+        assert [m.content for m in bus.inbound_messages] == ["y"]
+        assert bus.outbound_messages == []
+    
+    run_async_test(run_test)
+
+
+def test_mqtt_anonymous_senders_keyed_by_chat():
+    """Test MQTT messages without sender_id are limited per topic chat"""
+    async def run_test():
+        bus = MockBus()
+        channel = MQTTChannel(bus, {"topic_in": "cc/in/{chat_id}"})
+        with FakeClock():
+            channel.limiter = RateLimiter({"sender_burst": 1, "chat_burst": 5})
+            await channel._on_message("cc/in/a", b"one")
+            await channel._on_message("cc/in/b", b"two")
+            await channel._on_message("cc/in/a", b'{"content": "three"}')
+        assert [(m.sender_id, m.content) for m in bus.inbound_messages] == [("a", "one"), ("b", "two")]
+        assert [m.chat_id for m in bus.outbound_messages] == ["a"]
+
+    run_async_test(run_test)
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
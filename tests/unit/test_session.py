@@ -0,0 +1,479 @@
+"""
+Unit tests for chipclaw.session.manager module
+"""
+import sys
+import os
+import json
+import tempfile
+import shutil
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from chipclaw.session.manager import Session, SessionManager
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+def _read_records(manager, key):
+    """Read raw JSONL records from a session file"""
+    with open(manager._path(key)) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_session_add_and_history():
+    """Test Session message history window"""
+    session = Session("uart:chat1")
+    for i in range(5):
+        session.add_message("user", f"msg {i}")
+    
+    history = session.get_history(max=3)
+    assert len(history) == 3
+    assert history[0]["content"] == "msg 2"
+
+
+def test_save_appends_only_new_messages():
+    """Test that save appends new records instead of rewriting"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir)
+        session = manager.get_or_create("uart:chat1")
+        session.add_message("user", "hello")
+        session.add_message("assistant", "hi")
+        manager.save(session)
+        
+        # Tamper with the first record: an append-only save leaves it alone
+        path = manager._path(session.key)
+        with open(path, 'w') as f:
+            f.write(json.dumps({"role": "user", "content": "marker"}) + '\n')
+            f.write(json.dumps({"role": "assistant", "content": "hi"}) + '\n')
+        
+        session.add_message("user", "again")
+        manager.save(session)
+        
+        records = _read_records(manager, session.key)
+        assert len(records) == 3
+        assert records[0]["content"] == "marker"
+        assert records[2]["content"] == "again"
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_save_without_changes_is_noop():
+    """Test that saving an unchanged session writes nothing"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir)
+        session = manager.get_or_create("uart:chat1")
+        session.add_message("user", "hello")
+        manager.save(session)
+        manager.save(session)
+        
+        assert len(_read_records(manager, session.key)) == 1
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_compaction_trims_to_live_window():
+    """Test that files are compacted once they exceed compact_factor x window"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir, max_messages=4, config={"compact_factor": 2})
+        session = manager.get_or_create("uart:chat1")
+        for i in range(8):
+            session.add_message("user", f"msg {i}")
+            manager.save(session)
+        assert len(_read_records(manager, session.key)) == 8
+        
+        session.add_message("user", "msg 8")
+        manager.save(session)
+        
+        records = _read_records(manager, session.key)
+        assert [r["content"] for r in records] == ["msg 5", "msg 6", "msg 7", "msg 8"]
+        assert len(session.messages) == 4
+        assert not os.path.exists(manager._path(session.key) + ".tmp")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_clear_rewrites_file():
+    """Test that a cleared session is rewritten on next save"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir)
+        session = manager.get_or_create("uart:chat1")
+        session.add_message("user", "old")
+        manager.save(session)
+        
+        session.clear()
+        session.add_message("user", "new")
+        manager.save(session)
+        
+        records = _read_records(manager, session.key)
+        assert [r["content"] for r in records] == ["new"]
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_load_resumes_appending():
+    """Test that a reloaded session continues appending after existing records"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir)
+        session = manager.get_or_create("mqtt:chat2")
+        session.add_message("user", "one")
+        manager.save(session)
+        
+        reloaded = SessionManager(temp_dir).get_or_create("mqtt:chat2")
+        assert len(reloaded.messages) == 1
+        reloaded.add_message("assistant", "two")
+        manager.save(reloaded)
+        
+        records = _read_records(manager, "mqtt:chat2")
+        assert [r["content"] for r in records] == ["one", "two"]
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def _write_records(manager, key, count):
+    """Write count user records directly to a session file"""
+    with open(manager._path(key), 'w') as f:
+        for i in range(count):
+            f.write(json.dumps({"role": "user", "content": f"msg {i}"}) + '\n')
+
+
+def test_load_reads_only_tail():
+    """Test that loading parses only the last max_messages records"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir, max_messages=10, config={"compact_factor": 10})
+        manager.store.BLOCK_SIZE = 64  # force several backward reads
+        _write_records(manager, "uart:chat1", 50)
+        
+        session = manager.get_or_create("uart:chat1")
+        assert [m["content"] for m in session.messages] == [f"msg {i}" for i in range(40, 50)]
+        assert session._head > 0
+        assert 45 <= session._records <= 55
+        
+        # Appending continues after the existing records
+        session.add_message("assistant", "reply")
+        manager.save(session)
+        assert len(_read_records(manager, "uart:chat1")) == 51
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_load_older_history():
+    """Test lazily prepending older records"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir, max_messages=10)
+        manager.store.BLOCK_SIZE = 64
+        _write_records(manager, "uart:chat1", 25)
+        
+        session = manager.get_or_create("uart:chat1")
+        assert manager.load_older(session, count=5) == 5
+        assert session.messages[0]["content"] == "msg 10"
+        assert len(session.messages) == 15
+        
+        assert manager.load_older(session, count=100) == 10
+        assert session.messages[0]["content"] == "msg 0"
+        assert manager.load_older(session) == 0
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_load_skips_corrupt_tail_record():
+    """Test that a truncated final record does not lose the rest"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir, max_messages=10)
+        _write_records(manager, "uart:chat1", 3)
+        with open(manager._path("uart:chat1"), 'a') as f:
+            f.write('{"role": "user", "cont')
+        
+        session = manager.get_or_create("uart:chat1")
+        assert [m["content"] for m in session.messages] == ["msg 0", "msg 1", "msg 2"]
+        
+        # The next save rewrites the file instead of appending to garbage
+        session.add_message("assistant", "reply")
+        manager.save(session)
+        records = _read_records(manager, "uart:chat1")
+        assert records[-1]["content"] == "reply"
+        assert len(records) == 4
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_session_cache_hits_and_misses():
+    """Test session cache metrics"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir)
+        first = manager.get_or_create("uart:chat1")
+        second = manager.get_or_create("uart:chat1")
+        
+        assert first is second
+        stats = manager.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_session_cache_evicts_to_disk():
+    """Test that evicted sessions are saved and reload intact"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir, config={"cache_entries": 2})
+        for i in range(3):
+            session = manager.get_or_create(f"mqtt:chat{i}")
+            session.add_message("user", f"hello {i}")
+        
+        assert len(manager.sessions) == 2
+        assert "mqtt:chat0" not in manager.sessions
+        assert manager.stats()["evictions"] == 1
+        
+        reloaded = manager.get_or_create("mqtt:chat0")
+        assert reloaded.messages[0]["content"] == "hello 0"
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_session_cache_byte_limit():
+    """Test that the session cache honours its byte budget"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir, config={"cache_bytes": 2000})
+        for i in range(4):
+            session = manager.get_or_create(f"mqtt:chat{i}")
+            session.add_message("user", "x" * 800)
+            manager.save(session)
+        
+        assert manager.sessions.bytes <= 2000
+        assert "mqtt:chat3" in manager.sessions
+        assert "mqtt:chat0" not in manager.sessions
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_mark_dirty_defers_write():
+    """Test that dirty sessions are written only on flush"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir)
+        session = manager.get_or_create("uart:chat1")
+        session.add_message("user", "hello")
+        manager.mark_dirty(session)
+        manager.mark_dirty(session)  # coalesced
+        
+        assert not os.path.exists(manager._path(session.key))
+        assert manager.stats()["dirty"] == 1
+        
+        assert manager.flush() == 1
+        assert len(_read_records(manager, session.key)) == 1
+        assert manager.flush() == 0
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_flusher_threshold_and_shutdown():
+    """Test background flusher wakes on threshold and flushes on stop"""
+    async def run_test():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            manager = SessionManager(temp_dir, config={
+                "flush_interval": 60,
+                "flush_threshold": 2
+            })
+            task = asyncio.create_task(manager.run_flusher())
+            await asyncio.sleep(0)
+            
+            for i in range(2):
+                session = manager.get_or_create(f"mqtt:chat{i}")
+                session.add_message("user", "hi")
+                manager.mark_dirty(session)
+            await asyncio.sleep(0.01)
+            assert os.path.exists(manager._path("mqtt:chat1"))
+            assert manager.stats()["dirty"] == 0
+            
+            session = manager.get_or_create("mqtt:chat2")
+            session.add_message("user", "bye")
+            manager.mark_dirty(session)
+            manager.stop_flusher()
+            await task
+            assert os.path.exists(manager._path("mqtt:chat2"))
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    run_async_test(run_test)
+
+
+def test_sharded_layout():
+    """Test that session files are placed in hash-named shard directories"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir, config={"shards": 16})
+        for i in range(20):
+            session = manager.get_or_create(f"mqtt:chat{i}")
+            session.add_message("user", "hi")
+            manager.save(session)
+        
+        sessions_dir = os.path.join(temp_dir, "sessions")
+        shards = os.listdir(sessions_dir)
+        assert len(shards) > 1
+        for name in shards:
+            assert len(name) == 2
+            assert os.path.isdir(os.path.join(sessions_dir, name))
+        
+        path = manager._path("mqtt:chat3")
+        assert os.path.dirname(path) == os.path.join(sessions_dir, manager._shard_of("mqtt_chat3"))
+        reloaded = SessionManager(temp_dir, config={"shards": 16}).get_or_create("mqtt:chat3")
+        assert reloaded.messages[0]["content"] == "hi"
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_flat_session_moved_into_shard():
+    """Test that flat-layout files are found and moved on load"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        flat = SessionManager(temp_dir)
+        for key in ("uart:a", "uart:b"):
+            session = flat.get_or_create(key)
+            session.add_message("user", key)
+            flat.save(session)
+        
+        manager = SessionManager(temp_dir, config={"shards": 4})
+        assert manager.get_or_create("uart:a").messages[0]["content"] == "uart:a"
+        assert os.path.exists(manager._path("uart:a"))
+        assert not os.path.exists(flat._path("uart:a"))
+        
+        assert manager.migrate_all() == 1
+        assert os.path.exists(manager._path("uart:b"))
+        assert manager.migrate_all() == 0
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_reshard_migrates_at_startup():
+    """Test changing shards finds old-shard files lazily and moves all at startup"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        old = SessionManager(temp_dir, config={"shards": 16})
+        assert old.check_layout() == 0
+        keys = [f"mqtt:chat{i}" for i in range(6)]
+        for key in keys:
+            session = old.get_or_create(key)
+            session.add_message("user", key)
+            old.save(session)
+        
+        # Lazy path: the recorded 16-shard layout is searched
+        lazy = SessionManager(temp_dir, config={"shards": 4})
+        assert lazy.get_or_create("mqtt:chat0").messages[0]["content"] == "mqtt:chat0"
+        
+        manager = SessionManager(temp_dir, config={"shards": 4})
+        moving = [k for k in keys[1:] if old._path(k) != manager._path(k)]
+        assert moving
+        assert manager.check_layout() == len(moving)
+        for key in keys:
+            assert os.path.exists(manager._path(key))
+        assert manager.check_layout() == 0
+        assert SessionManager(temp_dir, config={"shards": 4}).prev_shards == 4
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def _age_file(path, seconds):
+    """Push a file's mtime into the past"""
+    past = os.stat(path).st_mtime - seconds
+    os.utime(path, (past, past))
+
+
+def test_sweep_expires_by_channel_ttl():
+    """Test that the sweeper deletes only sessions past their channel TTL"""
+    async def run_test():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            config = {"ttl": {"uart": 3600}, "shards": 4, "sweep_batch": 1}
+            manager = SessionManager(temp_dir, config=config)
+            for key in ("uart:old", "uart:fresh", "mqtt:old", "uart:active"):
+                session = manager.get_or_create(key)
+                session.add_message("user", "hi")
+                manager.save(session)
+                if key.endswith("old") or key == "uart:active":
+                    _age_file(manager._path(key), 7200)
+            for key in ("uart:old", "uart:fresh", "mqtt:old"):
+                manager.sessions.pop(key)
+            
+            result = await manager.sweep()
+            assert result["scanned"] == 4
+            assert result["expired"] == 1
+            assert result["reclaimed"] > 0
+            assert manager.stats()["reclaimed"] == result["reclaimed"]
+            assert not os.path.exists(manager._path("uart:old"))
+            assert os.path.exists(manager._path("uart:fresh"))
+            assert os.path.exists(manager._path("mqtt:old"))
+            assert os.path.exists(manager._path("uart:active"))
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    run_async_test(run_test)
+
+
+def test_sweep_archives_binary_sessions():
+    """Test archiving moves data and index files out of the live tree"""
+    async def run_test():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            config = {"ttl": {"default": 60}, "expire_action": "archive", "format": "binary"}
+            manager = SessionManager(temp_dir, config=config)
+            session = manager.get_or_create("mqtt:chat1")
+            session.add_message("user", "hi")
+            manager.save(session)
+            manager.sessions.pop("mqtt:chat1")
+            for path in manager.store.paths(manager._path("mqtt:chat1")):
+                _age_file(path, 120)
+            
+            result = await manager.sweep()
+            assert result["expired"] == 1
+            archive = os.path.join(temp_dir, "sessions", "archive")
+            assert sorted(os.listdir(archive)) == ["mqtt_chat1.cci", "mqtt_chat1.ccs"]
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    run_async_test(run_test)
+
+
+def test_delete_session():
+    """Test deleting a session removes memory and file"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manager = SessionManager(temp_dir)
+        session = manager.get_or_create("uart:chat1")
+        session.add_message("user", "hello")
+        manager.save(session)
+        
+        manager.delete("uart:chat1")
+        assert "uart:chat1" not in manager.sessions
+        assert not os.path.exists(manager._path("uart:chat1"))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
@@ -0,0 +1,164 @@
+"""
+Unit tests for chipclaw.session.store module
+"""
+import sys
+import os
+import json
+import tempfile
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from chipclaw.session.store import JsonlStore, BinaryStore
+from chipclaw.session.manager import SessionManager
+
+
+SAMPLE = [
+    {"role": "user", "content": "héllo"},
+    {"role": "assistant", "content": None, "tool_calls": [{"id": "1", "type": "function"}]},
+    {"role": "tool", "tool_call_id": "1", "content": "ok"},
+    {"role": "narrator", "content": "custom role"},
+    {"role": "assistant", "content": "x" * 1000},
+]
+
+
+def test_binary_round_trip():
+    """Test that every message shape survives encode/decode"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        store = BinaryStore()
+        path = os.path.join(temp_dir, "s.ccs")
+        store.append(path, SAMPLE[:2])
+        store.append(path, SAMPLE[2:])
+        
+        messages, head, count = store.read_tail(path, 0)
+        assert messages == SAMPLE
+        assert head == 0
+        assert count == len(SAMPLE)
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_binary_compresses_long_content():
+    """Test that long, repetitive content is stored deflated"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(temp_dir, "s.ccs")
+        BinaryStore(compress_min=256).append(path, [SAMPLE[4]])
+        packed = os.stat(path)[6]
+        
+        plain_path = os.path.join(temp_dir, "p.ccs")
+        BinaryStore(compress_min=0).append(plain_path, [SAMPLE[4]])
+        assert packed < os.stat(plain_path)[6]
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_binary_tail_and_older():
+    """Test seeking to the last N records and paging backwards"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        store = BinaryStore()
+        path = os.path.join(temp_dir, "s.ccs")
+        store.append(path, [{"role": "user", "content": f"msg {i}"} for i in range(30)])
+        
+        tail, head, count = store.read_tail(path, 5)
+        assert [m["content"] for m in tail] == [f"msg {i}" for i in range(25, 30)]
+        assert head == 25
+        
+        older, head, _ = store.read_tail(path, 10, end=head)
+        assert older[0]["content"] == "msg 15"
+        assert older[-1]["content"] == "msg 24"
+        assert head == 15
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_binary_repairs_torn_index():
+    """Test that a record written without its index entry is recovered"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        store = BinaryStore()
+        path = os.path.join(temp_dir, "s.ccs")
+        store.append(path, SAMPLE[:3])
+        # Simulate a crash between the data and index writes
+        with open(store._index_path(path), 'rb') as f:
+            index = f.read()
+        with open(store._index_path(path), 'wb') as f:
+            f.write(index[:-4])
+        with open(path, 'ab') as f:
+            f.write(b'\x50\x00')  # partial header of a next record
+        
+        messages, head, count, torn = store.load(path, 0)
+        assert torn
+        assert messages == SAMPLE[:3]
+        assert count == 3
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_manager_binary_format():
+    """Test SessionManager end to end with the binary store"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        config = {"format": "binary"}
+        manager = SessionManager(temp_dir, max_messages=3, config=config)
+        session = manager.get_or_create("mqtt:chat1")
+        for msg in SAMPLE:
+            session.add_message(**msg)
+        manager.save(session)
+        assert manager._path("mqtt:chat1").endswith(".ccs")
+        
+        reloaded = SessionManager(temp_dir, max_messages=3, config=config).get_or_create("mqtt:chat1")
+        assert reloaded.messages == SAMPLE[-3:]
+        
+        manager.delete("mqtt:chat1")
+        assert os.listdir(os.path.join(temp_dir, "sessions")) == []
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_manager_migrates_jsonl():
+    """Test that legacy JSONL sessions convert to binary on load"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        legacy = SessionManager(temp_dir)
+        session = legacy.get_or_create("uart:chat1")
+        for msg in SAMPLE:
+            session.add_message(**msg)
+        legacy.save(session)
+        other = legacy.get_or_create("uart:chat2")
+        other.add_message("user", "second")
+        legacy.save(other)
+        
+        manager = SessionManager(temp_dir, config={"format": "binary"})
+        assert manager.get_or_create("uart:chat1").messages == SAMPLE
+        assert not os.path.exists(legacy._path("uart:chat1"))
+        
+        assert manager.migrate_all() == 1
+        assert sorted(os.listdir(os.path.join(temp_dir, "sessions"))) == [
+            "uart_chat1.cci", "uart_chat1.ccs", "uart_chat2.cci", "uart_chat2.ccs"
+        ]
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_jsonl_store_round_trip():
+    """Test JsonlStore append/rewrite/read"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        store = JsonlStore()
+        path = os.path.join(temp_dir, "s.jsonl")
+        store.append(path, SAMPLE)
+        assert store.read_tail(path, 0)[0] == SAMPLE
+        
+        store.rewrite(path, SAMPLE[:1])
+        with open(path) as f:
+            assert [json.loads(line) for line in f] == SAMPLE[:1]
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
@@ -10,6 +10,7 @@ import shutil
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from chipclaw.agent.skills import SkillsManager
+from chipclaw.agent.tools.skill import LoadSkillTool
 
 
 def test_skills_manager_creation():
@@ -145,6 +146,91 @@ def test_list_skills_in_dir_none():
     assert skills == []
 
 
+def test_load_skill_cached():
+    """Test that loaded skill bodies are served from the LRU cache"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        workspace = os.path.join(temp_dir, "workspace")
+        os.makedirs(workspace)
+        
+        sm = SkillsManager(workspace)
+        first = sm.load_skill("peripheral_api")
+        second = sm.load_skill("peripheral_api")
+        
+        assert first is second
+        assert sm.cache.hits == 1
+        assert sm.cache.bytes == len(first['content'])
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_load_skill_cache_revalidates():
+    """Test that an edited skill file replaces the cached body"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        workspace = os.path.join(temp_dir, "workspace")
+        skill_dir = os.path.join(workspace, "skills", "demo")
+        os.makedirs(skill_dir)
+        path = os.path.join(skill_dir, "SKILL.md")
+        with open(path, 'w') as f:
+            f.write("---\nname: demo\ndescription: Old\n---\nold body\n")
+        
+        sm = SkillsManager(workspace)
+        assert "old body" in sm.load_skill("demo")['content']
+        
+        with open(path, 'w') as f:
+            f.write("---\nname: demo\ndescription: New\n---\nnew, longer body\n")
+        
+        assert "new, longer body" in sm.load_skill("demo")['content']
+        assert sm.describe_skill("demo") == "New"
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_load_skill_cache_bounded():
+    """Test that the body cache evicts when over its byte budget"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        workspace = os.path.join(temp_dir, "workspace")
+        for name in ("a", "b", "c"):
+            skill_dir = os.path.join(workspace, "skills", name)
+            os.makedirs(skill_dir)
+            with open(os.path.join(skill_dir, "SKILL.md"), 'w') as f:
+                f.write("---\nname: {}\n---\n{}\n".format(name, "x" * 100))
+        
+        sm = SkillsManager(workspace, cache_bytes=250)
+        for name in ("a", "b", "c"):
+            sm.load_skill(name)
+        
+        assert sm.cache.bytes <= 250
+        assert "a" not in sm.cache
+        assert "c" in sm.cache
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_load_skill_tool():
+    """Test the load_skill tool returns skill bodies and reports misses"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        workspace = os.path.join(temp_dir, "workspace")
+        os.makedirs(workspace)
+        
+        tool = LoadSkillTool(SkillsManager(workspace))
+        assert tool.name == "load_skill"
+        assert tool.parameters["required"] == ["name"]
+        
+        result = tool.execute(name="peripheral_api")
+        assert result.startswith("# Skill: peripheral_api")
+        assert "MicroPython" in result
+        
+        result = tool.execute(name="missing")
+        assert "Error" in result
+        assert "peripheral_api" in result
+    finally:
+        shutil.rmtree(temp_dir)
+
+
 if __name__ == "__main__":
     from tests import run_tests
     import sys
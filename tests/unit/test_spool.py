@@ -0,0 +1,204 @@
+"""
+Unit tests for chipclaw.channels.spool and MQTT spooling
+"""
+import sys
+import os
+import json
+import tempfile
+import shutil
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.channels.spool import Spool
+from chipclaw.channels.mqtt import MQTTChannel
+from chipclaw.bus.events import OutboundMessage
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+def _take(spool):
+    record = spool.peek()
+    spool.ack()
+    return record
+
+
+def test_spool_fifo_across_segments():
+    """Test records come back in order and delivered segments are removed"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        spool = Spool(temp_dir, {"segment_bytes": 40})
+        for i in range(6):
+            spool.append({"n": i})
+        assert spool.stats()["segments"] > 1
+        
+        assert [_take(spool)["n"] for _ in range(6)] == list(range(6))
+        assert spool.peek() is None
+        assert spool.stats()["segments"] == 1
+        assert spool.stats()["sent"] == 6
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_spool_survives_restart():
+    """Test the cursor and torn tail are handled when reopening"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        spool = Spool(temp_dir)
+        for i in range(3):
+            spool.append({"n": i})
+        _take(spool)
+        spool.peek()
+        spool.fail("offline")
+        
+        # Simulate a crash mid-append
+        with open(spool._segment_path(spool._tail), 'a') as f:
+            f.write('{"n": 9')
+        
+        spool = Spool(temp_dir)
+        assert spool.attempts == 1
+        spool.append({"n": 3})
+        assert [_take(spool)["n"] for _ in range(3)] == [1, 2, 3]
+        assert spool.peek() is None
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_spool_backoff_and_dead_letter():
+    """Test backoff grows with jitter and gives up after max_attempts"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        spool = Spool(temp_dir, {"max_attempts": 3, "base_delay": 2, "max_delay": 3})
+        spool.append({"n": 0})
+        spool.append({"n": 1})
+        spool.peek()
+        
+        first = spool.fail("boom")
+        assert 1 <= first <= 2
+        second = spool.fail("boom")
+        assert 1.5 <= second <= 3  # capped at max_delay
+        assert spool.fail("boom") == 0
+        
+        assert spool.peek() == {"n": 1}
+        assert spool.attempts == 0
+        assert spool.stats()["dead"] == 1
+        with open(os.path.join(temp_dir, "dead.jsonl")) as f:
+            dead = json.loads(f.readline())
+        assert dead["record"] == {"n": 0}
+        assert dead["error"] == "boom"
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_spool_drain():
+    """Test drain delivers in order and stops with a delay on failure"""
+    async def run_test():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            spool = Spool(temp_dir, {"drain_rate": 0})
+            for i in range(4):
+                spool.append({"n": i})
+            delivered = []
+            
+            async def send(record):
+                if record["n"] == 2 and not delivered[2:]:
+                    delivered.append("fail")
+                    raise OSError("lost connection")
+                delivered.append(record["n"])
+            
+            delay = await spool.drain(send)
+            assert delay > 0
+            assert delivered == [0, 1, "fail"]
+            assert await spool.drain(send) == 0
+            assert delivered == [0, 1, "fail", 2, 3]
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    run_async_test(run_test)
+
+
+class FakeClient:
+    """Records publishes; raises while offline"""
+    
+    def __init__(self):
+        self.published = []
+        self.online = True
+    
+    async def publish(self, topic, payload, qos=0):
+        if not self.online:
+            raise OSError("offline")
+        self.published.append((topic, json.loads(payload)["content"]))
+
+
+def test_mqtt_send_spools_while_disconnected():
+    """Test replies are spooled when publish fails and keep their order"""
+    async def run_test():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            channel = MQTTChannel(None, {"topic_out": "out"}, spool=Spool(temp_dir))
+            channel.client = FakeClient()
+            channel.connected = True
+            
+            await channel.send(OutboundMessage("mqtt", "c1", "a"))
+            channel.client.online = False
+            await channel.send(OutboundMessage("mqtt", "c1", "b"))
+            channel.client.online = True
+            # Spool not yet drained: "c" must queue behind "b"
+            await channel.send(OutboundMessage("mqtt", "c1", "c"))
+            assert channel.client.published == [("out", "a")]
+            
+            assert await channel.spool.drain(channel._publish_record) == 0
+            assert channel.client.published == [("out", "a"), ("out", "b"), ("out", "c")]
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    run_async_test(run_test)
+
+
+def test_mqtt_send_spools_when_bus_times_out():
+    """Test a publish cut off by the bus send_timeout is spooled, not lost"""
+    class SlowClient(FakeClient):
+        async def publish(self, topic, payload, qos=0):
+            await asyncio.sleep(10)
+    
+    class TimedBus:
+        send_timeout = 0.05
+    
+    async def run_test():
+        temp_dir = tempfile.mkdtemp()
+        try:
+            channel = MQTTChannel(TimedBus(), {"topic_out": "out", "ack_timeout": 10},
+                                  spool=Spool(temp_dir))
+            assert channel.ack_timeout == 0.025
+            channel.client = SlowClient()
+            channel.connected = True
+            
+            timed_out = False
+            try:
+                await asyncio.wait_for(channel.send(OutboundMessage("mqtt", "c1", "a")), 0.05)
+            except asyncio.TimeoutError:
+                timed_out = True
+            assert timed_out
+            record = channel.spool.peek()
+            assert record["topic"] == "out"
+            assert json.loads(record["payload"])["content"] == "a"
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    run_async_test(run_test)
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
@@ -40,7 +40,7 @@ def test_uart_channel_creation():
     config = {"enabled": True}
     ch = UARTChannel(bus, config)
     assert ch.name == "uart"
-    assert ch.buffer == ""
+    assert len(ch.buffer) == 0
     assert ch._running is False
     assert ch._poller is None
 
@@ -88,6 +88,52 @@ def test_uart_channel_handle_line_json():
     run_async_test(run_test)
 
 
+def test_uart_channel_split_lines():
+    """Test complete lines are split out and partial lines kept"""
+    bus = MockBus()
+    ch = UARTChannel(bus, {"enabled": True})
+    ch.buffer.extend("first\r\n\n  second \nthi".encode())
+    assert ch._split_lines() == ["first", "second"]
+    assert ch.buffer == bytearray(b"thi")
+    ch.buffer.extend("rd \u00e9\n".encode())
+    assert ch._split_lines() == ["third \u00e9"]
+    assert len(ch.buffer) == 0
+
+
+def test_uart_channel_discards_overlong_line():
+    """Test a line with no newline cannot grow the buffer without bound"""
+    bus = MockBus()
+    ch = UARTChannel(bus, {"enabled": True, "max_line": 8})
+    ch.buffer.extend(b"0123456789")
+    assert ch._split_lines() == []
+    assert len(ch.buffer) == 0
+
+
+def test_uart_channel_reads_stream_in_bulk():
+    """Test a pipe stand-in is read in bulk and lines reach the bus"""
+    async def run_test():
+        bus = MockBus()
+        read_fd, write_fd = os.pipe()
+        stream = os.fdopen(read_fd, 'rb')
+        ch = UARTChannel(bus, {"enabled": True}, stream=stream)
+        try:
+            await ch.start()
+            payload = json.dumps({"content": "x" * 2000, "chat_id": "c1"})
+            os.write(write_fd, (payload + "\nplain\n").encode())
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if len(bus.inbound_messages) == 2:
+                    break
+            assert [m.content for m in bus.inbound_messages] == ["x" * 2000, "plain"]
+        finally:
+            await ch.stop()
+            await asyncio.sleep(0.01)
+            stream.close()
+            os.close(write_fd)
+    
+    run_async_test(run_test)
+
+
 def test_uart_channel_send():
     """Test sending an outbound message via stdout"""
     import io
@@ -121,6 +167,138 @@ def test_uart_channel_send():
     run_async_test(run_test)
 
 
+class ChunkRecorder:
+    """Binary output stand-in that records each write"""
+    def __init__(self):
+        self.writes = []
+    
+    def write(self, data):
+        self.writes.append(bytes(data))
+    
+    def output(self):
+        return b"".join(self.writes)
+
+
+async def _start_writer(config, out):
+    read_fd, write_fd = os.pipe()
+    stream = os.fdopen(read_fd, 'rb')
+    ch = UARTChannel(MockBus(), config, stream=stream, out_stream=out)
+    await ch.start()
+    
+    async def cleanup():
+        await ch.stop()
+        await asyncio.sleep(0.01)
+        stream.close()
+        os.close(write_fd)
+    
+    return ch, cleanup
+
+
+def test_uart_writer_sends_in_chunks():
+    """Test large replies are written in write_chunk pieces"""
+    async def run_test():
+        out = ChunkRecorder()
+        ch, cleanup = await _start_writer({"write_chunk": 100, "baudrate": 0}, out)
+        try:
+            await ch.send(OutboundMessage("uart", "c1", "x" * 1000))
+            await asyncio.sleep(0.05)
+            assert max(len(w) for w in out.writes) == 100
+            assert len(out.writes) > 10
+            assert json.loads(out.output())["content"] == "x" * 1000
+            assert ch._tx_bytes == 0
+        finally:
+            await cleanup()
+    
+    run_async_test(run_test)
+
+
+class StdoutStandIn:
+    """Text stdout whose .buffer records binary writes, like sys.stdout"""
+    def __init__(self):
+        self.buffer = ChunkRecorder()
+    
+    def write(self, text):
+        self.buffer.write(text.encode())
+
+
+def test_uart_writer_holds_print_until_record_ends():
+    """Test print() from another task lands after the record it interrupted"""
+    async def run_test():
+        stdout = StdoutStandIn()
+        saved = sys.stdout
+        sys.stdout = stdout
+        try:
+            ch, cleanup = await _start_writer({"write_chunk": 100, "baudrate": 0}, None)
+            try:
+                await ch.send(OutboundMessage("uart", "c1", "x" * 1000))
+                await asyncio.sleep(0)
+                await asyncio.sleep(0)
+                assert 0 < len(stdout.buffer.writes) < 10  # mid-record
+                print("log line")
+                await asyncio.sleep(0.05)
+                lines = stdout.buffer.output().split(b"\n")
+                at = [i for i, line in enumerate(lines) if line.startswith(b"{")][0]
+                assert json.loads(lines[at])["content"] == "x" * 1000
+                assert lines[at + 1] == b"log line"
+            finally:
+                await cleanup()
+        finally:
+            sys.stdout = saved
+    
+    run_async_test(run_test)
+
+
+def test_uart_writer_xon_xoff():
+    """Test XOFF pauses output until XON and is stripped from input"""
+    async def run_test():
+        out = ChunkRecorder()
+        config = {"write_chunk": 10, "baudrate": 0, "flow_control": "xonxoff"}
+        ch, cleanup = await _start_writer(config, out)
+        try:
+            ch.buffer.extend(b"he\x13llo\n")
+            await ch._process_buffer()
+            assert ch.paused
+            assert ch.bus.inbound_messages[0].content == "hello"
+            
+            await ch.send(OutboundMessage("uart", "c1", "reply"))
+            await asyncio.sleep(0.02)
+            assert out.writes == []
+            
+            ch.buffer.extend(b"\x11")
+            await ch._process_buffer()
+            await asyncio.sleep(0.02)
+            assert json.loads(out.output())["content"] == "reply"
+        finally:
+            await cleanup()
+    
+    run_async_test(run_test)
+
+
+def test_uart_writer_bounded_buffer():
+    """Test send waits while tx_buffer is full instead of growing it"""
+    async def run_test():
+        out = ChunkRecorder()
+        config = {"tx_buffer": 64, "baudrate": 0, "flow_control": "xonxoff"}
+        ch, cleanup = await _start_writer(config, out)
+        try:
+            ch.paused = True
+            await ch.send(OutboundMessage("uart", "c1", "a" * 40))
+            second = asyncio.create_task(ch.send(OutboundMessage("uart", "c1", "b" * 40)))
+            await asyncio.sleep(0.02)
+            assert not second.done()
+            
+            ch.paused = False
+            ch._tx_ready.set()
+            await second
+            await asyncio.sleep(0.02)
+            lines = out.output().decode().splitlines()
+            assert [json.loads(l)["content"][0] for l in lines] == ["a", "b"]
+        finally:
+            await cleanup()
+    
+    run_async_test(run_test)
+
+
 def test_uart_channel_stop():
     """Test stopping the channel"""
     async def run_test():
@@ -0,0 +1,199 @@
+"""
+Unit tests for chipclaw.channels.framing and framed UART mode
+"""
+import sys
+import os
+import io
+import struct
+import zlib
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from chipclaw.channels import framing
+from chipclaw.channels.framing import FrameDecoder, encode_frame, crc16
+from chipclaw.channels.uart import UARTChannel
+from chipclaw.bus.events import OutboundMessage
+
+
+class MockBus:
+    """Mock message bus for testing"""
+    def __init__(self):
+        self.inbound_messages = []
+    
+    async def publish_inbound(self, msg):
+        self.inbound_messages.append(msg)
+
+
+def run_async_test(test_func):
+    """Helper to run async test functions with proper event loop setup"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(test_func())
+    finally:
+        loop.close()
+
+
+def test_crc16_check_value():
+    """Test CRC-16/CCITT-FALSE against its published check value"""
+    assert crc16(b"123456789") == 0x29B1
+
+
+def test_varint_round_trip():
+    """Test varint encoding at byte boundaries"""
+    for n in (0, 127, 128, 300, 16384, 1 << 20):
+        encoded = framing.encode_varint(n)
+        assert framing.decode_varint(encoded, 0) == (n, len(encoded))
+    assert framing.decode_varint(b"\x80", 0) == (None, 1)
+
+
+def test_frames_round_trip_with_noise():
+    """Test frames survive split delivery, log noise and compression"""
+    big = ("line with\nnewlines " * 100).encode()
+    stream = (b"boot log\r\n" + encode_frame(framing.TYPE_TEXT, b"\x00\xff raw")
+              + b"noise" + encode_frame(framing.TYPE_JSON, big))
+    assert len(stream) < len(big)  # large body was deflated
+    
+    decoder = FrameDecoder()
+    buf = bytearray()
+    frames = []
+    for i in range(0, len(stream), 7):
+        buf.extend(stream[i:i + 7])
+        frames.extend(decoder.decode(buf))
+    assert frames == [(framing.TYPE_TEXT, b"\x00\xff raw"), (framing.TYPE_JSON, big)]
+    assert len(buf) == 0
+
+
+def test_corrupt_frame_is_skipped():
+    """Test a CRC failure drops only the damaged frame"""
+    bad = bytearray(encode_frame(framing.TYPE_TEXT, b"damaged"))
+    bad[5] ^= 0x01
+    buf = bytearray(bytes(bad) + encode_frame(framing.TYPE_TEXT, b"good"))
+    decoder = FrameDecoder()
+    assert decoder.decode(buf) == [(framing.TYPE_TEXT, b"good")]
+    assert decoder.errors >= 1
+
+
+def _deflate_frame(ftype, packed):
+    """Frame whose body is sent as-is with FLAG_DEFLATE and a valid CRC"""
+    head = bytes((ftype, framing.FLAG_DEFLATE)) + framing.encode_varint(len(packed))
+    return bytes((framing.MAGIC,)) + head + packed + struct.pack(">H", crc16(packed, crc16(head)))
+
+
+def test_bad_deflate_body_is_skipped():
+    """Test a valid-CRC frame that fails to inflate is dropped, not fatal"""
+    bomb = zlib.compress(b"\x00" * 5000)
+    buf = bytearray(encode_frame(framing.TYPE_TEXT, b"first")
+                    + _deflate_frame(framing.TYPE_TEXT, b"not deflate data")
+                    + _deflate_frame(framing.TYPE_TEXT, bomb)
+                    + encode_frame(framing.TYPE_TEXT, b"after"))
+    decoder = FrameDecoder(max_body=1024)
+    assert decoder.decode(buf) == [(framing.TYPE_TEXT, b"first"), (framing.TYPE_TEXT, b"after")]
+    assert decoder.errors == 2
+    assert len(buf) == 0
+
+
+def test_uart_handshake_and_framed_messages():
+    """Test the handshake switches modes and frames reach the bus"""
+    async def run_test():
+        bus = MockBus()
+        ch = UARTChannel(bus, {"enabled": True})
+        media = bytes(range(256))
+        ch.buffer.extend(
+            b"plain first\n" + (framing.HANDSHAKE + "\n").encode()
+            + encode_frame(framing.TYPE_TEXT, framing.text_body("c9", "hi\nthere"))
+            + encode_frame(framing.TYPE_MEDIA, framing.media_body({"content": "pic"}, media))
+        )
+        
+        captured = io.StringIO()
+        old_stdout = sys.stdout
+        sys.stdout = captured
+        try:
+            await ch._process_buffer()
+        finally:
+            sys.stdout = old_stdout
+        
+        assert framing.HANDSHAKE_OK in captured.getvalue()
+        assert ch.framed
+        contents = [m.content for m in bus.inbound_messages]
+        assert contents == ["plain first", "hi\nthere", "pic"]
+        assert bus.inbound_messages[1].chat_id == "c9"
+        assert bus.inbound_messages[2].media == media
+        
+        frame = ch._encode(OutboundMessage("uart", "c9", "reply"))
+        assert FrameDecoder().decode(bytearray(frame)) == [
+            (framing.TYPE_TEXT, framing.text_body("c9", "reply"))
+        ]
+        
+        ch.buffer.extend(encode_frame(framing.TYPE_BYE, b"") + b"back to text\n")
+        await ch._process_buffer()
+        assert not ch.framed
+        await ch._process_buffer()
+        assert bus.inbound_messages[-1].content == "back to text"
+    
+    run_async_test(run_test)
+
+
+def test_credit_frames_limit_output():
+    """Test framed output stops at the granted credit"""
+    async def run_test():
+        written = []
+        
+        class Out:
+            def write(self, data):
+                written.append(bytes(data))
+        
+        read_fd, write_fd = os.pipe()
+        stream = os.fdopen(read_fd, 'rb')
+        ch = UARTChannel(MockBus(), {"baudrate": 0, "frame_compress_min": 0}, stream=stream, out_stream=Out())
+        await ch.start()
+        try:
+            ch._set_framed(True)
+            ch.buffer.extend(encode_frame(framing.TYPE_CREDIT, framing.encode_varint(20)))
+            await ch._process_buffer()
+            
+            await ch.send(OutboundMessage("uart", "c1", "y" * 50))
+            await asyncio.sleep(0.02)
+            assert sum(len(w) for w in written) == 20
+            
+            ch.buffer.extend(encode_frame(framing.TYPE_CREDIT, framing.encode_varint(1000)))
+            await ch._process_buffer()
+            await asyncio.sleep(0.02)
+            frames = FrameDecoder().decode(bytearray(b"".join(written)))
+            assert frames == [(framing.TYPE_TEXT, framing.text_body("c1", "y" * 50))]
+        finally:
+            await ch.stop()
+            await asyncio.sleep(0.01)
+            stream.close()
+            os.close(write_fd)
+    
+    run_async_test(run_test)
+
+
+def test_host_client_round_trip():
+    """Test the host client parses device frames and skips log text"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "tools"))
+    from uart_client import UARTClient
+    
+    device_out = io.BytesIO(
+        b"UART framed mode\n" + (framing.HANDSHAKE_OK + "\n").encode()
+        + b"Processing: ...\n"
+        + encode_frame(framing.TYPE_TEXT, framing.text_body("host", "done"))
+    )
+    host_out = io.BytesIO()
+    client = UARTClient(device_out, host_out)
+    client.handshake(timeout=1)
+    client.send_text("hello")
+    reply = client.recv(timeout=1)
+    assert reply == {"type": "text", "chat_id": "host", "content": "done"}
+    assert client.log == ["UART framed mode"]
+    assert host_out.getvalue().startswith((framing.HANDSHAKE + "\n").encode())
+
+
+if __name__ == "__main__":
+    from tests import run_tests
+    run_tests(sys.modules[__name__])
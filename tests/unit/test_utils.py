@@ -12,7 +12,10 @@ from chipclaw.utils import (
     safe_filename,
     truncate_string,
     get_runtime_info,
-    format_runtime_info
+    format_runtime_info,
+    LRUCache,
+    compress,
+    decompress
 )
 
 
@@ -92,6 +95,79 @@ def test_ensure_dir():
         shutil.rmtree(temp_dir)
 
 
+def test_lru_cache_entry_limit():
+    """Test LRUCache evicts least recently used entry by count"""
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    
+    assert "b" not in cache
+    assert cache.keys() == ["a", "c"]
+    assert cache.evictions == 1
+
+
+def test_lru_cache_byte_limit():
+    """Test LRUCache byte accounting and eviction"""
+    cache = LRUCache(max_bytes=100)
+    cache.put("a", "x", 60)
+    cache.put("b", "y", 30)
+    assert cache.bytes == 90
+    
+    cache.put("b", "z", 50)  # replace updates accounting
+    assert "a" not in cache
+    assert cache.bytes == 50
+    
+    assert cache.pop("b") == "z"
+    assert cache.bytes == 0
+
+
+def test_lru_cache_peek():
+    """Test peek leaves recency and counters alone"""
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.peek("a") == 1
+    assert cache.peek("missing") is None
+    assert cache.keys() == ["a", "b"]
+    assert cache.hits == 0 and cache.misses == 0
+
+
+def test_lru_cache_stats():
+    """Test LRUCache hit/miss counters"""
+    cache = LRUCache()
+    cache.put("a", 1, 10)
+    cache.get("a")
+    assert cache.get("missing", "default") == "default"
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 10
+
+
+
+def test_decompress_limit():
+    """Test decompress stops at the limit instead of inflating everything"""
+    data = b"abc" * 1000
+    packed = compress(data)
+    assert decompress(packed) == data
+    assert decompress(packed, len(data)) == data
+    try:
+        decompress(packed, len(data) - 1)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    raised = False
+    try:
+        decompress(packed[:10], 100000)
+    except Exception:
+        raised = True
+    assert raised
+
+
 if __name__ == "__main__":
     from tests import run_tests
     import sys
@@ -0,0 +1,97 @@
+"""
+ChipClaw MQTT payload decoder
+
+Reference decoder for the chunked MQTT payload format (see
+chipclaw/channels/chunking.py). It depends only on the standard library
+so clients can copy it as-is:
+
+    decoder = ChunkDecoder()
+    payload = decoder.feed(topic, mqtt_payload)  # bytes, or None while incomplete
+
+As a command it subscribes and prints each complete reply:
+
+    python tools/mqtt_decode.py 192.168.1.1 "chipclaw/out/#"
+
+which needs paho-mqtt (pip install paho-mqtt).
+"""
+import sys
+import json
+import time
+import struct
+import zlib
+
+MAGIC = b"\xcc\x01"
+HEADER = ">2sBHHH"  # magic, flags, message id, index, count
+HEADER_SIZE = 9
+FLAG_DEFLATE = 1
+
+
+class ChunkDecoder:
+    """Reassembles chunked payloads; other payloads pass straight through"""
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self.partial = {}  # {(source, message id): (count, flags, {index: data}, last seen)}
+
+    def feed(self, source, payload):
+        """
+        Add one MQTT payload
+
+        Args:
+            source: Topic (or other sender key) the payload arrived on
+            payload: Raw MQTT payload bytes
+
+        Returns:
+            The complete payload bytes, or None while chunks are missing
+        """
+        if len(payload) < HEADER_SIZE or payload[:2] != MAGIC:
+            return payload
+        _, flags, msg_id, index, count = struct.unpack_from(HEADER, payload)
+        now = time.time()
+        for key in [k for k, v in self.partial.items() if now - v[3] > self.timeout]:
+            del self.partial[key]
+
+        key = (source, msg_id)
+        entry = self.partial.get(key)
+        if entry is None or entry[0] != count:
+            entry = (count, flags, {}, now)
+        entry[2][index] = payload[HEADER_SIZE:]
+        self.partial[key] = (count, flags, entry[2], now)
+        if len(entry[2]) < count:
+            return None
+
+        del self.partial[key]
+        data = b"".join(entry[2][i] for i in range(count))
+        return zlib.decompress(data) if flags & FLAG_DEFLATE else data
+
+
+def main():
+    import argparse
+    import paho.mqtt.client as mqtt
+    parser = argparse.ArgumentParser(description="Print ChipClaw MQTT replies, reassembling chunks")
+    parser.add_argument("broker", help="Broker host")
+    parser.add_argument("topic", help="Topic filter, e.g. chipclaw/out/#")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args()
+
+    decoder = ChunkDecoder()
+
+    def on_message(client, userdata, message):
+        payload = decoder.feed(message.topic, message.payload)
+        if payload is None:
+            return
+        try:
+            print(f"{message.topic}: {json.loads(payload).get('content')}")
+        except ValueError:
+            print(f"{message.topic}: {payload!r}")
+        sys.stdout.flush()
+
+    client = mqtt.Client()
+    client.on_message = on_message
+    client.connect(args.broker, args.port)
+    client.subscribe(args.topic)
+    client.loop_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+ChipClaw UART host client
+
+Talks to a ChipClaw UART channel in framed mode (see
+chipclaw/channels/framing.py) from a desktop machine:
+
+    python tools/uart_client.py /dev/ttyUSB0 "Turn on the LED"
+    python tools/uart_client.py /dev/ttyUSB0 "What is this?" --media photo.jpg
+
+Needs pyserial for real ports (pip install pyserial). UARTClient also
+accepts any pair of binary file objects, which is how the tests use it.
+"""
+import sys
+import os
+import json
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chipclaw.channels.framing import (FrameDecoder, encode_frame, text_body, parse_text_body,
+                                       media_body, parse_media_body, HANDSHAKE, HANDSHAKE_OK,
+                                       encode_varint, TYPE_TEXT, TYPE_JSON, TYPE_MEDIA, TYPE_BYE,
+                                       TYPE_CREDIT)
+
+
+class UARTClient:
+    """Framed-mode client over binary reader/writer file objects"""
+    
+    def __init__(self, reader, writer, compress_min=256):
+        self.reader = reader
+        self.writer = writer
+        self.compress_min = compress_min
+        self.decoder = FrameDecoder(max_body=1 << 20)
+        self.buffer = bytearray()
+        self.pending = []  # decoded frames not yet returned by recv()
+        self.log = []  # text the device printed between frames
+    
+    @classmethod
+    def open(cls, port, baudrate=115200):
+        """Open a serial port with pyserial"""
+        import serial
+        conn = serial.Serial(port, baudrate, timeout=0.1)
+        return cls(conn, conn)
+    
+    def _read_some(self):
+        read = getattr(self.reader, "read1", self.reader.read)
+        return read(4096)
+    
+    def _write(self, data):
+        self.writer.write(data)
+        self.writer.flush()
+    
+    def handshake(self, timeout=3):
+        """Switch the device to framed mode"""
+        self._write((HANDSHAKE + "\n").encode())
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            idx = self.buffer.find(b"\n")
+            if idx < 0:
+                self.buffer.extend(self._read_some() or b"")
+                continue
+            line = bytes(self.buffer[:idx]).decode("utf-8", "replace").strip()
+            del self.buffer[:idx + 1]
+            if line == HANDSHAKE_OK:
+                return
+            self.log.append(line)
+        raise TimeoutError("No framing handshake reply")
+    
+    def send_text(self, content, chat_id="host"):
+        self._write(encode_frame(TYPE_TEXT, text_body(chat_id, content), self.compress_min))
+    
+    def send_json(self, data):
+        self._write(encode_frame(TYPE_JSON, json.dumps(data).encode(), self.compress_min))
+    
+    def send_media(self, data, content="", chat_id="host"):
+        header = {"chat_id": chat_id, "content": content}
+        self._write(encode_frame(TYPE_MEDIA, media_body(header, data), self.compress_min))
+    
+    def grant(self, nbytes):
+        """Allow the device to send nbytes more (enables credit flow control)"""
+        self._write(encode_frame(TYPE_CREDIT, encode_varint(nbytes)))
+    
+    def bye(self):
+        """Return the device to text mode"""
+        self._write(encode_frame(TYPE_BYE, b""))
+    
+    def recv(self, timeout=60):
+        """
+        Wait for the next frame from the device
+        
+        Returns:
+            Dict with type, chat_id and content (plus media for media frames)
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.pending.extend(self.decoder.decode(self.buffer))
+            if self.pending:
+                ftype, body = self.pending.pop(0)
+                return self._parse(ftype, body)
+            chunk = self._read_some()
+            if chunk:
+                self.buffer.extend(chunk)
+        raise TimeoutError("No frame received")
+    
+    def _parse(self, ftype, body):
+        if ftype == TYPE_TEXT:
+            chat_id, content = parse_text_body(body)
+            return {"type": "text", "chat_id": chat_id, "content": content}
+        if ftype == TYPE_MEDIA:
+            header, data = parse_media_body(body)
+            header.update({"type": "media", "media": data})
+            return header
+        if ftype == TYPE_JSON:
+            data = json.loads(body)
+            data["type"] = "json"
+            return data
+        return {"type": ftype, "body": body}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Send a message to ChipClaw over framed UART")
+    parser.add_argument("port", help="Serial port, e.g. /dev/ttyUSB0")
+    parser.add_argument("message", help="Message content")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--chat-id", default="host")
+    parser.add_argument("--media", help="File to attach as raw bytes")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+    
+    client = UARTClient.open(args.port, args.baudrate)
+    client.handshake()
+    if args.media:
+        with open(args.media, "rb") as f:
+            client.send_media(f.read(), args.message, args.chat_id)
+    else:
+        client.send_text(args.message, args.chat_id)
+    reply = client.recv(args.timeout)
+    print(reply.get("content"))
+    client.bye()
+
+
+if __name__ == "__main__":
+    main()